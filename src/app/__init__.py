@@ -3,6 +3,24 @@
 #   utils.py     - 通用工具（日誌、格式簡化）
 #   config.py    - 設定檔管理（JSON 讀寫）
 #   history.py   - 下載歷史記錄（SQLite）
-#   downloader.py - 下載引擎（yt-dlp 封裝、並行批次下載）
+#   history_archive.py - 歷史保存期限（過期記錄封存為每月 gzip JSONL、漸進回收空間）
+#   downloader.py - 下載引擎（yt-dlp 封裝、單一工作下載）
+#   batch.py     - 批次網址解析與並行分析（依影片 ID 去除重複）
+#   jobs.py      - 持久化下載佇列與排程器（優先順序、排序、暫停/取消）
+#   job_timing.py - 工作階段計時（佇列等待、擷取、傳輸、後處理、字幕），隨歷史記錄保存
+#   metrics.py   - 監控指標（計數器、量表、直方圖）與 Prometheus 文字格式的本機端點
+#   tracing.py   - 效能追蹤（時間區段環形緩衝區、匯出 Chrome trace-event JSON）
+#   cli.py       - 無圖形介面的命令列與 daemon 模式（python -m app）
+#   control_api.py - 本機 HTTP/JSON 控制 API（權杖驗證、SSE 進度串流）
+#   download_windows.py - 下載時段（離峰時段排程、頻寬上限）
+#   watch_folder.py - 監看資料夾（inotify / 輪詢）自動加入網址清單檔
 #   gui.py       - 使用者介面（tkinter）
+#   log_view.py  - 有界環形緩衝、批次插入的日誌檢視元件
+#   log_writer.py - 背景批次寫入、分段輪轉的日誌檔寫入器
+#   message_pump.py - 事件驅動、具時間預算的執行緒間訊息佇列
+#   details_loader.py - 最新請求優先、可快取的影片詳細資訊載入器
+#   thumbnails.py - 縮圖服務（連線池、記憶體 LRU + 磁碟快取）
+#   selection.py - 大量列表的勾選狀態模型（bitset）
+#   virtual_tree.py - 虛擬化 Treeview 列表元件
+#   video_index.py - 影片列表反向索引與即時篩選
 __version__ = "2.0.0"
@@ -0,0 +1,9 @@
+"""
+python -m app — 無圖形介面的命令列 / daemon 模式（見 cli.py）。
+"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+批次網址模組 — 解析多行文字 / 文字檔 / CSV 中的網址，並以有界執行緒池並行分析。
+所有播放清單與單一影片的結果依影片 ID 去除重複後合併為一份影片列表。
+純邏輯模組，無 UI 依賴，可獨立單元測試。
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+
+_URL_RE = re.compile(r"https?://\S+", re.IGNORECASE)
+_VIDEO_ID_RE = re.compile(r"^[\w-]{11}$")
+_DIRECTIVE_RE = re.compile(r"^#@\s*(\w+)\s*[=:]\s*(.*?)\s*$")
+
+# 網址清單檔可指定的下載選項（與命令列的 --audio/--format/-o/--subtitle/--priority/sync 對應）
+JOB_OPTION_KEYS = ("audio", "format", "output_dir", "subtitle", "priority", "sync")
+
+
+def video_id_of(url: str):
+    """從 YouTube 網址取出 11 碼影片 ID；不是單一影片網址時回傳 None。"""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+    host = (parsed.hostname or "").lower()
+    if host.endswith("youtu.be"):
+        candidate = parsed.path.strip("/").split("/")[0]
+    elif host.endswith("youtube.com"):
+        candidate = parse_qs(parsed.query).get("v", [""])[0]
+        if not candidate:
+            parts = parsed.path.strip("/").split("/")
+            if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+                candidate = parts[1]
+    else:
+        return None
+    return candidate if _VIDEO_ID_RE.match(candidate or "") else None
+
+
+def parse_url_list(text: str) -> list:
+    """
+    從多行文字或 CSV 內容中取出網址（保持順序、去除完全相同的重複）。
+    以 # 開頭的行視為註解；CSV 的每個欄位都會檢查是否為網址。
+    """
+    urls = []
+    seen = set()
+    for row in csv.reader(io.StringIO(text)):
+        if not row or row[0].lstrip().startswith("#"):
+            continue
+        for cell in row:
+            for url in _URL_RE.findall(cell):
+                url = url.rstrip(",;\"'")
+                if url not in seen:
+                    seen.add(url)
+                    urls.append(url)
+    return urls
+
+
+def read_url_file(path: str) -> list:
+    """讀取文字檔或 CSV 檔中的網址。"""
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        return parse_url_list(f.read())
+
+
+def normalize_job_options(raw: dict) -> dict:
+    """
+    檢查並轉換下載選項：只保留 JOB_OPTION_KEYS，priority 轉為整數，audio/sync 轉為布林。
+    format 寫成 mp3 / audio 時視為 audio。格式錯誤時拋出 ValueError。
+    """
+    options = {}
+    for key, value in raw.items():
+        if key not in JOB_OPTION_KEYS or value in (None, ""):
+            continue
+        if key == "priority":
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"priority 必須是整數：{value!r}")
+        elif key in ("audio", "sync"):
+            value = value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "yes", "on")
+        elif key == "format" and str(value).strip().lower() in ("mp3", "audio"):
+            key, value = "audio", True
+        options[key] = value
+    return options
+
+
+def parse_url_entries(text: str) -> list:
+    """
+    解析 JSON Lines 網址清單：每行是 {"url": ..., 選項...} 或單純的網址。
+    回傳依選項分組的 [(options, urls)]；組內網址保持順序並去除重複。
+    任何一行的 JSON 或選項格式錯誤時拋出 ValueError（訊息含行號）。
+    """
+    groups = {}
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            item = json.loads(line) if line.startswith("{") else {"url": line}
+            if not isinstance(item, dict):
+                raise ValueError("必須是 JSON 物件")
+            url = item.pop("url", None)
+            options = normalize_job_options(item)
+        except ValueError as e:     # json.JSONDecodeError 也是 ValueError
+            raise ValueError(f"第 {lineno} 行：{e}")
+        if not url:
+            continue
+        key = json.dumps(options, sort_keys=True)
+        urls = groups.setdefault(key, (options, []))[1]
+        if url not in urls:
+            urls.append(url)
+    return list(groups.values())
+
+
+def read_job_file(path: str) -> list:
+    """
+    讀取網址清單檔，回傳 [(options, urls)]。
+    .jsonl 依 parse_url_entries 解析；其他（.txt / .csv）以 parse_url_list 取出網址，
+    並以「#@ 鍵=值」開頭的行指定整個檔案的選項，例如：
+        #@ output_dir = /data/music
+        #@ format = mp3
+        #@ priority = 1
+    """
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        text = f.read()
+    if path.lower().endswith(".jsonl"):
+        return parse_url_entries(text)
+    directives = {}
+    for line in text.splitlines():
+        match = _DIRECTIVE_RE.match(line.strip())
+        if match:
+            directives[match.group(1).lower()] = match.group(2)
+    urls = parse_url_list(text)
+    return [(normalize_job_options(directives), urls)] if urls else []
+
+
+def expand_url_input(text: str) -> list:
+    """解析輸入框內容：一般網址直接收集，若某行是既有檔案的路徑則讀取該檔案中的網址。"""
+    urls = []
+    for line in text.splitlines():
+        path = line.strip().strip('"{}')
+        if path and not _URL_RE.match(path) and os.path.isfile(path):
+            urls.extend(read_url_file(path))
+        else:
+            urls.extend(parse_url_list(line))
+    return list(dict.fromkeys(urls))
+
+
+class BatchAnalyzer:
+    """
+    以有界執行緒池並行分析多個網址，合併並去除重複的影片。
+
+    analyze(url) 為單一網址的分析函數（DownloadManager.analyze_url 的回傳格式）；
+    on_progress(done, total, url, error) 在工作執行緒上於每個網址完成時呼叫。
+    """
+
+    def __init__(self, analyze, max_workers: int = 4, on_progress=None):
+        self._analyze = analyze
+        self.max_workers = max(1, max_workers)
+        self._on_progress = on_progress
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """不再開始新的網址分析（已在進行中的分析會完成但結果被忽略）。"""
+        self._cancelled.set()
+
+    def run(self, urls: list) -> dict:
+        """
+        分析所有網址並回傳：
+            videos   合併後的 (標題, 網址) 列表
+            meta     與 videos 逐項對應的中繼資料
+            failed   [(網址, 錯誤訊息)]
+            duplicates 去除的重複影片數
+        """
+        total = len(urls)
+        results = [None] * total
+        done = [0]
+        lock = threading.Lock()
+
+        def work(i: int, url: str):
+            if self._cancelled.is_set():
+                return
+            error = None
+            try:
+                results[i] = self._analyze(url)
+            except Exception as e:
+                error = str(e)
+                results[i] = e
+            with lock:
+                done[0] += 1
+                count = done[0]
+            if self._on_progress:
+                self._on_progress(count, total, url, error)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="batch-analyze") as executor:
+            for i, url in enumerate(urls):
+                executor.submit(work, i, url)
+
+        return self._merge(urls, results)
+
+    @staticmethod
+    def _merge(urls: list, results: list) -> dict:
+        videos, meta, failed = [], [], []
+        seen = set()
+        duplicates = 0
+
+        def add(title: str, url: str, info: dict):
+            nonlocal duplicates
+            key = video_id_of(url) or url
+            if key in seen:
+                duplicates += 1
+                return
+            seen.add(key)
+            videos.append((title, url))
+            meta.append(info)
+
+        for url, result in zip(urls, results):
+            if result is None:
+                continue  # 已取消
+            if isinstance(result, Exception):
+                failed.append((url, str(result)))
+            elif result.get("type") == "playlist":
+                entry_meta = result.get("video_meta") or []
+                for i, (title, video_url) in enumerate(result.get("videos", [])):
+                    add(title, video_url, entry_meta[i] if i < len(entry_meta) else {})
+            else:
+                add(result.get("title", url), url, {"thumbnail_url": result.get("thumbnail_url")})
+        return {"videos": videos, "meta": meta, "failed": failed, "duplicates": duplicates}
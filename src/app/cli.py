@@ -0,0 +1,661 @@
+"""
+命令列模式 — 以 python -m app 在沒有圖形介面的伺服器上使用下載引擎。
+子命令：
+    analyze   分析網址並輸出結果
+    download  分析網址並下載（播放清單/頻道展開為所有影片）
+    sync      同 download，但略過歷史記錄中已成功下載的影片
+    history   查詢下載歷史與統計、階段耗時報表、封存過期記錄、搜尋封存檔
+    enqueue   將網址交給執行中的 daemon
+    windows   顯示 / 設定下載時段與下次開始時間
+    daemon    常駐執行，消化持久化的下載佇列與 enqueue 送來的網址
+              （可選擇啟用本機控制 API、監看資料夾與 Prometheus 監控指標端點；
+              設定保存天數時在閒置時封存過期的歷史記錄）
+進度以 JSON Lines 輸出到標準輸出（--output text 改為一般文字）。
+--trace FILE 在命令結束時將追蹤區段匯出為 Chrome trace-event JSON（可用 Perfetto 開啟）。
+不匯入 tkinter、PIL 或 requests。
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from .batch import BatchAnalyzer, expand_url_input, parse_url_entries
+from .config import load_settings, save_settings
+from .control_api import ControlServer, DEFAULT_API_PORT, generate_token
+from .download_windows import (WindowController, WindowSchedule, describe_state, load_windows,
+                               parse_window_spec, window_state)
+from .downloader import DownloadManager
+from .history import DownloadHistory, HistoryWriter
+from .history_archive import ARCHIVE_DIR, HistoryRetention, search_archive
+from .metrics import MetricsServer, watch_scheduler
+from .tracing import DEFAULT_CAPACITY, TRACER
+from .jobs import (DownloadJob, JobInterrupted, JobScheduler, load_queue, make_job, QUEUE_FILE,
+                   QUEUED, RUNNING, DONE, FAILED)
+from .watch_folder import WatchFolder
+
+INBOX_FILE = "yd_queue.inbox.jsonl"
+
+
+class EventPrinter:
+    """
+    可直接當作訊息佇列傳給 DownloadManager 的輸出器：put() 將訊息轉為事件寫到標準輸出。
+    同一工作的進度事件最多每 PROGRESS_INTERVAL 秒輸出一次。
+    """
+
+    PROGRESS_INTERVAL = 1.0
+    # 只對圖形介面有意義的訊息類型
+    IGNORED_TYPES = frozenset({"file_progress", "total_progress", "set_ui_state", "history_changed"})
+
+    def __init__(self, text: bool = False, stream=None):
+        self.text = text
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+        self._jobs = {}                 # 工作編號 → DownloadJob（用於進度事件）
+        self._last_progress = {}
+        self._taps = ()
+
+    def add_tap(self, callback):
+        """與 MessagePump.add_tap 相同：每筆 put() 的訊息也交給 callback（例如控制 API 的事件串流）。"""
+        self._taps = self._taps + (callback,)
+
+    def track(self, jobs: list):
+        for job in jobs:
+            self._jobs[job.id] = job
+
+    def put(self, msg: dict, block=True, timeout=None):
+        for tap in self._taps:
+            tap(msg)
+        mtype = msg.get("type")
+        if mtype in self.IGNORED_TYPES:
+            return
+        if mtype == "jobs_changed":
+            job = self._jobs.get(msg.get("job_id"))
+            if job is None:
+                return
+            now = time.monotonic()
+            if job.progress < 100 and now - self._last_progress.get(job.id, 0) < self.PROGRESS_INTERVAL:
+                return
+            self._last_progress[job.id] = now
+            self.emit("progress", job=job.id, percent=round(job.progress, 1))
+        elif "text" in msg:
+            self.emit(mtype, text=msg["text"])
+
+    def emit(self, event: str, **fields):
+        record = {"ts": round(time.time(), 3), "event": event, **fields}
+        if self.text:
+            text = fields.pop("text", None)
+            details = " ".join(f"{k}={v}" for k, v in fields.items())
+            line = f"{time.strftime('%H:%M:%S')} [{event}] " + " ".join(filter(None, [text, details]))
+        else:
+            line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class HeadlessRunner:
+    """組合 DownloadManager、JobScheduler 與 DownloadHistory，供各子命令使用。"""
+
+    def __init__(self, args, persist_path: str = None):
+        with redirect_stdout(sys.stderr):   # load_settings 的提示訊息不混入結構化輸出
+            self.settings = load_settings()
+        self.printer = EventPrinter(text=args.output == "text")
+        # 設定檔停用追蹤（0）時，指定 --trace 仍以預設容量記錄
+        TRACER.configure(self.settings.get("trace_buffer_events", DEFAULT_CAPACITY)
+                         or (DEFAULT_CAPACITY if args.trace else 0))
+        ffmpeg_path = args.ffmpeg or self.settings.get("ffmpeg_path") or shutil.which("ffmpeg") or ""
+        parallel = args.parallel or self.settings.get("parallel_downloads", 2)
+        self.manager = DownloadManager(
+            ffmpeg_path=ffmpeg_path,
+            retries=self.settings.get("retries", 2),
+            retry_delay=self.settings.get("delay", 5),
+            parallel_downloads=parallel,
+            msg_queue=self.printer,
+        )
+        self.history = DownloadHistory()
+        self.history_writer = HistoryWriter(
+            self.history, on_flush=lambda ids: self.printer.put({"type": "history_changed", "ids": ids}),
+            on_error=self._report_error)
+        self.idle = threading.Event()
+        self.failed = 0
+        self._states = {}
+        self._states_lock = threading.Lock()
+        self.scheduler = JobScheduler(
+            self.run_job, max_workers=self.manager.parallel_downloads,
+            on_change=self._on_change, on_idle=self._on_idle, persist_path=persist_path,
+            on_error=self._report_error,
+        )
+        watch_scheduler(self.scheduler)
+        windows = [] if args.ignore_windows else load_windows(self.settings.get("download_windows"))
+        self.windows = WindowController(self.scheduler, self.manager, windows,
+                                        on_change=self._on_window_change)
+        # 只由 daemon 啟動：沒有下載進行時封存過期的歷史記錄
+        self.retention = HistoryRetention(
+            self.history, self.settings.get("history_retention_days", 0),
+            directory=self.settings.get("history_archive_dir") or ARCHIVE_DIR,
+            is_idle=lambda: not self.scheduler.counts().get(RUNNING),
+            on_event=lambda archived, freed: self.printer.emit(
+                "history_archived", records=archived, freed_pages=freed),
+            on_error=self._report_error)
+
+    def _report_error(self, text: str):
+        """背景元件（歷史寫入、佇列保存、封存）的錯誤以 error 事件輸出，不直接印到標準輸出。"""
+        self.printer.emit("error", text=text)
+
+    def start(self, jobs: list = None):
+        """先套用下載時段再啟動排程器（時段外的工作保持等待）。"""
+        self.windows.start()
+        self.scheduler.start(jobs)
+
+    def shutdown(self, timeout: float = 0.0):
+        """停止時段控制、以暫停方式中止執行中的下載並保存佇列，最後關閉歷史資料庫連線。"""
+        self.windows.stop()
+        self.retention.stop()
+        self.scheduler.shutdown(timeout=timeout)
+        self.history_writer.close()
+        self.history.close()
+
+    # ─── 網址 → 下載工作 ───────────────────────────────────
+
+    def resolve_jobs(self, urls: list, options: dict, skip_downloaded: bool = False) -> list:
+        """並行分析網址，展開播放清單並依影片 ID 去除重複後建立下載工作。"""
+        analyzer = BatchAnalyzer(
+            lambda url: self.manager.analyze_url(url, quiet=True),
+            max_workers=self.settings.get("batch_analysis_workers", 4),
+            on_progress=lambda done, total, url, error: self.printer.emit(
+                "analyzed", url=url, done=done, total=total, error=error),
+        )
+        result = analyzer.run(urls)
+        videos = result["videos"]
+        if skip_downloaded:
+            done = self.history.downloaded_videos(url for _, url in videos)
+            skipped = len(videos)
+            videos = [(title, url) for title, url in videos if url not in done]
+            skipped -= len(videos)
+            self.printer.emit("sync", total=len(result["videos"]), skipped=skipped,
+                              pending=len(videos))
+        queued = self.scheduler.active_urls()
+        videos = [(title, url) for title, url in videos if url not in queued]
+        output_dir = self.settings.get("default_download_path") or os.getcwd()
+        return [make_job(title, url, options, output_dir) for title, url in videos]
+
+    # ─── 排程器回呼 ────────────────────────────────────────
+
+    def submit(self, urls: list, options: dict) -> list:
+        """分析網址並加入佇列（daemon 的 inbox 與控制 API 共用），回傳加入的工作。"""
+        jobs = self.resolve_jobs(urls, options, skip_downloaded=options.get("sync", False))
+        self.enqueue(jobs)
+        return jobs
+
+    def enqueue(self, jobs: list) -> list:
+        if jobs:
+            self.idle.clear()
+        ids = self.scheduler.add(jobs)
+        self.printer.track(jobs)
+        return ids
+
+    def run_job(self, job: DownloadJob, worker_id: int) -> str:
+        fmt_type = "MP3" if job.kind == "audio" else "MP4"
+        try:
+            file_path = self.manager.run_job(job)
+        except JobInterrupted:
+            raise
+        except Exception as e:
+            self._record(job, fmt_type, "failed", error_msg=str(e))
+            raise
+        self._record(job, fmt_type, "success", file_path=file_path)
+        return file_path
+
+    def _record(self, job: DownloadJob, fmt_type: str, status: str,
+                file_path: str = "", error_msg: str = ""):
+        file_size = 0
+        if file_path and os.path.isfile(file_path):
+            try:
+                file_size = os.path.getsize(file_path)
+            except OSError:
+                pass
+        self.history_writer.add(
+            url=job.url, title=job.title, format_type=fmt_type, resolution=job.resolution,
+            file_path=file_path, file_size=file_size, status=status, error_msg=error_msg,
+            **(job.timings.as_record() if job.timings else {}),
+        )
+
+    def _on_change(self):
+        """比對工作狀態，輸出有變動的工作。"""
+        self.printer.put({"type": "jobs_changed"})     # 與圖形介面相同的通知（供控制 API 使用）
+        changed = []
+        with self._states_lock:
+            for job in self.scheduler.jobs():
+                if self._states.get(job.id) != job.state:
+                    self._states[job.id] = job.state
+                    changed.append(job)
+        for job in changed:
+            fields = {"job": job.id, "state": job.state, "title": job.title}
+            if job.state == QUEUED:
+                fields.update(url=job.url, priority=job.priority)
+            elif job.state == DONE:
+                fields["file"] = job.file_path
+            elif job.state == FAILED:
+                fields["error"] = job.error
+                self.failed += 1
+            if job.worker_id is not None:
+                fields["worker"] = job.worker_id
+            self.printer.emit("job", **fields)
+
+    def _on_window_change(self, state: dict):
+        if not state["enabled"]:
+            return
+        self.printer.emit("window", open=state["open"], text=describe_state(state, datetime.now()),
+                          **_window_times(state))
+
+    def _on_idle(self, done: int, failed: int):
+        self.printer.emit("idle", done=done, failed=failed)
+        self.idle.set()
+
+    def wait_idle(self):
+        """等待佇列中的工作全部結束（以事件等待，逾時只為了讓 Ctrl+C 能即時生效）。"""
+        while not self.idle.wait(1.0):
+            pass
+
+
+# ─── 子命令 ────────────────────────────────────────────────
+
+
+def _collect_urls(args) -> list:
+    urls = list(args.urls or [])
+    for path in args.file or []:
+        with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+            urls.extend(expand_url_input(f.read()))
+    return list(dict.fromkeys(urls))
+
+
+def _job_options(args) -> dict:
+    return {
+        "audio": args.audio,
+        "format": args.format,
+        "output_dir": args.output_dir,
+        "subtitle": args.subtitle,
+        "priority": args.priority,
+    }
+
+
+def cmd_analyze(args) -> int:
+    runner = HeadlessRunner(args)
+    errors = 0
+    try:
+        for url in _collect_urls(args):
+            try:
+                result = runner.manager.analyze_url(url)
+            except RuntimeError as e:
+                errors += 1
+                runner.printer.emit("error", url=url, text=str(e))
+                continue
+            runner.printer.emit("analysis", url=url, **result)
+    finally:
+        runner.shutdown()
+    return 1 if errors else 0
+
+
+def cmd_download(args, skip_downloaded: bool = False) -> int:
+    urls = _collect_urls(args)
+    if not urls:
+        print("沒有指定任何網址。", file=sys.stderr)
+        return 2
+    runner = HeadlessRunner(args)
+    jobs = runner.resolve_jobs(urls, _job_options(args), skip_downloaded=skip_downloaded)
+    if not jobs:
+        runner.printer.emit("idle", done=0, failed=0)
+        runner.shutdown()
+        return 0
+    runner.enqueue(jobs)
+    runner.start()
+    try:
+        runner.wait_idle()
+    except KeyboardInterrupt:
+        runner.shutdown(timeout=2.0)
+        runner.printer.emit("interrupted", text="已中止；未完成的 .part 檔已保留，可重新執行以續傳。")
+        return 130
+    runner.shutdown()
+    return 1 if runner.failed else 0
+
+
+def cmd_sync(args) -> int:
+    return cmd_download(args, skip_downloaded=True)
+
+
+def cmd_history(args) -> int:
+    printer = EventPrinter(text=args.output == "text")
+    if args.search_archive is not None:
+        return _search_archive(args, printer)
+    history = DownloadHistory()
+    try:
+        if args.archive:
+            return _archive_history(args, history, printer)
+        if args.daily or args.stats:
+            try:
+                stats = (history.get_daily_stats(since=args.since, until=args.until) if args.daily
+                         else [history.get_stats(since=args.since, until=args.until)])
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 2
+            for item in stats:
+                printer.emit("daily" if args.daily else "stats", **item)
+            return 0
+        if args.report:
+            try:
+                groups = history.get_timing_report(args.report, since=args.since, until=args.until)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 2
+            for group in groups:
+                printer.emit("timing", by=args.report, **{
+                    k: round(v, 2) if isinstance(v, float) else v for k, v in group.items()})
+            return 0
+        records = (history.search(args.search, limit=args.limit) if args.search
+                   else history.get_all(limit=args.limit, offset=args.offset))
+        for record in records:
+            printer.emit("record", **record)
+        return 0
+    finally:
+        history.close()
+
+
+def _history_settings() -> dict:
+    with redirect_stdout(sys.stderr):
+        return load_settings()
+
+
+def _archive_history(args, history, printer) -> int:
+    """立即封存超過保存天數的記錄（不等待閒置）。"""
+    settings = _history_settings()
+    days = args.retention_days if args.retention_days is not None else settings.get("history_retention_days", 0)
+    if days <= 0:
+        print("未設定保存天數（設定檔的 history_retention_days 或 --retention-days）。", file=sys.stderr)
+        return 2
+    retention = HistoryRetention(history, days, directory=settings.get("history_archive_dir") or ARCHIVE_DIR)
+    result = retention.run_once()
+    printer.emit("history_archived", records=result["archived"], freed_pages=result["freed_pages"],
+                 cutoff=retention.cutoff(), directory=retention.directory)
+    return 0
+
+
+def _search_archive(args, printer) -> int:
+    """逐行串流搜尋封存檔（空白查詢輸出範圍內的所有封存記錄）。"""
+    directory = _history_settings().get("history_archive_dir") or ARCHIVE_DIR
+    for record in search_archive(args.search_archive, directory, since=args.since,
+                                 until=args.until, limit=args.limit):
+        printer.emit("record", **record)
+    return 0
+
+
+def cmd_enqueue(args) -> int:
+    """以附加寫入的方式把網址交給 daemon（每行一筆 JSON，daemon 會整檔取走）。"""
+    urls = _collect_urls(args)
+    if not urls:
+        print("沒有指定任何網址。", file=sys.stderr)
+        return 2
+    options = {k: v for k, v in _job_options(args).items() if v not in (None, False)}
+    if args.sync:
+        options["sync"] = True
+    with open(args.inbox, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps({"url": url, **options}, ensure_ascii=False) + "\n"
+                        for url in urls))
+    EventPrinter(text=args.output == "text").emit("enqueued", count=len(urls), inbox=args.inbox)
+    return 0
+
+
+def cmd_daemon(args) -> int:
+    runner = HeadlessRunner(args, persist_path=QUEUE_FILE)
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            signal.signal(sig, lambda *_: stop.set())
+        except (ValueError, OSError):
+            pass
+
+    restored = load_queue(QUEUE_FILE)
+    runner.start(restored)
+    runner.retention.start()
+    runner.printer.track(restored)
+    runner.printer.emit("daemon", queue=QUEUE_FILE, inbox=args.inbox, restored=len(restored),
+                        workers=runner.scheduler.max_workers)
+
+    api = _start_api(runner, args)
+    watcher = _start_watch_folder(runner, args)
+    metrics_server = _start_metrics(runner, args)
+
+    while not stop.is_set():
+        for options, urls in _take_inbox(args.inbox):
+            runner.submit(urls, options)
+        stop.wait(args.poll)
+
+    runner.printer.emit("stopping", text="正在暫停執行中的下載並保存佇列...")
+    if api is not None:
+        api.stop()
+    if watcher is not None:
+        watcher.stop()
+    if metrics_server is not None:
+        metrics_server.stop()
+    runner.shutdown(timeout=5.0)
+    return 0
+
+
+def cmd_windows(args) -> int:
+    """顯示下載時段與下次開始時間；--set / --clear 修改後以 save_settings 保存。"""
+    printer = EventPrinter(text=args.output == "text")
+    with redirect_stdout(sys.stderr):
+        settings = load_settings()
+    windows = load_windows(settings.get("download_windows"))
+    if args.set or args.clear:
+        try:
+            windows = [parse_window_spec(spec) for spec in args.set or []]
+        except ValueError as e:
+            print(f"時段格式錯誤：{e}", file=sys.stderr)
+            return 2
+        settings["download_windows"] = [window.to_dict() for window in windows]
+        with redirect_stdout(sys.stderr):
+            if not save_settings(settings):
+                return 1
+    state = window_state(WindowSchedule(windows), datetime.now())
+    for window in windows:
+        printer.emit("window_spec", spec=window.spec())
+    printer.emit("window", enabled=state["enabled"], open=state["open"],
+                 text=describe_state(state, datetime.now()) or "未設定下載時段，隨時下載",
+                 **_window_times(state))
+    return 0
+
+
+def _window_times(state: dict) -> dict:
+    return {key: state[key].isoformat(timespec="minutes")
+            for key in ("ends_at", "next_start") if state.get(key)}
+
+
+def _start_api(runner: HeadlessRunner, args):
+    """依 --api-port 或設定檔啟動本機控制 API；未啟用時回傳 None。"""
+    port = args.api_port
+    if port is None and runner.settings.get("api_enabled"):
+        port = runner.settings.get("api_port", DEFAULT_API_PORT)
+    if port is None:
+        return None
+    token = args.api_token or runner.settings.get("api_token")
+    generated = not token
+    if generated:
+        token = generate_token()
+    try:
+        api = ControlServer(runner.scheduler, runner.history, runner.submit, token, port=port)
+    except OSError as e:
+        runner.printer.emit("error", text=f"無法啟動控制 API（連接埠 {port}）：{e}")
+        return None
+    runner.printer.add_tap(api.publish)
+    api.start()
+    # 只有臨時產生的權杖才輸出，設定檔或參數中的權杖不寫入日誌
+    runner.printer.emit("api", url=api.url, **({"token": token} if generated else {}))
+    return api
+
+
+def _start_metrics(runner: HeadlessRunner, args):
+    """依 --metrics-port 或設定檔的 metrics_port 啟動 Prometheus 抓取端點；未啟用時回傳 None。"""
+    port = args.metrics_port if args.metrics_port is not None else runner.settings.get("metrics_port", 0)
+    if not port:
+        return None
+    try:
+        server = MetricsServer(port)
+    except OSError as e:
+        runner.printer.emit("error", text=f"無法啟動監控指標端點（連接埠 {port}）：{e}")
+        return None
+    server.start()
+    runner.printer.emit("metrics", url=server.url)
+    return server
+
+
+def _start_watch_folder(runner: HeadlessRunner, args):
+    """依 --watch 或設定檔監看資料夾；未指定時回傳 None。"""
+    directory = args.watch or runner.settings.get("watch_folder")
+    if not directory:
+        return None
+    watcher = WatchFolder(
+        directory, runner.submit,
+        on_event=lambda event, name, detail: runner.printer.emit(
+            "watch_" + event, file=name, text=detail),
+        poll_interval=args.poll,
+    )
+    try:
+        watcher.start()
+    except OSError as e:
+        runner.printer.emit("error", text=f"無法監看資料夾 {directory}：{e}")
+        return None
+    runner.printer.emit("watch", directory=watcher.directory, mode=watcher.mode)
+    return watcher
+
+
+def _take_inbox(path: str) -> list:
+    """
+    取走 inbox 檔中的所有網址，依選項分組回傳 [(options, urls)]。
+    先將檔案改名再讀取，enqueue 之後寫入的內容會進入新的檔案；
+    上次中斷時留下的 .processing 檔會一併處理；格式錯誤的檔案改名為 .failed 保留。
+    """
+    processing = path + ".processing"
+    if not os.path.exists(processing):
+        try:
+            os.replace(path, processing)
+        except OSError:
+            return []
+    try:
+        with open(processing, "r", encoding="utf-8", errors="replace") as f:
+            groups = parse_url_entries(f.read())
+        os.remove(processing)
+    except ValueError as e:
+        print(f"inbox 格式錯誤（{e}），已改名為 {path}.failed", file=sys.stderr)
+        os.replace(processing, path + ".failed")
+        return []
+    except OSError:
+        return []
+    return groups
+
+
+def _export_trace(args):
+    """將追蹤緩衝區匯出到 --trace 指定的檔案（daemon 在停止時匯出）。"""
+    printer = EventPrinter(text=args.output == "text")
+    try:
+        spans = TRACER.export(args.trace)
+    except OSError as e:
+        printer.emit("error", text=f"無法匯出追蹤：{e}")
+        return
+    printer.emit("trace", path=os.path.abspath(args.trace), spans=spans)
+
+
+# ─── 參數解析 ──────────────────────────────────────────────
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app", description="YouTube 下載器命令列模式")
+    parser.add_argument("--output", choices=("jsonl", "text"), default="jsonl",
+                        help="標準輸出格式（預設 JSON Lines）")
+    parser.add_argument("--ffmpeg", help="FFmpeg 路徑（預設使用設定檔或 PATH 中的 ffmpeg）")
+    parser.add_argument("--parallel", type=int, help="同時下載數量（1~4，預設使用設定檔）")
+    parser.add_argument("--ignore-windows", action="store_true",
+                        help="忽略設定的下載時段，立即開始下載")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="命令結束時將追蹤區段匯出為 Chrome trace-event JSON（Perfetto / chrome://tracing）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_url_args(p):
+        p.add_argument("urls", nargs="*", help="影片、播放清單或頻道網址")
+        p.add_argument("-f", "--file", action="append", help="從文字檔 / CSV 讀取網址（可重複指定）")
+
+    def add_job_args(p):
+        p.add_argument("-o", "--output-dir", help="下載目錄（預設使用設定檔）")
+        p.add_argument("--audio", action="store_true", help="下載音訊並轉為 MP3")
+        p.add_argument("--format", help="yt-dlp 格式字串（預設 1080p MP4）")
+        p.add_argument("--subtitle", help="字幕語言代碼，例如 zh-Hant、en")
+        p.add_argument("--priority", type=int, default=0, help="優先順序（越大越先下載）")
+
+    p = sub.add_parser("analyze", help="分析網址並輸出結果")
+    add_url_args(p)
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("download", help="下載網址中的影片")
+    add_url_args(p)
+    add_job_args(p)
+    p.set_defaults(func=cmd_download)
+
+    p = sub.add_parser("sync", help="下載尚未出現在歷史記錄中的影片")
+    add_url_args(p)
+    add_job_args(p)
+    p.set_defaults(func=cmd_sync)
+
+    p = sub.add_parser("history", help="查詢下載歷史")
+    p.add_argument("--limit", type=int, default=100)
+    p.add_argument("--offset", type=int, default=0)
+    p.add_argument("--stats", action="store_true", help="只輸出統計資訊")
+    p.add_argument("--search", metavar="QUERY", help="全文搜尋標題、網址、檔案路徑與錯誤訊息（依相關度排序）")
+    p.add_argument("--daily", action="store_true", help="輸出每日統計")
+    p.add_argument("--report", choices=("day", "channel"),
+                   help="依日期或頻道彙總各階段的平均耗時、重試次數與速度")
+    p.add_argument("--since", help="統計 / 封存搜尋的起始日期 YYYY-MM-DD（UTC，含當天）")
+    p.add_argument("--until", help="統計 / 封存搜尋的結束日期 YYYY-MM-DD（UTC，含當天）")
+    p.add_argument("--archive", action="store_true", help="立即將超過保存天數的記錄封存並從資料庫刪除")
+    p.add_argument("--retention-days", type=int, help="搭配 --archive，覆蓋設定檔的保存天數")
+    p.add_argument("--search-archive", metavar="QUERY",
+                   help="搜尋封存檔（每個詞都必須出現，不分大小寫；--limit 限制筆數）")
+    p.set_defaults(func=cmd_history)
+
+    p = sub.add_parser("enqueue", help="將網址交給執行中的 daemon")
+    add_url_args(p)
+    add_job_args(p)
+    p.add_argument("--sync", action="store_true", help="略過歷史記錄中已成功下載的影片")
+    p.add_argument("--inbox", default=INBOX_FILE)
+    p.set_defaults(func=cmd_enqueue)
+
+    p = sub.add_parser("windows", help="顯示下載時段與下次開始時間")
+    p.add_argument("--set", action="append", metavar="SPEC",
+                   help="取代為指定的時段（可重複），例如 \"22:00-06:00 days=1-5 workers=3 rate=2000\"")
+    p.add_argument("--clear", action="store_true", help="清除所有時段（隨時下載）")
+    p.set_defaults(func=cmd_windows)
+
+    p = sub.add_parser("daemon", help="常駐執行並消化下載佇列")
+    p.add_argument("--inbox", default=INBOX_FILE)
+    p.add_argument("--poll", type=float, default=2.0, help="檢查 inbox（與無 inotify 時監看資料夾）的間隔秒數")
+    p.add_argument("--watch", metavar="DIR", help="監看資料夾，自動取走放入的 .txt / .jsonl 網址清單檔")
+    p.add_argument("--api-port", type=int, help="啟用本機控制 API 並監聽此連接埠（127.0.0.1）")
+    p.add_argument("--api-token", help="控制 API 權杖（預設使用設定檔，未設定時臨時產生）")
+    p.add_argument("--metrics-port", type=int,
+                   help="在此連接埠（127.0.0.1）提供 Prometheus 格式的 /metrics（0 = 停用，預設使用設定檔）")
+    p.set_defaults(func=cmd_daemon)
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    finally:
+        if args.trace:
+            _export_trace(args)
@@ -14,6 +14,18 @@ DEFAULT_SETTINGS = {
     'delay': 5,
     'default_download_path': os.getcwd(),
     'parallel_downloads': 2,   # 並行下載數量（1 = 序列，2~4 = 並行）
+    'show_video_thumbnails': False,  # 頻道影片列表是否顯示縮圖欄
+    'speculative_analysis': True,    # 貼上網址時是否在背景預先分析
+    'batch_analysis_workers': 4,     # 批次網址同時分析的數量
+    'api_enabled': False,            # 是否啟用本機控制 API（只綁定 127.0.0.1）
+    'api_port': 8765,
+    'api_token': '',                 # 控制 API 權杖（首次啟用時自動產生）
+    'watch_folder': '',              # 監看資料夾（空白 = 不監看）
+    'download_windows': [],          # 下載時段（空白 = 隨時下載），見 download_windows.py
+    'history_retention_days': 0,     # 下載歷史保存天數（0 = 永久保存），過期記錄封存後刪除
+    'history_archive_dir': '',       # 歷史封存資料夾（空白 = yd_history_archive）
+    'metrics_port': 0,               # Prometheus 監控指標連接埠（只綁定 127.0.0.1，0 = 停用）
+    'trace_buffer_events': 20000,    # 追蹤環形緩衝區保留的區段數（0 = 停用追蹤）
 }
 
 
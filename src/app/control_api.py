@@ -0,0 +1,365 @@
+"""
+本機控制 API 模組 — 讓同一台機器上的其他工具以 HTTP/JSON 加入下載工作並讀取進度。
+伺服器只綁定 127.0.0.1，所有請求都必須帶上權杖；與 DownloadManager 執行於同一個行程，
+進度事件直接取自圖形介面訊息佇列所消化的同一組訊息，以 Server-Sent Events 串流輸出。
+
+端點（權杖以 Authorization: Bearer <token>、X-API-Token 標頭或 ?token= 參數提供）：
+    GET    /api/jobs                  佇列中的所有工作與各狀態數量
+    POST   /api/jobs                  加入網址 {"urls": [...], "audio", "format", "output_dir",
+                                      "subtitle", "priority", "sync", "wait"}
+    GET    /api/jobs/<id>             單一工作
+    POST   /api/jobs/<id>/<action>    cancel / pause / resume
+    DELETE /api/jobs/<id>             取消工作
+    GET    /api/events                進度事件串流（text/event-stream）
+    GET    /api/history?limit=&offset= 下載歷史（加上 q= 時為全文搜尋，依相關度排序）
+    GET    /api/history/stats?since=&until=  下載統計（日期為 YYYY-MM-DD，UTC）
+    GET    /api/history/daily?since=&until=  每日下載統計
+    GET    /api/history/report?by=day|channel&since=&until=  依日期或頻道彙總的階段耗時
+    GET    /api/trace                 追蹤緩衝區的 Chrome trace-event JSON（可存檔後以 Perfetto 開啟）
+無 UI 依賴（只使用標準函式庫的 http.server）。
+"""
+
+import hmac
+import json
+import queue
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from .batch import normalize_job_options
+from .tracing import TRACER
+
+API_HOST = "127.0.0.1"
+DEFAULT_API_PORT = 8765
+_LOCAL_HOSTS = frozenset({"127.0.0.1", "localhost", "[::1]"})
+
+
+def generate_token() -> str:
+    """產生新的 API 權杖。"""
+    return secrets.token_urlsafe(24)
+
+
+class EventHub:
+    """
+    將訊息佇列中的訊息分送給所有事件串流連線。
+    publish() 在放入訊息的執行緒上呼叫，只做型別過濾與非阻塞放入；
+    訂閱者的緩衝區已滿時直接丟棄（工作狀態會在下一次變動時重新比對，不會遺失）。
+    """
+
+    # 對外串流的訊息類型（其餘如縮圖、格式列表只對圖形介面有意義）
+    STREAM_TYPES = frozenset({"log", "status", "error", "success", "video_title", "jobs_changed",
+                              "history_changed"})
+
+    def __init__(self, max_backlog: int = 1000):
+        self.max_backlog = max_backlog
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self.dropped = 0
+
+    def subscribe(self) -> queue.Queue:
+        q = queue.Queue(maxsize=self.max_backlog)
+        with self._lock:
+            self._subscribers = self._subscribers + [q]
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s is not q]
+
+    def publish(self, msg: dict):
+        if msg.get("type") not in self.STREAM_TYPES:
+            return
+        for q in self._subscribers:    # 訂閱列表以複製後替換的方式更新，此處不需加鎖
+            try:
+                q.put_nowait(msg)
+            except queue.Full:
+                self.dropped += 1
+
+    def close(self):
+        """通知所有串流連線結束。"""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for q in subscribers:
+            try:
+                q.put_nowait(None)
+            except queue.Full:
+                pass
+
+
+class ControlServer:
+    """
+    本機控制 API 伺服器。
+
+    submit(urls, options) 在背景執行緒上分析網址並把工作加入 scheduler，回傳加入的工作列表；
+    history 為 DownloadHistory。start() 之後在背景執行緒上服務請求，stop() 關閉伺服器。
+    """
+
+    HEARTBEAT = 15.0            # 事件串流沒有訊息時送出註解行的間隔（秒）
+    PROGRESS_INTERVAL = 0.5     # 同一工作的進度事件最短間隔（秒）
+    MAX_BODY = 1024 * 1024
+
+    def __init__(self, scheduler, history, submit, token: str,
+                 port: int = DEFAULT_API_PORT, host: str = API_HOST):
+        if not token:
+            raise ValueError("控制 API 需要權杖")
+        self.scheduler = scheduler
+        self.history = history
+        self.submit = submit
+        self.token = token
+        self.hub = EventHub()
+        self._closing = threading.Event()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.control = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def publish(self, msg: dict):
+        """訊息佇列的分接點：把訊息交給事件串流（可在任何執行緒呼叫）。"""
+        self.hub.publish(msg)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="control-api", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._closing.set()
+        self.hub.close()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    # ─── 請求處理（由 _Handler 在連線執行緒上呼叫）──────────
+
+    def authorized(self, headers, query: dict) -> bool:
+        supplied = ""
+        auth = headers.get("Authorization", "")
+        if auth.startswith("Bearer "):
+            supplied = auth[len("Bearer "):].strip()
+        supplied = supplied or headers.get("X-API-Token", "") or query.get("token", [""])[0]
+        return hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def list_jobs(self) -> dict:
+        return {"jobs": [job.to_dict() for job in self.scheduler.jobs()],
+                "counts": self.scheduler.counts()}
+
+    def enqueue(self, body: dict) -> tuple:
+        """回傳 (HTTP 狀態碼, 回應內容)。預設在背景分析網址並立即回應 202。"""
+        urls = body.get("urls") or ([body["url"]] if body.get("url") else [])
+        if not isinstance(urls, list) or not all(isinstance(u, str) for u in urls) or not urls:
+            return 400, {"error": "需要 urls（網址字串列表）或 url"}
+        options = normalize_job_options(body)
+        urls = list(dict.fromkeys(urls))
+        if body.get("wait"):
+            jobs = self.submit(urls, options)
+            return 201, {"jobs": [job.to_dict() for job in jobs]}
+        threading.Thread(target=self.submit, args=(urls, options),
+                         name="control-api-submit", daemon=True).start()
+        return 202, {"accepted": len(urls)}
+
+    def job_action(self, job_id: int, action: str) -> tuple:
+        if self.scheduler.get(job_id) is None:
+            return 404, {"error": f"找不到工作 {job_id}"}
+        handlers = {"cancel": (self.scheduler.cancel, "取消"), "pause": (self.scheduler.pause, "暫停"),
+                    "resume": (self.scheduler.resume, "繼續")}
+        if action not in handlers:
+            return 404, {"error": f"未知的動作：{action}"}
+        handler, label = handlers[action]
+        if not handler(job_id):
+            return 409, {"error": f"工作 {job_id} 目前的狀態無法{label}",
+                         "job": self.scheduler.get(job_id).to_dict()}
+        return 200, {"job": self.scheduler.get(job_id).to_dict()}
+
+    def stream_events(self, write) -> None:
+        """
+        以 write(bytes) 送出事件直到連線中斷或伺服器關閉。
+        同一批內的工作變動合併處理：狀態改變的工作各送一個 job 事件，
+        進度事件每個工作最多每 PROGRESS_INTERVAL 秒一次。
+        """
+        q = self.hub.subscribe()
+        states = {job.id: job.state for job in self.scheduler.jobs()}
+        last_progress = {}
+        try:
+            write(_sse("hello", self.list_jobs()))
+            while not self._closing.is_set():
+                try:
+                    batch = [q.get(timeout=self.HEARTBEAT)]
+                except queue.Empty:
+                    write(b": keepalive\n\n")
+                    continue
+                while len(batch) < q.maxsize:
+                    try:
+                        batch.append(q.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    return
+                write(b"".join(self._encode_batch(batch, states, last_progress)))
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+        finally:
+            self.hub.unsubscribe(q)
+
+    def _encode_batch(self, batch: list, states: dict, last_progress: dict) -> list:
+        chunks = []
+        state_check = False
+        progress_jobs = {}
+        for msg in batch:
+            if msg["type"] != "jobs_changed":
+                chunks.append(_sse(msg["type"], {k: v for k, v in msg.items() if k != "type"}))
+            elif msg.get("job_id") is None:
+                state_check = True
+            else:
+                progress_jobs[msg["job_id"]] = True
+
+        if state_check:
+            for job in self.scheduler.jobs():
+                if states.get(job.id) != job.state:
+                    states[job.id] = job.state
+                    chunks.append(_sse("job", job.to_dict()))
+        now = time.monotonic()
+        for job_id in progress_jobs:
+            job = self.scheduler.get(job_id)
+            if job is None:
+                continue
+            if job.progress < 100 and now - last_progress.get(job_id, 0) < self.PROGRESS_INTERVAL:
+                continue
+            last_progress[job_id] = now
+            chunks.append(_sse("progress", {"id": job_id, "state": job.state,
+                                            "progress": round(job.progress, 1)}))
+        return chunks
+
+
+def _host_name(host_header: str) -> str:
+    """自 Host 標頭去除連接埠（保留 IPv6 位址的方括號）。"""
+    if host_header.startswith("["):
+        return host_header.split("]", 1)[0] + "]"
+    return host_header.rsplit(":", 1)[0]
+
+
+def _sse(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n".encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """將 HTTP 請求轉交給 ControlServer；所有回應都是 JSON（事件串流除外）。"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "YouTubeDownloaderAPI/1.0"
+
+    def log_message(self, format, *args):
+        pass    # 不寫到 stderr（命令列模式的結構化輸出不被干擾）
+
+    @property
+    def control(self) -> ControlServer:
+        return self.server.control
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        parts = [p for p in parsed.path.split("/") if p]
+        # 拒絕非本機名稱的 Host，避免 DNS rebinding 讓瀏覽器頁面連到本機 API
+        if _host_name(self.headers.get("Host") or "") not in _LOCAL_HOSTS:
+            return self._send(403, {"error": "只接受本機連線"})
+        if not self.control.authorized(self.headers, query):
+            return self._send(401, {"error": "權杖錯誤或未提供"})
+        if not parts or parts[0] != "api":
+            return self._send(404, {"error": "找不到路徑"})
+        try:
+            self._route(method, parts[1:], query)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+
+    def _route(self, method: str, parts: list, query: dict):
+        control = self.control
+        if parts == ["jobs"] and method == "GET":
+            return self._send(200, control.list_jobs())
+        if parts == ["jobs"] and method == "POST":
+            return self._send(*control.enqueue(self._read_json()))
+        if len(parts) >= 2 and parts[0] == "jobs":
+            job_id = int(parts[1])
+            if len(parts) == 2 and method == "GET":
+                job = control.scheduler.get(job_id)
+                if job is None:
+                    return self._send(404, {"error": f"找不到工作 {job_id}"})
+                return self._send(200, {"job": job.to_dict()})
+            if len(parts) == 2 and method == "DELETE":
+                return self._send(*control.job_action(job_id, "cancel"))
+            if len(parts) == 3 and method == "POST":
+                return self._send(*control.job_action(job_id, parts[2]))
+        if parts == ["events"] and method == "GET":
+            return self._stream()
+        if parts == ["history"] and method == "GET":
+            # SQLite 的 LIMIT -1 表示不限筆數：限制在 1~1000，offset 不可為負
+            limit = max(1, min(int(query.get("limit", ["100"])[0]), 1000))
+            offset = max(0, int(query.get("offset", ["0"])[0]))
+            if query.get("q", [""])[0].strip():
+                return self._send(200, {"records": control.history.search(query["q"][0], limit=limit)})
+            return self._send(200, {"records": control.history.get_all(limit=limit, offset=offset)})
+        if parts[:1] == ["history"] and len(parts) == 2 and method == "GET":
+            since = query.get("since", [None])[0]
+            until = query.get("until", [None])[0]
+            if parts[1] == "stats":
+                return self._send(200, control.history.get_stats(since=since, until=until))
+            if parts[1] == "daily":
+                return self._send(200, {"days": control.history.get_daily_stats(since=since, until=until)})
+            if parts[1] == "report":
+                group_by = query.get("by", ["day"])[0]
+                return self._send(200, {"by": group_by, "groups": control.history.get_timing_report(
+                    group_by, since=since, until=until)})
+        if parts == ["trace"] and method == "GET":
+            return self._send(200, TRACER.trace())
+        self._send(404, {"error": "找不到路徑"})
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > self.control.MAX_BODY:
+            raise ValueError("請求內容過大")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON 格式錯誤：{e}")
+        if not isinstance(body, dict):
+            raise ValueError("請求內容必須是 JSON 物件")
+        return body
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def write(data: bytes):
+            self.wfile.write(data)
+            self.wfile.flush()
+
+        self.control.stream_events(write)
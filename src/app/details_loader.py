@@ -0,0 +1,106 @@
+"""
+影片詳細資訊載入模組 — 以單一背景執行緒處理「最新請求優先」的詳細資訊擷取。
+每次請求都有遞增的世代編號：排隊中的舊請求直接被取代，執行中的舊請求結果會被丟棄，
+已擷取過的網址由 LRU 快取立即回傳。
+純邏輯模組，無 UI 依賴，可獨立單元測試。
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class DetailsLoader:
+    """
+    fetch(url) 為實際的擷取函數（例如 DownloadManager.fetch_video_details）。
+    callback(generation, url, details, error) 可能在工作執行緒或呼叫端執行緒上被呼叫，
+    呼叫端應再以 generation == loader.generation 確認結果仍為最新。
+    """
+
+    def __init__(self, fetch, cache_size: int = 128):
+        self._fetch = fetch
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._latest = None         # (generation, url, callback)：最新一次請求
+        self._pending_url = None    # 等待工作執行緒處理的網址（只保留最新一筆）
+        self._running_url = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="details-loader", daemon=True)
+        self._thread.start()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def request(self, url: str, callback) -> int:
+        """要求載入 url 的詳細資訊，回傳此請求的世代編號。"""
+        with self._cond:
+            self._generation += 1
+            generation = self._generation
+            self._latest = (generation, url, callback)
+            cached = self._cache.get(url)
+            if cached is not None:
+                self._cache.move_to_end(url)
+                self._pending_url = None
+            elif url == self._running_url:
+                self._pending_url = None    # 執行中的擷取完成後會交付給這次請求
+            else:
+                self._pending_url = url
+                self._cond.notify()
+        if cached is not None:
+            callback(generation, url, cached, None)
+        return generation
+
+    def has(self, url: str) -> bool:
+        """回傳 url 是否已在快取中或正在擷取（可直接等待其結果）。"""
+        with self._cond:
+            return url in self._cache or url == self._running_url
+
+    def discard(self, url: str):
+        """自快取移除 url（結果只應使用一次時呼叫）。"""
+        with self._cond:
+            self._cache.pop(url, None)
+
+    def cancel(self):
+        """使所有排隊中與執行中的請求失效。"""
+        with self._cond:
+            self._generation += 1
+            self._latest = None
+            self._pending_url = None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending_url = None
+            self._cond.notify()
+
+    # ─── 背景執行緒 ────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending_url is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                url, self._pending_url = self._pending_url, None
+                self._running_url = url
+
+            details, error = None, None
+            try:
+                details = self._fetch(url)
+            except Exception as e:
+                error = e
+
+            with self._cond:
+                self._running_url = None
+                if details is not None:
+                    self._cache[url] = details
+                    self._cache.move_to_end(url)
+                    while len(self._cache) > self._cache_size:
+                        self._cache.popitem(last=False)
+                latest = self._latest
+            # 只交付給仍在等待此網址的最新請求；其餘結果僅留在快取中
+            if latest is not None and latest[1] == url:
+                latest[2](latest[0], url, details, error)
@@ -0,0 +1,267 @@
+"""
+離峰時段模組 — 只在設定的時段內開始下載，並可為每個時段指定同時下載數量與頻寬上限。
+時段結束時執行中的下載以暫停方式中止（保留 .part 檔）並重新排隊，下一個時段開始時續傳。
+時段以一行文字描述，例如「22:00-06:00 days=1-5 workers=3 rate=2000」（跨午夜的時段屬於開始的那一天）。
+純邏輯模組，無 UI 依賴，可獨立單元測試。
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+DAY_NAMES = ("", "週一", "週二", "週三", "週四", "週五", "週六", "週日")   # ISO 星期 1~7
+_TIME_RE = re.compile(r"^([01]?\d|2[0-3]):([0-5]\d)$")
+
+
+@dataclass
+class DownloadWindow:
+    """單一下載時段。start == end 表示全天。"""
+    start: str = "01:00"                            # HH:MM
+    end: str = "07:00"                              # HH:MM，小於等於 start 時跨午夜
+    days: list = field(default_factory=list)        # ISO 星期（1 = 週一 … 7 = 週日），空白表示每天
+    max_workers: int = 0                            # 時段內同時下載數量，0 表示沿用設定
+    rate_limit_kb: int = 0                          # 時段內所有下載合計的頻寬上限（KB/s），0 表示不限制
+
+    def to_dict(self) -> dict:
+        return {"start": self.start, "end": self.end, "days": list(self.days),
+                "max_workers": self.max_workers, "rate_limit_kb": self.rate_limit_kb}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DownloadWindow":
+        window = cls(start=str(data.get("start", "01:00")), end=str(data.get("end", "07:00")),
+                     days=sorted({int(d) for d in data.get("days", [])}),
+                     max_workers=int(data.get("max_workers", 0)),
+                     rate_limit_kb=int(data.get("rate_limit_kb", 0)))
+        window.validate()
+        return window
+
+    def validate(self):
+        for value in (self.start, self.end):
+            if not _TIME_RE.match(value):
+                raise ValueError(f"時間格式應為 HH:MM：{value!r}")
+        if any(d < 1 or d > 7 for d in self.days):
+            raise ValueError("星期必須是 1（週一）到 7（週日）")
+        if not 0 <= self.max_workers <= 4:
+            raise ValueError("workers 必須是 0~4")
+        if self.rate_limit_kb < 0:
+            raise ValueError("rate 不可為負數")
+
+    def occurrences(self, around: datetime) -> list:
+        """回傳 around 前一天到之後七天內，此時段每次開放的 [(開始, 結束)]。"""
+        start_h, start_m = map(int, self.start.split(":"))
+        end_h, end_m = map(int, self.end.split(":"))
+        result = []
+        base = around.replace(hour=0, minute=0, second=0, microsecond=0)
+        for offset in range(-1, 8):
+            day = base + timedelta(days=offset)
+            if self.days and day.isoweekday() not in self.days:
+                continue
+            begin = day.replace(hour=start_h, minute=start_m)
+            finish = day.replace(hour=end_h, minute=end_m)
+            if finish <= begin:
+                finish += timedelta(days=1)
+            result.append((begin, finish))
+        return result
+
+    def spec(self) -> str:
+        """轉為設定視窗中使用的一行文字。"""
+        parts = [f"{self.start}-{self.end}"]
+        if self.days:
+            parts.append("days=" + ",".join(str(d) for d in self.days))
+        if self.max_workers:
+            parts.append(f"workers={self.max_workers}")
+        if self.rate_limit_kb:
+            parts.append(f"rate={self.rate_limit_kb}")
+        return " ".join(parts)
+
+
+def parse_window_spec(line: str) -> DownloadWindow:
+    """
+    解析「HH:MM-HH:MM [days=1-5|6,7] [workers=N] [rate=KB/s]」格式的一行文字。
+    格式錯誤時拋出 ValueError。
+    """
+    tokens = line.split()
+    if not tokens or "-" not in tokens[0]:
+        raise ValueError(f"時段應以 HH:MM-HH:MM 開頭：{line!r}")
+    start, end = tokens[0].split("-", 1)
+    window = DownloadWindow(start=start, end=end)
+    for token in tokens[1:]:
+        key, _, value = token.partition("=")
+        try:
+            if key == "days":
+                days = set()
+                for part in value.split(","):
+                    low, _, high = part.partition("-")
+                    days.update(range(int(low), int(high or low) + 1))
+                window.days = sorted(days)
+            elif key == "workers":
+                window.max_workers = int(value)
+            elif key == "rate":
+                window.rate_limit_kb = int(value)
+            else:
+                raise ValueError(f"未知的選項：{key}")
+        except ValueError as e:
+            raise ValueError(f"{token}：{e}") from None
+    window.validate()
+    return window
+
+
+def parse_window_specs(text: str) -> list:
+    """解析多行時段文字（空行與 # 註解略過）。"""
+    return [parse_window_spec(line) for line in text.splitlines()
+            if line.strip() and not line.strip().startswith("#")]
+
+
+def load_windows(items: list) -> list:
+    """從設定檔的 download_windows 列表建立時段；格式錯誤的項目略過。"""
+    windows = []
+    for item in items or []:
+        try:
+            windows.append(DownloadWindow.from_dict(item))
+        except (ValueError, TypeError, AttributeError):
+            continue
+    return windows
+
+
+class WindowSchedule:
+    """一組下載時段；沒有任何時段時表示不限制（隨時可下載）。"""
+
+    def __init__(self, windows: list = None):
+        self.windows = list(windows or [])
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.windows)
+
+    def active(self, now: datetime):
+        """回傳 (目前開放的時段, 結束時間)；不在任何時段內時回傳 (None, None)。"""
+        best = (None, None)
+        for window in self.windows:
+            for begin, finish in window.occurrences(now):
+                if begin <= now < finish and (best[1] is None or finish > best[1]):
+                    best = (window, finish)
+        return best
+
+    def next_start(self, now: datetime):
+        """回傳 now 之後最近一次時段開始的時間（目前所在的時段除外）；未啟用時回傳 None。"""
+        starts = [begin for window in self.windows
+                  for begin, _ in window.occurrences(now) if begin > now]
+        return min(starts, default=None)
+
+    def next_change(self, now: datetime):
+        """回傳 now 之後最近一個時段邊界（開始或結束）。"""
+        edges = [edge for window in self.windows
+                 for occurrence in window.occurrences(now) for edge in occurrence if edge > now]
+        return min(edges, default=None)
+
+
+def window_state(schedule: WindowSchedule, now: datetime) -> dict:
+    """
+    回傳時段狀態：enabled、open（目前可下載）、window（目前的 DownloadWindow）、
+    ends_at（目前時段結束時間）、next_start（下次時段開始時間）。
+    """
+    if not schedule.enabled:
+        return {"enabled": False, "open": True, "window": None, "ends_at": None, "next_start": None}
+    window, ends_at = schedule.active(now)
+    return {"enabled": True, "open": window is not None, "window": window,
+            "ends_at": ends_at, "next_start": schedule.next_start(now)}
+
+
+def format_time(moment: datetime, now: datetime) -> str:
+    """今天只顯示時間，其他日子加上日期與星期。"""
+    if moment.date() == now.date():
+        return moment.strftime("%H:%M")
+    return f"{moment.strftime('%m/%d')}（{DAY_NAMES[moment.isoweekday()]}）{moment.strftime('%H:%M')}"
+
+
+class WindowController:
+    """
+    依時段開關排程器（JobScheduler.set_gate）並設定下載引擎的頻寬上限（DownloadManager.rate_limit）。
+    背景執行緒只在下一個時段邊界或設定變更時醒來；on_change(state) 在每次套用後呼叫。
+    """
+
+    MAX_SLEEP = 300.0       # 最長睡眠秒數（系統休眠或調整時鐘後能在合理時間內修正）
+
+    def __init__(self, scheduler, manager, windows: list = None, on_change=None, clock=datetime.now):
+        self._scheduler = scheduler
+        self._manager = manager
+        self._schedule = WindowSchedule(windows)
+        self._on_change = on_change
+        self._clock = clock
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._state = window_state(self._schedule, clock())
+        self._thread = None
+
+    @property
+    def schedule(self) -> WindowSchedule:
+        return self._schedule
+
+    def state(self) -> dict:
+        """最近一次套用的狀態（見 window_state）。"""
+        with self._lock:
+            return dict(self._state)
+
+    def start(self):
+        """先同步套用一次（避免啟動時在時段外的工作被開始），再啟動背景執行緒。"""
+        self.apply()
+        self._thread = threading.Thread(target=self._run, name="download-windows", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def configure(self, windows: list):
+        """更換時段設定並立即套用。"""
+        self._schedule = WindowSchedule(windows)
+        if self._thread is None:
+            self.apply()
+        else:
+            self._wakeup.set()
+
+    def apply(self) -> dict:
+        state = window_state(self._schedule, self._clock())
+        window = state["window"]
+        workers = (window.max_workers or None) if window else None
+        self._scheduler.set_gate(state["open"], workers)
+        limit = window.rate_limit_kb if window else 0
+        # 頻寬上限由時段內同時進行的下載平分（yt-dlp 的 ratelimit 以單一下載為單位）
+        self._manager.rate_limit = limit * 1024 // (workers or self._scheduler.max_workers) if limit else 0
+        with self._lock:
+            self._state = state
+        if self._on_change:
+            self._on_change(state)
+        return state
+
+    def _run(self):
+        while True:
+            change = self._schedule.next_change(self._clock())
+            timeout = self.MAX_SLEEP
+            if change is not None:
+                timeout = min(timeout, max(0.5, (change - self._clock()).total_seconds()))
+            self._wakeup.wait(timeout if self._schedule.enabled else None)
+            self._wakeup.clear()
+            if self._stopped:
+                return
+            self.apply()
+
+
+def describe_state(state: dict, now: datetime) -> str:
+    """將 WindowController.state() 轉為顯示文字；未啟用時回傳空字串。"""
+    if not state.get("enabled"):
+        return ""
+    if state["open"]:
+        window = state["window"]
+        extras = []
+        if window.max_workers:
+            extras.append(f"同時 {window.max_workers} 個")
+        if window.rate_limit_kb:
+            extras.append(f"限速 {window.rate_limit_kb} KB/s")
+        suffix = "，" + "，".join(extras) if extras else ""
+        return f"下載時段進行中（至 {format_time(state['ends_at'], now)}{suffix}）"
+    if state["next_start"] is None:
+        return "不在下載時段內"
+    return f"等待下載時段：下次開始 {format_time(state['next_start'], now)}"
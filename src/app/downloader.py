@@ -1,6 +1,8 @@
 """
 下載引擎模組 — 封裝所有 yt-dlp 相關操作。
-包含：網址分析、格式解析、字幕提取、單一/批次/並行下載。
+包含：網址分析、格式解析、字幕提取、單一影片/音訊下載（批次與並行下載由 jobs.JobScheduler 逐一呼叫 run_job）。
+傳輸位元組、重試、HTTP 429、擷取延遲與 FFmpeg 時間記錄在 metrics 模組的指標中；
+網址分析、extract_info、ydl.download、後處理器與重試等待另記錄為 tracing 模組的時間區段。
 """
 
 import os
@@ -10,12 +12,66 @@ import time
 import queue
 import threading
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from operator import itemgetter
 
 import yt_dlp
 
+from . import metrics
+from .job_timing import SUBTITLE_EXTS, JobTimings
+from .jobs import CancelToken, JobInterrupted
+from .tracing import TRACER
 from .utils import YtdlpLogger, simplify_codec
+from .video_index import entry_meta
+
+
+_thread_state = threading.local()
+
+
+def _error_class(error: Exception) -> str:
+    """將 yt-dlp 的錯誤歸類（重試指標的標籤）；yt-dlp 的例外幾乎都是 DownloadError，只能依訊息判斷。"""
+    text = str(error).lower()
+    if '429' in text or 'too many requests' in text:
+        return "rate_limited"
+    if 'http error 403' in text or 'forbidden' in text:
+        return "forbidden"
+    if re.search(r'http error 5\d\d', text):
+        return "server_error"
+    if 'subtitle' in text:
+        return "subtitle"
+    if any(word in text for word in ('timed out', 'timeout', 'connection', 'network',
+                                     'temporary failure', 'getaddrinfo')):
+        return "network"
+    if 'ffmpeg' in text or 'postprocess' in text:
+        return "postprocess"
+    return "other"
+
+
+class _DownloadInterrupted(yt_dlp.utils.DownloadCancelled):
+    """由進度/後處理回呼拋出，讓 yt-dlp 立即中止目前的下載。"""
+
+
+def _install_process_tracking():
+    """
+    讓 yt-dlp 啟動的子行程（FFmpeg 合併/轉檔、外部下載器）登記到目前執行緒的取消權杖，
+    取消時可直接終止子行程，而不必等 FFmpeg 跑完。
+    """
+    popen_cls = getattr(yt_dlp.utils, "Popen", None)
+    if popen_cls is None or getattr(popen_cls, "_cancel_tracking", False):
+        return
+    original_init = popen_cls.__init__
+
+    def __init__(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        token = getattr(_thread_state, "cancel_token", None)
+        if token is not None:
+            token.register_process(self)
+
+    popen_cls.__init__ = __init__
+    popen_cls._cancel_tracking = True
+
+
+_install_process_tracking()
 
 
 class DownloadManager:
@@ -28,6 +84,9 @@ class DownloadManager:
         self.retry_delay = retry_delay
         self.parallel_downloads = max(1, min(parallel_downloads, 4))
         self.queue = msg_queue
+        self.rate_limit = 0     # 單一下載的頻寬上限（bytes/s），0 表示不限制；由下載時段設定
+        self._bytes_seen = {}       # 下載中的檔案 → 上次回報的 downloaded_bytes（傳輸位元組指標）
+        self._pp_started = {}       # (執行緒, 後處理器) → 開始時間（FFmpeg 時間指標與追蹤區段）
 
     @property
     def _base_ydl_opts(self) -> dict:
@@ -63,12 +122,18 @@ class DownloadManager:
 
     # ─── 網址分析 ──────────────────────────────────────────
 
-    def analyze_url(self, url: str) -> dict:
+    def analyze_url(self, url: str, quiet: bool = False) -> dict:
         """
         分析網址，自動判別單一影片 / 頻道 / 播放清單。
         回傳 dict 包含 type, title, thumbnail_url, formats, subtitles, videos 等。
+        quiet=True 時不輸出任何日誌（用於背景預先分析）。
         """
-        logger = YtdlpLogger(self.queue)
+        with TRACER.span("analyze_url", "analyze", url=url):
+            return self._analyze_url(url, quiet)
+
+    def _analyze_url(self, url: str, quiet: bool) -> dict:
+        logger = YtdlpLogger(None if quiet else self.queue)
+        log = (lambda text: None) if quiet else self._put_log
         result = {"type": "unknown"}
 
         try:
@@ -79,37 +144,40 @@ class DownloadManager:
 
             # ── 頻道網址 → 轉換為上傳列表 ──
             if is_channel_url and not is_playlist_url:
-                self._put_log("偵測到頻道網址，正在嘗試轉換為穩定的上傳列表...")
+                log("偵測到頻道網址，正在嘗試轉換為穩定的上傳列表...")
                 try:
                     with yt_dlp.YoutubeDL({**self._base_ydl_opts, 'quiet': True, 'logger': logger}) as ydl:
-                        info = ydl.extract_info(url, download=False, process=False)
+                        info = self._extract_info(ydl, url, "analyze", process=False)
                         channel_id = info.get('channel_id') or info.get('id')
                     if not channel_id or not channel_id.startswith('UC'):
                         raise yt_dlp.utils.DownloadError("無法從網址解析有效的頻道 ID (UC...)")
                     uploads_playlist_id = 'UU' + channel_id[2:]
                     url_to_fetch = f'https://www.youtube.com/playlist?list={uploads_playlist_id}'
-                    self._put_log(f"成功轉換！正在掃描上傳列表：{url_to_fetch}")
+                    log(f"成功轉換！正在掃描上傳列表：{url_to_fetch}")
                     is_playlist_like = True
                 except Exception as e:
-                    self._put_log(f"警告：無法自動轉換為上傳列表 ({e})。")
-                    self._put_log("將回退至直接掃描影片分頁，此方法可能不穩定。")
+                    self._note_error(e)
+                    log(f"警告：無法自動轉換為上傳列表 ({e})。")
+                    log("將回退至直接掃描影片分頁，此方法可能不穩定。")
                     url_to_fetch = url.rstrip('/') + '/videos'
                     is_playlist_like = True
 
             elif is_playlist_url:
-                self._put_log("偵測到播放列表網址，正在掃描...")
+                log("偵測到播放列表網址，正在掃描...")
                 is_playlist_like = True
 
             # ── 播放清單／頻道 ──
             if is_playlist_like:
                 ydl_opts = {**self._base_ydl_opts, 'extract_flat': True, 'noplaylist': False, 'logger': logger}
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url_to_fetch, download=False)
+                    info = self._extract_info(ydl, url_to_fetch, "analyze")
 
                 result["type"] = "playlist"
                 result["title"] = info.get('title', '未知標題')
                 result["thumbnail_url"] = info.get('thumbnail')
-                result["videos"] = self._extract_videos(info)
+                entries = self._video_entries(info)
+                result["videos"] = self._extract_videos(entries)
+                result["video_meta"] = [entry_meta(entry) for entry in entries]
                 result["video_count"] = len(result["videos"])
 
             # ── 單一影片 ──
@@ -120,9 +188,9 @@ class DownloadManager:
                     'noplaylist': True,
                     'logger': logger,
                 }
-                self._put_log("偵測到單一影片網址，正在獲取詳細資訊...")
+                log("偵測到單一影片網址，正在獲取詳細資訊...")
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url_to_fetch, download=False)
+                    info = self._extract_info(ydl, url_to_fetch, "analyze")
 
                 result["type"] = "single"
                 result["title"] = info.get('title', '未知標題')
@@ -133,8 +201,10 @@ class DownloadManager:
             return result
 
         except yt_dlp.utils.DownloadError as e:
+            self._note_error(e)
             raise RuntimeError(f"分析錯誤: {e.msg}") from e
         except Exception as e:
+            self._note_error(e)
             raise RuntimeError(f"發生未預期錯誤: {e}") from e
 
     def fetch_video_details(self, url: str) -> dict:
@@ -145,8 +215,12 @@ class DownloadManager:
             'ffmpeg_location': self.ffmpeg_path,
             'noplaylist': True,
         }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = self._extract_info(ydl, url, "details")
+        except Exception as e:
+            self._note_error(e)
+            raise
 
         return {
             "title": info.get('title', ''),
@@ -158,11 +232,15 @@ class DownloadManager:
 
     def download_video(self, url: str, format_id: str, has_audio: bool,
                        output_dir: str, subtitle_lang: str = None,
-                       height: int = 0) -> str:
+                       height: int = 0, progress_hooks: list = None,
+                       cancel_token: CancelToken = None, timings: JobTimings = None) -> str:
         """
         下載單一影片。
-        回傳下載完成的檔案路徑。
+        回傳下載完成的檔案路徑。progress_hooks 為額外的 yt-dlp 進度回呼；
+        cancel_token 被觸發時中止下載（保留 .part 檔）並拋出 JobInterrupted；
+        timings（JobTimings）累計各階段花費的時間。
         """
+        timings = timings or JobTimings()
         format_str = format_id
         if not has_audio:
             format_str += "+bestaudio[ext=m4a]/bestaudio"
@@ -181,7 +259,8 @@ class DownloadManager:
             'ffmpeg_location': self.ffmpeg_path,
             'quiet': True,
             'no_warnings': True,
-            'progress_hooks': [self._progress_hook],
+            'progress_hooks': [self._progress_hook, timings.progress_hook, *(progress_hooks or [])],
+            'postprocessor_hooks': [self._postprocessor_hook, timings.postprocessor_hook],
             'sleep_subtitles': 2,
             'sleep_interval_requests': 1,
         }
@@ -192,64 +271,77 @@ class DownloadManager:
                 'subtitleslangs': [subtitle_lang],
                 'subtitlesformat': 'vtt',
             })
+        if self.rate_limit:
+            ydl_opts['ratelimit'] = self.rate_limit
+        self._add_cancel_hooks(ydl_opts, cancel_token)
 
         last_exception = None
-        for attempt in range(self.retries + 1):
-            try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([url])
-                if attempt > 0:
-                    self._put_log("重試成功。")
-                # 嘗試取得實際檔案路徑
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                return ydl.prepare_filename(info)
-            except Exception as e:
-                last_exception = e
-                error_str = str(e).lower()
-                # 若為字幕相關錯誤，嘗試不下載字幕完成影片下載
-                if subtitle_lang and (
-                    'subtitle' in error_str
-                    or 'unable to download' in error_str
-                    or '429' in error_str
-                ):
-                    self._put_log("字幕下載失敗，改為不下載字幕重試...")
-                    try:
-                        ydl_opts_no_subs = {
-                            k: v for k, v in ydl_opts.items()
-                            if k not in (
-                                'writesubtitles', 'writeautomaticsub',
-                                'subtitleslangs', 'subtitlesformat',
-                            )
-                        }
-                        with yt_dlp.YoutubeDL(ydl_opts_no_subs) as ydl:
-                            ydl.download([url])
-                        self._put_log("影片下載成功，但字幕已略過。")
-                        with yt_dlp.YoutubeDL(ydl_opts_no_subs) as ydl:
-                            info = ydl.extract_info(url, download=False)
-                        return ydl.prepare_filename(info)
-                    except Exception as e2:
-                        last_exception = e2
-
-                if attempt < self.retries:
-                    self._put_log(
-                        f"影片下載嘗試失敗。將在 {self.retry_delay} 秒後進行"
-                        f"第 {attempt + 1}/{self.retries} 次重試..."
-                    )
-                    time.sleep(self.retry_delay)
-                else:
-                    self._put_log("所有重試均告失敗。")
+        with self._cancel_scope(cancel_token):
+            for attempt in range(self.retries + 1):
+                try:
+                    self._run_download(ydl_opts, url, timings, attempt=attempt)
+                    if attempt > 0:
+                        self._put_log("重試成功。")
+                    # 嘗試取得實際檔案路徑
+                    with timings.extracting(), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                        info = self._extract_info(ydl, url, "resolve")
+                    timings.note_info(info)
+                    return ydl.prepare_filename(info)
+                except Exception as e:
+                    self._raise_if_interrupted(cancel_token, e)
+                    last_exception = e
+                    error_class = self._note_error(e)
+                    error_str = str(e).lower()
+                    # 若為字幕相關錯誤，嘗試不下載字幕完成影片下載
+                    if subtitle_lang and (
+                        'subtitle' in error_str
+                        or 'unable to download' in error_str
+                        or '429' in error_str
+                    ):
+                        self._put_log("字幕下載失敗，改為不下載字幕重試...")
+                        metrics.RETRIES.labels(error_class).inc()
+                        try:
+                            ydl_opts_no_subs = {
+                                k: v for k, v in ydl_opts.items()
+                                if k not in (
+                                    'writesubtitles', 'writeautomaticsub',
+                                    'subtitleslangs', 'subtitlesformat',
+                                )
+                            }
+                            self._run_download(ydl_opts_no_subs, url, timings,
+                                               attempt=attempt, subtitles=False)
+                            self._put_log("影片下載成功，但字幕已略過。")
+                            with timings.extracting(), yt_dlp.YoutubeDL(ydl_opts_no_subs) as ydl:
+                                info = self._extract_info(ydl, url, "resolve")
+                            timings.note_info(info)
+                            return ydl.prepare_filename(info)
+                        except Exception as e2:
+                            self._raise_if_interrupted(cancel_token, e2)
+                            last_exception = e2
+                            error_class = self._note_error(e2)
+
+                    if attempt < self.retries:
+                        metrics.RETRIES.labels(error_class).inc()
+                        self._put_log(
+                            f"影片下載嘗試失敗。將在 {self.retry_delay} 秒後進行"
+                            f"第 {attempt + 1}/{self.retries} 次重試..."
+                        )
+                        self._wait_before_retry(cancel_token)
+                    else:
+                        self._put_log("所有重試均告失敗。")
 
         if last_exception:
             raise last_exception
         return ""
 
     def download_audio(self, url: str, output_dir: str,
-                       subtitle_lang: str = None) -> str:
+                       subtitle_lang: str = None, progress_hooks: list = None,
+                       cancel_token: CancelToken = None, timings: JobTimings = None) -> str:
         """
         下載音訊並轉為 MP3。
-        回傳下載完成的檔案路徑。
+        回傳下載完成的檔案路徑。progress_hooks、cancel_token 與 timings 同 download_video。
         """
+        timings = timings or JobTimings()
         self._put_log("正在使用 FFmpeg 將音訊轉換為 MP3...")
         output_template = os.path.join(output_dir, "%(title)s.%(ext)s")
 
@@ -265,7 +357,8 @@ class DownloadManager:
             'ffmpeg_location': self.ffmpeg_path,
             'quiet': True,
             'no_warnings': True,
-            'progress_hooks': [self._progress_hook],
+            'progress_hooks': [self._progress_hook, timings.progress_hook, *(progress_hooks or [])],
+            'postprocessor_hooks': [self._postprocessor_hook, timings.postprocessor_hook],
             'sleep_subtitles': 2,
             'sleep_interval_requests': 1,
         }
@@ -276,122 +369,169 @@ class DownloadManager:
                 'subtitleslangs': [subtitle_lang],
                 'subtitlesformat': 'vtt',
             })
+        if self.rate_limit:
+            ydl_opts['ratelimit'] = self.rate_limit
+        self._add_cancel_hooks(ydl_opts, cancel_token)
 
         last_exception = None
-        for attempt in range(self.retries + 1):
-            try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([url])
-                self._put_log("MP3 轉檔完成。")
-                if attempt > 0:
-                    self._put_log("重試成功。")
-                return ""  # MP3 檔名難以預測，略過路徑記錄
-            except Exception as e:
-                last_exception = e
-                error_str = str(e).lower()
-                # 若為字幕相關錯誤，嘗試不下載字幕完成音訊下載
-                if subtitle_lang and (
-                    'subtitle' in error_str
-                    or 'unable to download' in error_str
-                    or '429' in error_str
-                ):
-                    self._put_log("字幕下載失敗，改為不下載字幕重試...")
-                    try:
-                        ydl_opts_no_subs = {
-                            k: v for k, v in ydl_opts.items()
-                            if k not in (
-                                'writesubtitles', 'writeautomaticsub',
-                                'subtitleslangs', 'subtitlesformat',
-                            )
-                        }
-                        with yt_dlp.YoutubeDL(ydl_opts_no_subs) as ydl:
-                            ydl.download([url])
-                        self._put_log("MP3 下載成功，但字幕已略過。")
-                        return ""
-                    except Exception as e2:
-                        last_exception = e2
-
-                if attempt < self.retries:
-                    self._put_log(
-                        f"音訊下載嘗試失敗。將在 {self.retry_delay} 秒後進行"
-                        f"第 {attempt + 1}/{self.retries} 次重試..."
-                    )
-                    time.sleep(self.retry_delay)
-                else:
-                    self._put_log("所有重試均告失敗。")
+        with self._cancel_scope(cancel_token):
+            for attempt in range(self.retries + 1):
+                try:
+                    self._run_download(ydl_opts, url, timings, attempt=attempt)
+                    self._put_log("MP3 轉檔完成。")
+                    if attempt > 0:
+                        self._put_log("重試成功。")
+                    return ""  # MP3 檔名難以預測，略過路徑記錄
+                except Exception as e:
+                    self._raise_if_interrupted(cancel_token, e)
+                    last_exception = e
+                    error_class = self._note_error(e)
+                    error_str = str(e).lower()
+                    # 若為字幕相關錯誤，嘗試不下載字幕完成音訊下載
+                    if subtitle_lang and (
+                        'subtitle' in error_str
+                        or 'unable to download' in error_str
+                        or '429' in error_str
+                    ):
+                        self._put_log("字幕下載失敗，改為不下載字幕重試...")
+                        metrics.RETRIES.labels(error_class).inc()
+                        try:
+                            ydl_opts_no_subs = {
+                                k: v for k, v in ydl_opts.items()
+                                if k not in (
+                                    'writesubtitles', 'writeautomaticsub',
+                                    'subtitleslangs', 'subtitlesformat',
+                                )
+                            }
+                            self._run_download(ydl_opts_no_subs, url, timings,
+                                               attempt=attempt, subtitles=False)
+                            self._put_log("MP3 下載成功，但字幕已略過。")
+                            return ""
+                        except Exception as e2:
+                            self._raise_if_interrupted(cancel_token, e2)
+                            last_exception = e2
+                            error_class = self._note_error(e2)
+
+                    if attempt < self.retries:
+                        metrics.RETRIES.labels(error_class).inc()
+                        self._put_log(
+                            f"音訊下載嘗試失敗。將在 {self.retry_delay} 秒後進行"
+                            f"第 {attempt + 1}/{self.retries} 次重試..."
+                        )
+                        self._wait_before_retry(cancel_token)
+                    else:
+                        self._put_log("所有重試均告失敗。")
 
         if last_exception:
             raise last_exception
         return ""
 
-    def download_playlist_parallel(self, videos: list, output_dir: str,
-                                   subtitle_lang: str = None) -> dict:
+    def run_job(self, job) -> str:
         """
-        使用 ThreadPoolExecutor 並行下載播放清單中的多個影片。
-        回傳 {"success": int, "failed": int, "results": list}
+        執行下載佇列中的單一工作（DownloadJob），並將進度寫回 job.progress；
+        各階段的計時記錄在 job.timings（佇列等待從加入佇列或上次中止起算）；
+        佇列等待與整個工作另記為追蹤區段。
         """
-        total = len(videos)
-        playlist_format_str = (
-            'bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/'
-            'best[ext=mp4]/best'
-        )
-        playlist_height = 1080
-
-        self._put_log(f"準備並行下載 {total} 個影片（同時進行 {self.parallel_downloads} 個）...")
-
-        results = []
-        completed = [0]  # 用 list 包裝以在閉包中修改
+        partial_files = set()
+        queued_since = max(job.created_at, job.finished_at)
+        job.timings = timings = JobTimings(
+            queue_seconds=max(0.0, job.started_at - queued_since) if job.started_at else None,
+            worker_id=job.worker_id)
+        started = time.perf_counter()
+        if timings.queue_seconds:
+            TRACER.complete(f"queue #{job.id}", "queue", started - timings.queue_seconds, started)
+
+        def job_hook(d: dict):
+            if d.get('tmpfilename'):
+                partial_files.add(d['tmpfilename'])
+            if d['status'] == 'downloading':
+                total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+                if total_bytes > 0:
+                    job.progress = d.get('downloaded_bytes', 0) / total_bytes * 100
+                    self._put_job_progress(job.id)
+            elif d['status'] == 'finished':
+                job.progress = 100.0
+                self._put_job_progress(job.id)
 
-        def download_one(index: int, title: str, video_url: str) -> dict:
-            """下載單一影片的工作函數。"""
-            try:
-                file_path = self.download_video(
-                    video_url, playlist_format_str, True,
-                    output_dir, subtitle_lang, playlist_height
-                )
-                self._put_log(f"--- ✔ 下載成功: {title} ---")
-                return {
-                    "index": index, "title": title, "url": video_url,
-                    "status": "success", "file_path": file_path, "error": None,
-                }
-            except Exception as e:
-                self._put_log(f"--- ❌ 下載失敗: {title} | 錯誤: {e} ---")
-                return {
-                    "index": index, "title": title, "url": video_url,
-                    "status": "failed", "file_path": "", "error": str(e),
-                }
+        result = "failed"
+        try:
+            if job.kind == "audio":
+                file_path = self.download_audio(job.url, job.output_dir, job.subtitle_lang,
+                                                progress_hooks=[job_hook], cancel_token=job.token,
+                                                timings=timings)
+            else:
+                file_path = self.download_video(job.url, job.format_id, job.has_audio,
+                                                job.output_dir, job.subtitle_lang, job.height,
+                                                progress_hooks=[job_hook], cancel_token=job.token,
+                                                timings=timings)
+            result = "success"
+            return file_path
+        except JobInterrupted as e:
+            result = "cancelled" if e.reason == "cancel" else "paused"
+            # 暫停保留 .part 檔以便續傳；取消則一併刪除未完成的檔案
+            if e.reason == "cancel":
+                for path in partial_files:
+                    if path.endswith(".part") or path.endswith(".ytdl"):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+            raise
+        finally:
+            TRACER.complete(f"job #{job.id}", "job", started, time.perf_counter(),
+                            title=job.title, kind=job.kind, result=result)
+            metrics.DOWNLOADS.labels(job.kind, result).inc()
+            if timings.attempts:
+                metrics.EXTRACT_SECONDS.labels("download").observe(timings.extract_seconds)
 
-        with ThreadPoolExecutor(max_workers=self.parallel_downloads) as executor:
-            futures = {
-                executor.submit(download_one, i, title, url): i
-                for i, (title, url) in enumerate(videos)
-            }
+    # ─── 內部輔助方法 ──────────────────────────────────────
 
-            for future in as_completed(futures):
-                result = future.result()
-                results.append(result)
-                completed[0] += 1
-                self._put_progress("total", (completed[0] / total) * 100)
-                status_text = f"正在下載 {completed[0]}/{total}"
-                if result["status"] == "success":
-                    status_text += f": {result['title'][:20]}..."
-                self._put_status(status_text)
+    @contextmanager
+    def _cancel_scope(self, cancel_token):
+        """在此範圍內由目前執行緒啟動的子行程會登記到 cancel_token。"""
+        previous = getattr(_thread_state, "cancel_token", None)
+        _thread_state.cancel_token = cancel_token
+        try:
+            yield
+        finally:
+            _thread_state.cancel_token = previous
 
-        results.sort(key=lambda r: r["index"])
-        success_count = sum(1 for r in results if r["status"] == "success")
-        fail_count = total - success_count
+    @staticmethod
+    def _add_cancel_hooks(ydl_opts: dict, cancel_token):
+        """在進度與後處理回呼中檢查取消權杖（每個下載區塊都會呼叫一次進度回呼）。"""
+        if cancel_token is None:
+            return
 
-        self._put_log("====================")
-        self._put_log("所有下載任務已完成。")
-        self._put_log(f"成功: {success_count} 個, 失敗: {fail_count} 個")
-        self._put_log("====================")
+        def hook(d: dict):
+            if cancel_token.requested:
+                raise _DownloadInterrupted(cancel_token.reason)
 
-        return {"success": success_count, "failed": fail_count, "results": results}
+        ydl_opts['progress_hooks'] = [*ydl_opts.get('progress_hooks', []), hook]
+        ydl_opts['postprocessor_hooks'] = [*ydl_opts.get('postprocessor_hooks', []), hook]
 
-    # ─── 內部輔助方法 ──────────────────────────────────────
+    @staticmethod
+    def _raise_if_interrupted(cancel_token, error: Exception):
+        """權杖已觸發時，將 yt-dlp / FFmpeg 因中止而產生的錯誤轉為 JobInterrupted（不再重試）。"""
+        if cancel_token is not None and cancel_token.requested:
+            raise JobInterrupted(cancel_token.reason) from error
+
+    def _wait_before_retry(self, cancel_token):
+        """重試前等待；等待期間權杖被觸發則立即中止。"""
+        with TRACER.span("retry.wait", "retry", seconds=self.retry_delay):
+            if cancel_token is None:
+                time.sleep(self.retry_delay)
+            elif cancel_token.wait(self.retry_delay):
+                raise JobInterrupted(cancel_token.reason)
+
+    def _run_download(self, ydl_opts: dict, url: str, timings: JobTimings, **args):
+        """執行一次 ydl.download（計入工作的階段計時，並記為追蹤區段；args 記入區段）。"""
+        with TRACER.span("ydl.download", "download", url=url, **args), timings.attempt(), \
+                yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl.download([url])
 
     def _progress_hook(self, d: dict):
-        """yt-dlp 下載進度回呼。"""
+        """yt-dlp 下載進度回呼（另將新傳輸的位元組計入指標）。"""
+        self._count_bytes(d)
         if d['status'] == 'downloading':
             try:
                 total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
@@ -406,6 +546,48 @@ class DownloadManager:
             if d.get('postprocessor') == 'FFmpegMerger':
                 self._put_log("FFmpeg 合併完成。")
 
+    def _count_bytes(self, d: dict):
+        """依每個檔案上一次回報的 downloaded_bytes 計算增量（續傳時已存在的部分不計入）。"""
+        name = d.get('tmpfilename') or d.get('filename') or ''
+        if os.path.splitext(d.get('filename') or '')[1].lower() in SUBTITLE_EXTS:
+            return
+        downloaded = d.get('downloaded_bytes') or 0
+        if d['status'] == 'downloading':
+            previous = self._bytes_seen.get(name)
+            self._bytes_seen[name] = downloaded
+            if previous is not None and downloaded > previous:
+                metrics.BYTES_TRANSFERRED.inc(downloaded - previous)
+        else:
+            previous = self._bytes_seen.pop(name, None)
+            if previous is not None and downloaded > previous:
+                metrics.BYTES_TRANSFERRED.inc(downloaded - previous)
+
+    def _postprocessor_hook(self, d: dict):
+        """yt-dlp 後處理回呼：每個後處理器記為一個追蹤區段，FFmpeg 後處理器另記入時間指標。"""
+        name = d.get('postprocessor') or ''
+        key = (threading.get_ident(), name)
+        if d.get('status') == 'started':
+            self._pp_started[key] = time.perf_counter()
+        elif d.get('status') == 'finished' and key in self._pp_started:
+            started, ended = self._pp_started.pop(key), time.perf_counter()
+            TRACER.complete(name, "postprocess", started, ended)
+            if name.startswith('FFmpeg'):
+                metrics.FFMPEG_SECONDS.labels(name).observe(ended - started)
+
+    @staticmethod
+    def _extract_info(ydl, url: str, op: str, **kwargs) -> dict:
+        """ydl.extract_info(download=False)，並記錄擷取延遲（op 為指標標籤）與追蹤區段。"""
+        with TRACER.span("extract_info", "extract", op=op, url=url), metrics.EXTRACT_SECONDS.labels(op).time():
+            return ydl.extract_info(url, download=False, **kwargs)
+
+    @staticmethod
+    def _note_error(error: Exception) -> str:
+        """記錄 yt-dlp 錯誤的指標（HTTP 429 次數），回傳錯誤類別。"""
+        error_class = _error_class(error)
+        if error_class == "rate_limited":
+            metrics.HTTP_429.inc()
+        return error_class
+
     def _extract_formats(self, info: dict) -> list:
         """從 yt-dlp 資訊中提取 MP4 格式列表。"""
         formats = info.get('formats', [])
@@ -444,8 +626,9 @@ class DownloadManager:
             }
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 try:
-                    info = ydl.extract_info(url, download=False)
-                except Exception:
+                    info = self._extract_info(ydl, url, "subtitles")
+                except Exception as e:
+                    self._note_error(e)
                     return {'無': 'none'}
 
         # 手動字幕位於 'subtitles'，自動字幕位於 'automatic_captions'
@@ -488,16 +671,23 @@ class DownloadManager:
             return "粵語"
         return lang
 
-    def _extract_videos(self, info: dict) -> list:
-        """從頻道/播放清單資訊中提取影片列表。"""
+    @staticmethod
+    def _video_entries(info: dict) -> list:
+        """回傳頻道/播放清單中具有網址的項目。"""
         if 'entries' not in info or not info['entries']:
             return []
-        entries = filter(None, info['entries'])
+        return [
+            entry for entry in filter(None, info['entries'])
+            if entry.get('webpage_url') or entry.get('url')
+        ]
+
+    @staticmethod
+    def _extract_videos(entries: list) -> list:
+        """從頻道/播放清單項目中提取 (標題, 網址) 影片列表。"""
         return [
             (entry.get('title', '無標題'),
              entry.get('webpage_url', entry.get('url')))
             for entry in entries
-            if entry.get('webpage_url') or entry.get('url')
         ]
 
     # ─── 佇列通訊輔助 ─────────────────────────────────────
@@ -513,3 +703,7 @@ class DownloadManager:
     def _put_progress(self, key: str, value: float):
         if self.queue:
             self.queue.put({"type": f"{key}_progress", "value": value})
+
+    def _put_job_progress(self, job_id: int):
+        if self.queue:
+            self.queue.put({"type": "jobs_changed", "job_id": job_id})
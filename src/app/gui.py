@@ -4,35 +4,69 @@
 """
 
 import tkinter as tk
-from tkinter import ttk, scrolledtext, filedialog
-from PIL import Image, ImageTk
-from io import BytesIO
+from tkinter import ttk, filedialog
+from PIL import ImageTk
 import os
-import queue
+import re
 import threading
-import requests
+from bisect import bisect_left
+from collections import OrderedDict
 from datetime import datetime
 
+from .batch import BatchAnalyzer, expand_url_input, read_url_file
 from .config import load_settings, save_settings, DEFAULT_SETTINGS
+from .control_api import ControlServer, generate_token
+from .details_loader import DetailsLoader
+from .download_windows import WindowController, describe_state, load_windows, parse_window_specs
 from .downloader import DownloadManager
-from .history import DownloadHistory
+from .history import DownloadHistory, HistoryWriter, page_key
+from .history_archive import ARCHIVE_DIR, HistoryRetention
+from .jobs import (DownloadJob, JobInterrupted, JobScheduler, load_queue, make_job, QUEUE_FILE,
+                   QUEUED, RUNNING, PAUSED, DONE, FAILED, CANCELLED)
+from .log_view import LogView
+from .log_writer import AsyncLogWriter
+from .message_pump import MessagePump
+from .metrics import BYTES_TRANSFERRED, REGISTRY, Histogram, MetricsServer, watch_scheduler
+from .selection import SelectionModel
+from .thumbnails import ThumbnailService
+from .tracing import DEFAULT_CAPACITY, TRACE_FILE, TRACER
+from .video_index import VideoIndex
+from .virtual_tree import VirtualTreeview
+from .watch_folder import WatchFolder
 
 
 class YouTubeDownloaderGUI:
     """GUI 版本的 YouTube 下載器，使用 tkinter 和 ttk。"""
 
     LOG_FILE = "yd_log.txt"
-    MAX_LOG_SIZE = 5 * 1024 * 1024  # 5 MB
+    MAX_LOG_SIZE = 5 * 1024 * 1024  # 5 MB，超過時輪轉為 yd_log.txt.1、.2 …
+    LOG_VIEW_LINES = 5000           # 日誌區塊保留的行數（完整記錄見 LOG_FILE）
+    VIDEO_THUMB_SIZE = (64, 36)     # 頻道影片列表縮圖欄的尺寸
+    VIDEO_THUMB_CACHE = 200         # 縮圖欄最多保留的已解碼圖片數
+    DETAILS_DEBOUNCE_MS = 300       # 選取列停留多久才擷取影片詳細資訊
+    SPECULATE_DELAY_MS = 600        # 網址停止變動多久後開始預先分析
+    QUEUE_REFRESH_MS = 250          # 下載佇列面板的最短重繪間隔
+    HISTORY_PAGE_SIZE = 200         # 歷史分頁每次載入的記錄數
+    HISTORY_SEARCH_LIMIT = 500      # 歷史搜尋最多顯示的結果數
+    SHUTDOWN_TIMEOUT = 1.5          # 關閉視窗時等待執行中下載中止的秒數
+    DIAGNOSTICS_REFRESH_MS = 1000   # 診斷面板重新讀取監控指標的間隔
+    JOB_STATE_TEXT = {
+        QUEUED: "等待中", RUNNING: "下載中", PAUSED: "已暫停",
+        DONE: "完成", FAILED: "失敗", CANCELLED: "已取消",
+    }
+    JOB_PRIORITY_TEXT = {1: "高", 0: "一般", -1: "低"}
+    YOUTUBE_URL_RE = re.compile(
+        r"^https?://(www\.|m\.|music\.)?(youtube\.com/\S+|youtu\.be/[\w-]+\S*)$", re.IGNORECASE)
 
     def __init__(self, root: tk.Tk):
         self.root = root
         self.root.title("YouTube 下載器 - Designed by Lamsir")
-        self.root.geometry("900x900")
+        self.root.geometry("900x1000")
         self.root.resizable(True, True)
 
         # ─── 訊息佇列（執行緒間通訊）───
-        self.queue = queue.Queue()
-        self._log_lock = threading.Lock()
+        self.queue = MessagePump()
+        self.log_writer = AsyncLogWriter(self.LOG_FILE, max_bytes=self.MAX_LOG_SIZE)
 
         # ─── 設定 ───
         self.settings = load_settings()
@@ -41,6 +75,19 @@ class YouTubeDownloaderGUI:
         self.RETRY_DELAY = self.settings.get('delay', 5)
         self.PARALLEL_DOWNLOADS = self.settings.get('parallel_downloads', 2)
         self.DEFAULT_DOWNLOAD_PATH = self.settings.get('default_download_path', os.getcwd())
+        self.SHOW_VIDEO_THUMBNAILS = self.settings.get('show_video_thumbnails', False)
+        self.SPECULATIVE_ANALYSIS = self.settings.get('speculative_analysis', True)
+        self.BATCH_ANALYSIS_WORKERS = self.settings.get('batch_analysis_workers', 4)
+        self.API_ENABLED = self.settings.get('api_enabled', False)
+        self.API_PORT = self.settings.get('api_port', 8765)
+        self.API_TOKEN = self.settings.get('api_token', '')
+        self.WATCH_FOLDER = self.settings.get('watch_folder', '')
+        self.DOWNLOAD_WINDOWS = load_windows(self.settings.get('download_windows', []))
+        self.HISTORY_RETENTION_DAYS = self.settings.get('history_retention_days', 0)
+        self.HISTORY_ARCHIVE_DIR = self.settings.get('history_archive_dir', '')
+        self.METRICS_PORT = self.settings.get('metrics_port', 0)
+        self.TRACE_BUFFER_EVENTS = self.settings.get('trace_buffer_events', DEFAULT_CAPACITY)
+        TRACER.configure(self.TRACE_BUFFER_EVENTS)
 
         # ─── 下載管理與歷史 ───
         self.download_manager = DownloadManager(
@@ -51,6 +98,38 @@ class YouTubeDownloaderGUI:
             msg_queue=self.queue,
         )
         self.history = DownloadHistory()
+        # 下載記錄延遲批次寫入：每批一個交易，寫入後只送出一次帶有新 id 的變更通知
+        self.history_writer = HistoryWriter(
+            self.history, on_flush=lambda ids: self.queue.put({"type": "history_changed", "ids": ids}),
+            on_error=self._log_background_error)
+        # 沒有下載進行時將超過保存天數的記錄封存到 gzip 檔並從資料庫刪除
+        self.history_retention = HistoryRetention(
+            self.history, self.HISTORY_RETENTION_DAYS,
+            directory=self.HISTORY_ARCHIVE_DIR or ARCHIVE_DIR,
+            is_idle=lambda: not self.scheduler.counts().get(RUNNING),
+            on_event=self._on_history_archived, on_error=self._log_background_error)
+        self.scheduler = JobScheduler(
+            self._run_job, max_workers=self.PARALLEL_DOWNLOADS,
+            on_change=lambda: self.queue.put({"type": "jobs_changed"}),
+            on_idle=self._on_queue_idle, persist_path=QUEUE_FILE,
+            on_error=self._log_background_error,
+        )
+        watch_scheduler(self.scheduler)
+        self.window_controller = WindowController(
+            self.scheduler, self.download_manager, self.DOWNLOAD_WINDOWS,
+            on_change=self._on_window_change)
+        self._window_open = None        # 上一次的下載時段狀態（用於記錄開始/結束）
+        # 本輪是否有使用者從介面加入或繼續的工作：只有這種批次結束時才彈出完成對話框，
+        # 控制 API 與監看資料夾加入的工作只寫入日誌與狀態列，無人操作時不留下阻塞的對話框
+        self._ui_batch = False
+        self.thumbnails = ThumbnailService()
+        self.details_loader = DetailsLoader(self.download_manager.fetch_video_details)
+        # 預先分析：同一時間最多一個背景擷取，只保留最新網址，結果快取供「分析網址」直接使用
+        self.speculative_loader = DetailsLoader(
+            lambda url: self.download_manager.analyze_url(url, quiet=True), cache_size=4)
+        # 歷史搜尋：為所有符合的記錄計算相關度可能需要數百毫秒，在背景執行緒上查詢，只採用最新字詞的結果
+        self.history_search_loader = DetailsLoader(
+            lambda query: self.history.search(query, limit=self.HISTORY_SEARCH_LIMIT), cache_size=0)
 
         # ─── tk 變數 ───
         self.url_var = tk.StringVar()
@@ -58,6 +137,8 @@ class YouTubeDownloaderGUI:
         self.download_path_var = tk.StringVar(value=self.DEFAULT_DOWNLOAD_PATH)
         self.download_type_var = tk.StringVar(value="video")
         self.subtitle_var = tk.StringVar(value="none")
+        self.video_filter_var = tk.StringVar()
+        self.show_video_thumbs_var = tk.BooleanVar(value=self.SHOW_VIDEO_THUMBNAILS)
         self.total_progress_var = tk.DoubleVar()
         self.file_progress_var = tk.DoubleVar()
 
@@ -65,15 +146,50 @@ class YouTubeDownloaderGUI:
         self.retries_var = tk.IntVar(value=self.DOWNLOAD_RETRIES)
         self.delay_var = tk.IntVar(value=self.RETRY_DELAY)
         self.parallel_var = tk.IntVar(value=self.PARALLEL_DOWNLOADS)
+        self.speculative_var = tk.BooleanVar(value=self.SPECULATIVE_ANALYSIS)
+        self.batch_workers_var = tk.IntVar(value=self.BATCH_ANALYSIS_WORKERS)
+        self.api_enabled_var = tk.BooleanVar(value=self.API_ENABLED)
+        self.api_port_var = tk.IntVar(value=self.API_PORT)
+        self.watch_folder_var = tk.StringVar(value=self.WATCH_FOLDER)
+        self.retention_days_var = tk.IntVar(value=self.HISTORY_RETENTION_DAYS)
+        self.metrics_port_var = tk.IntVar(value=self.METRICS_PORT)
         self.default_download_path_var = tk.StringVar(value=self.DEFAULT_DOWNLOAD_PATH)
 
         # ─── 資料儲存 ───
         self.available_formats = []
         self.available_subtitles = {}
         self.channel_videos = []
+        self.channel_video_meta = []
+        self.video_index = None
+        self._video_view = range(0)     # 目前顯示的影片索引（篩選結果）
+        self.video_selection = SelectionModel()
+        self._video_anchor = None       # Shift 範圍選取的起點位置（顯示位置）
+        self._filter_after_id = None
+        self._video_generation = 0      # 影片列表每次重建遞增，用來丟棄舊列表的縮圖結果
+        self._video_thumbs = OrderedDict()   # 影片索引 → PhotoImage（LRU）
+        self._video_thumb_jobs = {}          # 影片索引 → 縮圖 Future
+        self._video_thumb_failed = set()
+        self._thumb_viewport_after_id = None
+        self._details_after_id = None
+        self._speculate_after_id = None
+        self.batch_analyzer = None      # 進行中的批次分析（同一時間最多一個）
+        self.api_server = None          # 本機控制 API（未啟用時為 None）
+        self.watch_folder = None        # 監看資料夾服務（未設定時為 None）
+        self.metrics_server = None      # Prometheus 監控指標端點（未啟用時為 None）
+        self._diagnostics_window = None
         self.thumbnail_photo = None
+        self._thumbnail_url = None      # 主縮圖最後一次要求的網址（較舊的結果會被忽略）
         self.interactive_widgets = []
-        self._after_id = None
+        self._ui_state = 'normal'       # 分析進行中為 'disabled'
+        self._queue_jobs = []           # 下載佇列面板顯示的工作（排程器佇列的快照）
+        self._queue_refresh_after_id = None
+        self._history_records = []      # 歷史分頁已載入的記錄（新到舊）
+        self._history_ids = set()
+        self._history_more = False      # 是否還有更舊的記錄尚未載入
+        self._history_pending = []      # 歷史分頁不在前景時新寫入的記錄 id
+        self._history_stale = False     # 累積的新記錄過多，切換到歷史分頁時整個重新載入
+        self._history_load_after_id = None
+        self._history_search_after_id = None
 
         # ─── 視窗關閉處理 ───
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
@@ -87,8 +203,20 @@ class YouTubeDownloaderGUI:
         # ─── 啟動初始化 ───
         threading.Thread(target=self.download_manager.update_yt_dlp, daemon=True).start()
         self._check_ffmpeg()
-        self._check_queue()
+        self.window_controller.start()     # 先套用下載時段，時段外恢復的工作不會被開始
+        self.scheduler.start(load_queue(QUEUE_FILE))
+        self.history_retention.start()
+        if self.API_ENABLED:
+            self._start_api_server()
+        if self.WATCH_FOLDER:
+            self._start_watch_folder()
+        if self.METRICS_PORT:
+            self._start_metrics_server()
+        self.queue.start(self.root, self._handle_message,
+                         batch_handlers={"log": self._log_batch,
+                                         "history_changed": self._on_history_changed})
         self.url_var.trace_add("write", self._validate_url_length)
+        self.url_var.trace_add("write", self._schedule_speculative_analysis)
 
     # ═══════════════════════════════════════════════════════
     #  設定管理
@@ -102,6 +230,18 @@ class YouTubeDownloaderGUI:
             'delay': self.RETRY_DELAY,
             'parallel_downloads': self.PARALLEL_DOWNLOADS,
             'default_download_path': self.DEFAULT_DOWNLOAD_PATH,
+            'show_video_thumbnails': self.SHOW_VIDEO_THUMBNAILS,
+            'speculative_analysis': self.SPECULATIVE_ANALYSIS,
+            'batch_analysis_workers': self.BATCH_ANALYSIS_WORKERS,
+            'api_enabled': self.API_ENABLED,
+            'api_port': self.API_PORT,
+            'api_token': self.API_TOKEN,
+            'watch_folder': self.WATCH_FOLDER,
+            'download_windows': [window.to_dict() for window in self.DOWNLOAD_WINDOWS],
+            'history_retention_days': self.HISTORY_RETENTION_DAYS,
+            'history_archive_dir': self.HISTORY_ARCHIVE_DIR,
+            'metrics_port': self.METRICS_PORT,
+            'trace_buffer_events': self.TRACE_BUFFER_EVENTS,
         }
         if save_settings(settings):
             self._log(f"設定已儲存。")
@@ -122,6 +262,34 @@ class YouTubeDownloaderGUI:
             )
             return
 
+        new_watch_folder = self.watch_folder_var.get().strip()
+        if new_watch_folder and not os.path.isdir(new_watch_folder):
+            self._show_error(
+                "路徑錯誤",
+                f"指定的監看資料夾不存在:\n{new_watch_folder}",
+            )
+            return
+
+        try:
+            new_windows = parse_window_specs(self.windows_text.get("1.0", tk.END))
+        except ValueError as e:
+            self._show_error("下載時段格式錯誤", str(e))
+            return
+
+        try:
+            new_retention_days = max(0, int(self.retention_days_var.get()))
+        except (tk.TclError, ValueError):
+            self._show_error("設定錯誤", "歷史保存天數必須是整數（0 表示永久保存）。")
+            return
+
+        try:
+            new_metrics_port = int(self.metrics_port_var.get())
+        except (tk.TclError, ValueError):
+            new_metrics_port = -1
+        if not (new_metrics_port == 0 or 1024 <= new_metrics_port <= 65535):
+            self._show_error("設定錯誤", "監控指標連接埠必須是 1024–65535（0 表示停用）。")
+            return
+
         if not os.path.isdir(new_default_path):
             self._show_error(
                 "路徑錯誤",
@@ -134,6 +302,19 @@ class YouTubeDownloaderGUI:
         self.RETRY_DELAY = self.delay_var.get()
         self.PARALLEL_DOWNLOADS = self.parallel_var.get()
         self.DEFAULT_DOWNLOAD_PATH = new_default_path
+        self.SPECULATIVE_ANALYSIS = self.speculative_var.get()
+        self.BATCH_ANALYSIS_WORKERS = self.batch_workers_var.get()
+        api_changed = (self.API_ENABLED, self.API_PORT) != (self.api_enabled_var.get(), self.api_port_var.get())
+        self.API_ENABLED = self.api_enabled_var.get()
+        self.API_PORT = self.api_port_var.get()
+        watch_changed = new_watch_folder != self.WATCH_FOLDER
+        self.WATCH_FOLDER = new_watch_folder
+        self.DOWNLOAD_WINDOWS = new_windows
+        self.HISTORY_RETENTION_DAYS = new_retention_days
+        metrics_changed = new_metrics_port != self.METRICS_PORT
+        self.METRICS_PORT = new_metrics_port
+        if not self.SPECULATIVE_ANALYSIS:
+            self.speculative_loader.cancel()
 
         self.download_path_var.set(self.DEFAULT_DOWNLOAD_PATH)
 
@@ -142,6 +323,21 @@ class YouTubeDownloaderGUI:
         self.download_manager.retries = self.DOWNLOAD_RETRIES
         self.download_manager.retry_delay = self.RETRY_DELAY
         self.download_manager.parallel_downloads = self.PARALLEL_DOWNLOADS
+        self.scheduler.set_max_workers(self.PARALLEL_DOWNLOADS)
+        self.window_controller.configure(self.DOWNLOAD_WINDOWS)
+        self.history_retention.configure(self.HISTORY_RETENTION_DAYS)
+        if api_changed:
+            self._stop_api_server()
+            if self.API_ENABLED:
+                self._start_api_server()
+        if watch_changed:
+            self._stop_watch_folder()
+            if self.WATCH_FOLDER:
+                self._start_watch_folder()
+        if metrics_changed:
+            self._stop_metrics_server()
+            if self.METRICS_PORT:
+                self._start_metrics_server()
 
         self._save_settings()
         self._log("設定已更新。")
@@ -177,10 +373,17 @@ class YouTubeDownloaderGUI:
         self.delay_var.set(self.RETRY_DELAY)
         self.parallel_var.set(self.PARALLEL_DOWNLOADS)
         self.default_download_path_var.set(self.DEFAULT_DOWNLOAD_PATH)
+        self.speculative_var.set(self.SPECULATIVE_ANALYSIS)
+        self.batch_workers_var.set(self.BATCH_ANALYSIS_WORKERS)
+        self.api_enabled_var.set(self.API_ENABLED)
+        self.api_port_var.set(self.API_PORT)
+        self.watch_folder_var.set(self.WATCH_FOLDER)
+        self.retention_days_var.set(self.HISTORY_RETENTION_DAYS)
+        self.metrics_port_var.set(self.METRICS_PORT)
 
         win = tk.Toplevel(self.root)
         win.title("設定")
-        win.geometry("600x260")
+        win.geometry("600x575")
         win.transient(self.root)
         win.grab_set()
 
@@ -214,6 +417,17 @@ class YouTubeDownloaderGUI:
                    command=lambda: self._browse_default_path(win)).grid(row=0, column=1)
         row += 1
 
+        # 監看資料夾
+        ttk.Label(main, text="監看資料夾:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        wf_frame = ttk.Frame(main)
+        wf_frame.grid(row=row, column=1, sticky="ew")
+        wf_frame.columnconfigure(0, weight=1)
+        ttk.Entry(wf_frame, textvariable=self.watch_folder_var, width=60).grid(
+            row=0, column=0, sticky="ew", padx=(0, 5))
+        ttk.Button(wf_frame, text="瀏覽",
+                   command=lambda: self._browse_watch_folder(win)).grid(row=0, column=1)
+        row += 1
+
         # 重試次數
         ttk.Label(main, text="下載失敗重試次數:").grid(row=row, column=0, sticky=tk.W, pady=5)
         ttk.Spinbox(main, from_=0, to=3, textvariable=self.retries_var,
@@ -232,6 +446,67 @@ class YouTubeDownloaderGUI:
                     width=8, wrap=True, state="readonly").grid(row=row, column=1, sticky=tk.W)
         row += 1
 
+        # 批次分析並行數量
+        ttk.Label(main, text="批次分析同時數量:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(main, from_=1, to=8, textvariable=self.batch_workers_var,
+                    width=8, wrap=True, state="readonly").grid(row=row, column=1, sticky=tk.W)
+        row += 1
+
+        # 歷史保存天數
+        ttk.Label(main, text="歷史保存天數:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        ret_frame = ttk.Frame(main)
+        ret_frame.grid(row=row, column=1, sticky=tk.W)
+        ttk.Spinbox(ret_frame, from_=0, to=3650, increment=30, textvariable=self.retention_days_var,
+                    width=8).grid(row=0, column=0, padx=(0, 10))
+        ttk.Label(ret_frame, foreground="gray",
+                  text=f"0 = 永久保存；過期記錄封存到 {self.HISTORY_ARCHIVE_DIR or ARCHIVE_DIR} 後刪除").grid(
+            row=0, column=1, sticky=tk.W)
+        row += 1
+
+        # 預先分析
+        ttk.Checkbutton(main, text="貼上網址時在背景預先分析（加快「分析網址」）",
+                        variable=self.speculative_var).grid(
+            row=row, column=0, columnspan=2, sticky=tk.W, pady=5)
+        row += 1
+
+        # 本機控制 API
+        ttk.Checkbutton(main, text="啟用本機控制 API（只接受 127.0.0.1 的連線）",
+                        variable=self.api_enabled_var).grid(
+            row=row, column=0, columnspan=2, sticky=tk.W, pady=5)
+        row += 1
+        ttk.Label(main, text="API 連接埠:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        api_frame = ttk.Frame(main)
+        api_frame.grid(row=row, column=1, sticky=tk.W)
+        ttk.Spinbox(api_frame, from_=1024, to=65535, textvariable=self.api_port_var,
+                    width=8).grid(row=0, column=0, padx=(0, 10))
+        ttk.Button(api_frame, text="複製權杖", command=self._copy_api_token).grid(row=0, column=1)
+        row += 1
+
+        # 監控指標
+        ttk.Label(main, text="監控指標連接埠:").grid(row=row, column=0, sticky=tk.W, pady=5)
+        metrics_frame = ttk.Frame(main)
+        metrics_frame.grid(row=row, column=1, sticky=tk.W)
+        ttk.Spinbox(metrics_frame, from_=0, to=65535, textvariable=self.metrics_port_var,
+                    width=8).grid(row=0, column=0, padx=(0, 10))
+        ttk.Label(metrics_frame, foreground="gray",
+                  text="0 = 停用；啟用時在 127.0.0.1 提供 Prometheus 格式的 /metrics").grid(
+            row=0, column=1, sticky=tk.W)
+        row += 1
+
+        # 下載時段
+        ttk.Label(main, text="下載時段:").grid(row=row, column=0, sticky=tk.NW, pady=5)
+        win_frame = ttk.Frame(main)
+        win_frame.grid(row=row, column=1, sticky="ew", pady=5)
+        win_frame.columnconfigure(0, weight=1)
+        self.windows_text = tk.Text(win_frame, height=3, width=60, wrap=tk.NONE)
+        self.windows_text.grid(row=0, column=0, sticky="ew")
+        self.windows_text.insert("1.0", "\n".join(window.spec() for window in self.DOWNLOAD_WINDOWS))
+        ttk.Label(win_frame, foreground="gray",
+                  text="每行一個時段，例如 22:00-06:00 days=1-5 workers=3 rate=2000（KB/s）；\n"
+                       "空白表示隨時下載。時段結束時執行中的下載會暫停，下個時段續傳。").grid(
+            row=1, column=0, sticky=tk.W)
+        row += 1
+
         # 按鈕
         btn_frame = ttk.Frame(main)
         btn_frame.grid(row=row, column=0, columnspan=2, pady=(20, 0))
@@ -242,6 +517,201 @@ class YouTubeDownloaderGUI:
 
         self._center_window(win)
 
+    # ─── 本機控制 API ──────────────────────────────────────
+
+    def _start_api_server(self):
+        """啟動本機控制 API，並將訊息佇列的訊息分接給其事件串流。"""
+        if not self.API_TOKEN:
+            self.API_TOKEN = generate_token()
+            self._save_settings()
+        try:
+            self.api_server = ControlServer(
+                self.scheduler, self.history, lambda urls, options: self._submit_urls(urls, options, "控制 API"),
+                self.API_TOKEN, port=self.API_PORT)
+        except OSError as e:
+            self._log(f"無法啟動控制 API（連接埠 {self.API_PORT}）：{e}")
+            return
+        self.queue.add_tap(self.api_server.publish)
+        self.api_server.start()
+        self._log(f"控制 API 已啟動：{self.api_server.url}（權杖可在「設定」中複製）")
+
+    def _stop_api_server(self):
+        if self.api_server is None:
+            return
+        self.queue.remove_tap(self.api_server.publish)
+        self.api_server.stop()
+        self.api_server = None
+
+    def _copy_api_token(self):
+        if not self.API_TOKEN:
+            self.API_TOKEN = generate_token()
+            self._save_settings()
+        self.root.clipboard_clear()
+        self.root.clipboard_append(self.API_TOKEN)
+        self._update_status("已複製控制 API 權杖")
+
+    # ─── 監控指標 ──────────────────────────────────────────
+
+    def _start_metrics_server(self):
+        try:
+            self.metrics_server = MetricsServer(self.METRICS_PORT)
+        except OSError as e:
+            self._log(f"無法啟動監控指標端點（連接埠 {self.METRICS_PORT}）：{e}")
+            return
+        self.metrics_server.start()
+        self._log(f"監控指標端點已啟動：{self.metrics_server.url}")
+
+    def _stop_metrics_server(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+
+    def _open_diagnostics_window(self):
+        """開啟診斷面板（不鎖定主視窗），開啟期間每秒重新讀取監控指標。"""
+        if self._diagnostics_window is not None and self._diagnostics_window.winfo_exists():
+            self._diagnostics_window.lift()
+            return
+        win = tk.Toplevel(self.root)
+        win.title("診斷")
+        win.geometry("680x440")
+        win.transient(self.root)
+        self._diagnostics_window = win
+
+        main = ttk.Frame(win, padding="10")
+        main.grid(row=0, column=0, sticky="nsew")
+        win.columnconfigure(0, weight=1)
+        win.rowconfigure(0, weight=1)
+        main.columnconfigure(0, weight=1)
+        main.rowconfigure(0, weight=1)
+
+        tree = ttk.Treeview(main, columns=("metric", "labels", "value"), show="headings")
+        for column, text, width in (("metric", "指標", 260), ("labels", "標籤", 200), ("value", "數值", 160)):
+            tree.heading(column, text=text)
+            tree.column(column, width=width, anchor=tk.E if column == "value" else tk.W)
+        tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar = ttk.Scrollbar(main, orient="vertical", command=tree.yview)
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        tree.configure(yscrollcommand=scrollbar.set)
+        endpoint = self.metrics_server.url if self.metrics_server else "未啟用（可在「設定」中指定連接埠）"
+        ttk.Label(main, foreground="gray", text=f"Prometheus 端點：{endpoint}").grid(
+            row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        ttk.Button(main, text="匯出追蹤...", command=lambda: self._export_trace(win),
+                   state=tk.NORMAL if TRACER.enabled else tk.DISABLED).grid(
+            row=1, column=0, columnspan=2, sticky=tk.E, pady=(5, 0))
+
+        self._refresh_diagnostics(win, tree)
+        self._center_window(win)
+
+    def _refresh_diagnostics(self, win: tk.Toplevel, tree: ttk.Treeview):
+        """以 (指標, 標籤) 為 item id 原地更新數值，捲動位置不受重新整理影響。"""
+        if not win.winfo_exists():
+            return
+        rows = {}
+        for metric, samples in REGISTRY.collect():
+            if isinstance(metric, Histogram):
+                for suffix, labels, value in samples:
+                    if suffix in ("_count", "_sum"):
+                        key = tuple(labels.items())
+                        rows.setdefault((metric, key), {})[suffix] = value
+                continue
+            for _, labels, value in samples:
+                rows[(metric, tuple(labels.items()))] = value
+        seen = set()
+        for (metric, labels), value in rows.items():
+            iid = metric.name + "".join(f"|{k}={v}" for k, v in labels)
+            seen.add(iid)
+            values = (metric.documentation, ", ".join(f"{k}={v}" for k, v in labels),
+                      self._format_metric(metric, value))
+            if tree.exists(iid):
+                tree.item(iid, values=values)
+            else:
+                tree.insert("", "end", iid=iid, values=values)
+        for iid in tree.get_children():
+            if iid not in seen:
+                tree.delete(iid)
+        win.after(self.DIAGNOSTICS_REFRESH_MS, lambda: self._refresh_diagnostics(win, tree))
+
+    def _export_trace(self, parent: tk.Toplevel):
+        """將追蹤緩衝區存成 Chrome trace-event JSON（以 Perfetto 或 chrome://tracing 開啟）。"""
+        path = filedialog.asksaveasfilename(
+            parent=parent,
+            title="匯出追蹤",
+            initialfile=TRACE_FILE,
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            spans = TRACER.export(path)
+        except OSError as e:
+            self.queue.put({"type": "error", "text": f"無法匯出追蹤：{e}"})
+            return
+        self._log(f"已匯出 {spans} 個追蹤區段：{path}（可在 ui.perfetto.dev 開啟）")
+
+    @staticmethod
+    def _format_metric(metric, value) -> str:
+        if isinstance(value, dict):
+            count = value.get("_count", 0)
+            average = value.get("_sum", 0.0) / count if count else 0.0
+            return f"{int(count):,} 次，平均 {average:.2f} 秒"
+        if metric is BYTES_TRANSFERRED:
+            return f"{value / 1024 / 1024:,.1f} MB"
+        return f"{value:,.0f}" if value == int(value) else f"{value:,.2f}"
+
+    # ─── 監看資料夾 ────────────────────────────────────────
+
+    def _start_watch_folder(self):
+        self.watch_folder = WatchFolder(
+            self.WATCH_FOLDER, lambda urls, options: self._submit_urls(urls, options, "監看資料夾"),
+            on_event=self._on_watch_event)
+        try:
+            self.watch_folder.start()
+        except OSError as e:
+            self.watch_folder = None
+            self._log(f"無法監看資料夾 {self.WATCH_FOLDER}：{e}")
+            return
+        self._log(f"正在監看資料夾：{self.watch_folder.directory}（{self.watch_folder.mode}）")
+
+    def _stop_watch_folder(self):
+        if self.watch_folder is not None:
+            self.watch_folder.stop()
+            self.watch_folder = None
+
+    def _on_watch_event(self, event: str, name: str, detail: str):
+        """監看執行緒上回報檔案處理結果。"""
+        mark = "✔" if event == "done" else "❌"
+        self.queue.put({"type": "log", "text": f"監看資料夾 {mark} {name}：{detail}"})
+
+    def _browse_watch_folder(self, parent: tk.Toplevel):
+        path = filedialog.askdirectory(
+            parent=parent,
+            title="選取監看資料夾",
+            initialdir=self.watch_folder_var.get() or self.DEFAULT_DOWNLOAD_PATH,
+        )
+        if path:
+            self.watch_folder_var.set(path)
+
+    def _submit_urls(self, urls: list, options: dict, source: str) -> list:
+        """
+        在背景執行緒上分析網址並加入下載佇列（控制 API 與監看資料夾共用）。
+        與批次網址相同的並行分析與依影片 ID 去重，並略過已在佇列中等待或執行的網址。
+        """
+        analyzer = BatchAnalyzer(lambda url: self.download_manager.analyze_url(url, quiet=True),
+                                 max_workers=self.BATCH_ANALYSIS_WORKERS)
+        result = analyzer.run(urls)
+        videos = result["videos"]
+        if options.get("sync"):
+            done = self.history.downloaded_videos(url for _, url in videos)
+            videos = [(title, url) for title, url in videos if url not in done]
+        queued = self.scheduler.active_urls()
+        videos = [(title, url) for title, url in videos if url not in queued]
+        jobs = [make_job(title, url, options, self.DEFAULT_DOWNLOAD_PATH) for title, url in videos]
+        self.scheduler.add(jobs)
+        self.queue.put({"type": "log", "text": (
+            f"{source}加入 {len(jobs)} 個下載工作（{len(urls)} 個網址，失敗 {len(result['failed'])} 個）。")})
+        return jobs
+
     # ═══════════════════════════════════════════════════════
     #  UI 建立
     # ═══════════════════════════════════════════════════════
@@ -260,6 +730,49 @@ class YouTubeDownloaderGUI:
             self.url_var.set(current[:max_len])
             self._log(f"警告：貼上的網址過長，已自動截斷至 {max_len} 個字元。")
 
+    def _schedule_speculative_analysis(self, *args):
+        """網址變動後延遲啟動預先分析；網址在延遲內再次變動則重新計時。"""
+        if self._speculate_after_id:
+            self.root.after_cancel(self._speculate_after_id)
+            self._speculate_after_id = None
+        if not self.SPECULATIVE_ANALYSIS:
+            return
+        url = self.url_var.get().strip()
+        if not self.YOUTUBE_URL_RE.match(url):
+            self.speculative_loader.cancel()
+            return
+        self._speculate_after_id = self.root.after(
+            self.SPECULATE_DELAY_MS, lambda: self._start_speculative_analysis(url))
+
+    def _start_speculative_analysis(self, url: str):
+        self._speculate_after_id = None
+        if url == self.url_var.get().strip():
+            # 結果只進入快取；網址改變後的新請求會取代仍在排隊的舊請求
+            self.speculative_loader.request(url, lambda *args: None)
+
+    def _take_speculative_result(self, url: str):
+        """
+        於分析工作執行緒中取得預先分析的結果：已完成則立即回傳，進行中則等待其完成。
+        沒有對應的預先分析、預先分析失敗或被較新的請求取代時回傳 None。
+        """
+        if not self.speculative_loader.has(url):
+            self.speculative_loader.cancel()
+            return None
+        done = threading.Event()
+        box = {}
+
+        def on_done(generation, _url, result, error):
+            box["result"] = result if error is None else None
+            done.set()
+
+        generation = self.speculative_loader.request(url, on_done)
+        while not done.wait(0.2):
+            if self.speculative_loader.generation != generation:
+                return None
+        # 預先分析的結果只使用一次，之後再次分析同一網址會重新擷取最新內容
+        self.speculative_loader.discard(url)
+        return box.get("result")
+
     def _create_widgets(self):
         main = ttk.Frame(self.root, padding="10")
         main.grid(row=0, column=0, sticky="nsew")
@@ -280,8 +793,12 @@ class YouTubeDownloaderGUI:
 
         ttk.Button(header, text="分析網址",
                    command=self._analyze_url).grid(row=0, column=2, sticky=tk.W, padx=(5, 0))
+        self.batch_btn = ttk.Button(header, text="批次網址...", command=self._open_batch_window)
+        self.batch_btn.grid(row=0, column=3, sticky=tk.W, padx=(5, 0))
+        ttk.Button(header, text="診斷",
+                   command=self._open_diagnostics_window).grid(row=0, column=4, sticky=tk.E, padx=(10, 0))
         ttk.Button(header, text="設定",
-                   command=self._open_settings_window).grid(row=0, column=3, sticky=tk.E, padx=(10, 0))
+                   command=self._open_settings_window).grid(row=0, column=5, sticky=tk.E, padx=(5, 0))
         row += 1
 
         url_entry.bind('<FocusIn>', lambda e: (e.widget.select_range(0, 'end'), e.widget.icursor('end')))
@@ -354,6 +871,11 @@ class YouTubeDownloaderGUI:
         # 切換到歷史分頁時自動重新整理
         self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
+        # ── 下載佇列 ──
+        self._build_queue_panel(main, row)
+        main.rowconfigure(row, weight=1)
+        row += 1
+
         # ── 進度條 ──
         ttk.Label(main, text="總進度:").grid(row=row, column=0, sticky=tk.W, pady=(10, 0))
         self.total_progress_bar = ttk.Progressbar(
@@ -381,8 +903,8 @@ class YouTubeDownloaderGUI:
         main.rowconfigure(row, weight=1)
         row += 1
 
-        self.log_text = scrolledtext.ScrolledText(log_frame, height=8, width=70)
-        self.log_text.grid(row=0, column=0, sticky="nsew")
+        self.log_view = LogView(log_frame, max_lines=self.LOG_VIEW_LINES, height=8, width=70)
+        self.log_view.grid(row=0, column=0, sticky="nsew")
 
         # ── 下載按鈕 ──
         style = ttk.Style()
@@ -427,46 +949,86 @@ class YouTubeDownloaderGUI:
         self.formats_frame.rowconfigure(0, weight=1)
 
     def _build_videos_tab(self):
-        """建立「頻道影片」分頁內容。"""
-        self.videos_tree = ttk.Treeview(
-            self.videos_frame, columns=("Title",), show="tree headings", height=10)
+        """建立「頻道影片」分頁內容（虛擬化列表，僅為可見列建立 Tk item）。"""
+        filter_frame = ttk.Frame(self.videos_frame)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        filter_frame.columnconfigure(1, weight=1)
+        ttk.Label(filter_frame, text="篩選:").grid(row=0, column=0, sticky=tk.W, padx=(5, 5))
+        filter_entry = ttk.Entry(filter_frame, textvariable=self.video_filter_var)
+        filter_entry.grid(row=0, column=1, sticky="ew")
+        self.video_filter_count_var = tk.StringVar(value="")
+        ttk.Label(filter_frame, textvariable=self.video_filter_count_var).grid(
+            row=0, column=2, sticky=tk.E, padx=(10, 5))
+        ttk.Label(filter_frame, text="例：關鍵字 dur>10m date>=2023-01 views>1k",
+                  foreground="gray").grid(row=1, column=1, sticky=tk.W)
+        ttk.Checkbutton(filter_frame, text="顯示縮圖", variable=self.show_video_thumbs_var,
+                        command=self._toggle_video_thumbnails).grid(
+            row=0, column=3, sticky=tk.E, padx=(5, 5))
+        ttk.Style().configure("Thumbs.Treeview", rowheight=self.VIDEO_THUMB_SIZE[1] + 4)
+        self.video_filter_var.trace_add("write", self._schedule_video_filter)
+
+        self.video_list = VirtualTreeview(
+            self.videos_frame, self._video_row,
+            columns=("Title", "Duration", "Uploaded", "Views"),
+            show="tree headings", height=10)
+        self.videos_tree = self.video_list.tree
         self.videos_tree.heading("#0", text="選取", anchor=tk.CENTER)
         self.videos_tree.heading("Title", text="影片標題", anchor=tk.W)
+        self.videos_tree.heading("Duration", text="長度", anchor=tk.CENTER)
+        self.videos_tree.heading("Uploaded", text="上傳日期", anchor=tk.CENTER)
+        self.videos_tree.heading("Views", text="觀看次數", anchor=tk.E)
         self.videos_tree.column("#0", width=40, anchor=tk.CENTER)
-        self.videos_tree.column("Title", width=800)
+        self.videos_tree.column("Title", width=560)
+        self.videos_tree.column("Duration", width=70, stretch=False, anchor=tk.CENTER)
+        self.videos_tree.column("Uploaded", width=90, stretch=False, anchor=tk.CENTER)
+        self.videos_tree.column("Views", width=90, stretch=False, anchor=tk.E)
 
-        scrollbar = ttk.Scrollbar(self.videos_frame, orient="vertical",
-                                  command=self.videos_tree.yview)
-        self.videos_tree.configure(yscrollcommand=scrollbar.set)
-        self.videos_tree.grid(row=0, column=0, sticky="nsew")
-        scrollbar.grid(row=0, column=1, sticky="ns")
+        self.video_list.grid(row=1, column=0, columnspan=2, sticky="nsew")
         self.videos_frame.columnconfigure(0, weight=1)
-        self.videos_frame.rowconfigure(0, weight=1)
+        self.videos_frame.rowconfigure(1, weight=1)
 
         self.videos_tree.bind('<<TreeviewSelect>>', self._on_video_select)
+        self.video_list.add_viewport_listener(self._on_video_viewport)
+        self._apply_video_thumbnail_style()
 
         btn_frame = ttk.Frame(self.videos_frame)
-        btn_frame.grid(row=1, column=0, columnspan=2, pady=5)
+        btn_frame.grid(row=2, column=0, columnspan=2, pady=5)
         ttk.Button(btn_frame, text="全選",
                    command=self._select_all_videos).grid(row=0, column=0, padx=5)
         ttk.Button(btn_frame, text="取消全選",
                    command=self._deselect_all_videos).grid(row=0, column=1, padx=5)
+        ttk.Button(btn_frame, text="反向選取",
+                   command=self._invert_video_selection).grid(row=0, column=2, padx=5)
+        ttk.Button(btn_frame, text="勾選篩選結果",
+                   command=self._select_filtered_videos).grid(row=0, column=3, padx=5)
 
     def _build_history_tab(self):
         """建立「下載歷史」分頁內容，並讓列表寬度填滿可用空間。"""
         self.history_frame.columnconfigure(0, weight=1)
-        self.history_frame.rowconfigure(0, weight=1)
+        self.history_frame.rowconfigure(1, weight=1)
+
+        search_frame = ttk.Frame(self.history_frame)
+        search_frame.grid(row=0, column=0, sticky="ew", pady=(5, 0))
+        search_frame.columnconfigure(1, weight=1)
+        ttk.Label(search_frame, text="搜尋:").grid(row=0, column=0, sticky=tk.W, padx=(5, 5))
+        self.history_search_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.history_search_var).grid(row=0, column=1, sticky="ew")
+        self.history_search_count_var = tk.StringVar(value="")
+        ttk.Label(search_frame, textvariable=self.history_search_count_var).grid(
+            row=0, column=2, sticky=tk.E, padx=(10, 5))
+        self.history_search_var.trace_add("write", self._schedule_history_search)
 
         hist_tree_frame = ttk.Frame(self.history_frame)
-        hist_tree_frame.grid(row=0, column=0, sticky="nsew")
+        hist_tree_frame.grid(row=1, column=0, sticky="nsew")
         hist_tree_frame.columnconfigure(0, weight=1)
         hist_tree_frame.rowconfigure(0, weight=1)
 
-        self.history_tree = ttk.Treeview(
-            hist_tree_frame,
+        self.history_list = VirtualTreeview(
+            hist_tree_frame, self._history_row,
             columns=("Title", "Format", "Resolution", "Status", "Date"),
             show="headings", height=10,
         )
+        self.history_tree = self.history_list.tree
         self.history_tree.heading("Title", text="標題", anchor=tk.W)
         self.history_tree.heading("Format", text="格式", anchor=tk.CENTER)
         self.history_tree.heading("Resolution", text="解析度", anchor=tk.CENTER)
@@ -480,15 +1042,12 @@ class YouTubeDownloaderGUI:
         self.history_tree.column("Status", width=60, stretch=False, anchor=tk.CENTER)
         self.history_tree.column("Date", width=140, stretch=False, anchor=tk.CENTER)
 
-        h_scroll = ttk.Scrollbar(hist_tree_frame, orient="vertical",
-                                 command=self.history_tree.yview)
-        self.history_tree.configure(yscrollcommand=h_scroll.set)
-        self.history_tree.grid(row=0, column=0, sticky="nsew")
-        h_scroll.grid(row=0, column=1, sticky="ns")
+        self.history_list.grid(row=0, column=0, sticky="nsew")
+        self.history_list.add_viewport_listener(self._on_history_viewport)
 
         # 統計 + 按鈕行
         ctrl_frame = ttk.Frame(self.history_frame)
-        ctrl_frame.grid(row=1, column=0, sticky="ew", pady=5, padx=5)
+        ctrl_frame.grid(row=2, column=0, sticky="ew", pady=5, padx=5)
 
         self.history_stats_var = tk.StringVar(value="統計：尚無記錄")
         ttk.Label(ctrl_frame, textvariable=self.history_stats_var).pack(side=tk.LEFT)
@@ -502,26 +1061,115 @@ class YouTubeDownloaderGUI:
         self._refresh_history()
 
     def _on_tab_changed(self, event):
-        """當切換到歷史分頁時自動重新整理。"""
-        if self.notebook.index("current") == 2:
+        """切換到歷史分頁時補上期間新增的記錄（累積過多時才整個重新載入）。"""
+        if self.notebook.index("current") != 2:
+            return
+        if self._history_stale:
             self._refresh_history()
+        elif self._history_pending and not self._history_searching():
+            ids, self._history_pending = self._history_pending, []
+            self._prepend_history(ids)
 
     # ═══════════════════════════════════════════════════════
     #  歷史記錄
     # ═══════════════════════════════════════════════════════
 
     def _refresh_history(self):
-        """重新載入並顯示下載歷史。"""
-        self.history_tree.delete(*self.history_tree.get_children())
-        records = self.history.get_all(limit=200)
-        for rec in records:
-            self.history_tree.insert("", "end", values=(
-                rec.get("title", "")[:80],
-                rec.get("format", ""),
-                rec.get("resolution", ""),
-                "成功" if rec.get("status") == "success" else "失敗",
-                rec.get("downloaded_at", "")[:19],
-            ))
+        """
+        從最新的記錄重新載入歷史分頁（只讀取第一頁，其餘在捲動到底時才載入）；
+        搜尋框有內容時改為顯示搜尋結果。
+        """
+        self._history_records = []
+        self._history_ids = set()
+        self._history_pending = []
+        self._history_stale = False
+        query = self.history_search_var.get().strip()
+        if query:
+            self._history_more = False
+            self.history_search_count_var.set("搜尋中...")
+            self.history_search_loader.request(query, self._on_history_search_done)
+        else:
+            self.history_search_loader.cancel()
+            self._load_history_page()
+            self.history_search_count_var.set("")
+        self.history_list.set_row_count(len(self._history_records))
+        self._update_history_stats()
+
+    def _on_history_search_done(self, generation: int, query: str, records, error):
+        """歷史搜尋的回呼（背景執行緒）：結果交回主執行緒處理。"""
+        self.queue.put({"type": "history_search", "generation": generation,
+                        "records": records, "error": error})
+
+    def _apply_history_search_result(self, generation: int, records, error):
+        """顯示搜尋結果；已被較新字詞或清除搜尋取代的結果直接丟棄。"""
+        if generation != self.history_search_loader.generation:
+            return
+        if error is not None:
+            self.history_search_count_var.set("搜尋失敗")
+            self._log(f"搜尋下載歷史失敗: {error}")
+            return
+        self._history_records = records
+        self._history_ids = {rec["id"] for rec in records}
+        count = len(records)
+        self.history_search_count_var.set(
+            f"找到 {count} 筆" if count < self.HISTORY_SEARCH_LIMIT else f"最相關的 {count} 筆")
+        self.history_list.set_row_count(count)
+
+    def _history_searching(self) -> bool:
+        return bool(self.history_search_var.get().strip())
+
+    def _schedule_history_search(self, *args):
+        """輸入搜尋字詞時延遲查詢，連續輸入只執行最後一次。"""
+        if self._history_search_after_id:
+            self.root.after_cancel(self._history_search_after_id)
+        self._history_search_after_id = self.root.after(200, self._apply_history_search)
+
+    def _apply_history_search(self):
+        self._history_search_after_id = None
+        self._refresh_history()
+
+    def _load_history_page(self) -> int:
+        """以鍵集分頁接著已載入的最後一筆讀取下一頁，回傳新增的筆數。"""
+        before = page_key(self._history_records[-1]) if self._history_records else None
+        records = self.history.get_page(before, limit=self.HISTORY_PAGE_SIZE)
+        self._history_more = len(records) == self.HISTORY_PAGE_SIZE
+        records = [rec for rec in records if rec["id"] not in self._history_ids]
+        self._history_records += records
+        self._history_ids.update(rec["id"] for rec in records)
+        return len(records)
+
+    def _history_row(self, pos: int) -> dict:
+        """歷史分頁虛擬化列表的資料列提供者。"""
+        rec = self._history_records[pos]
+        return {"values": (
+            (rec.get("title") or "")[:80],
+            rec.get("format") or "",
+            rec.get("resolution") or "",
+            "成功" if rec.get("status") == "success" else "失敗",
+            (rec.get("downloaded_at") or "")[:19],
+        )}
+
+    def _on_history_viewport(self, start: int, stop: int):
+        """可見範圍接近已載入的最後一列時，於閒置時載入下一頁。"""
+        near_end = stop + self.HISTORY_PAGE_SIZE // 4 >= len(self._history_records)
+        if self._history_more and near_end and self._history_load_after_id is None:
+            self._history_load_after_id = self.root.after_idle(self._load_more_history)
+
+    def _load_more_history(self):
+        self._history_load_after_id = None
+        if self._load_history_page():
+            self.history_list.resize(len(self._history_records))
+
+    def _prepend_history(self, ids: list):
+        """將新寫入的記錄加在列表頂端，不重建已載入的部分。"""
+        records = [rec for rec in self.history.get_records(ids) if rec["id"] not in self._history_ids]
+        if records:
+            self._history_records[:0] = records
+            self._history_ids.update(rec["id"] for rec in records)
+            self.history_list.prepend(len(records))
+        self._update_history_stats()
+
+    def _update_history_stats(self):
         stats = self.history.get_stats()
         size_mb = stats["total_size_bytes"] / (1024 * 1024)
         self.history_stats_var.set(
@@ -539,8 +1187,8 @@ class YouTubeDownloaderGUI:
 
     def _add_history_record(self, url: str, title: str, fmt: str = "",
                             resolution: str = "", file_path: str = "",
-                            status: str = "success", error_msg: str = ""):
-        """新增一筆下載歷史記錄（執行緒安全：僅寫 DB，UI 更新透過佇列）。"""
+                            status: str = "success", error_msg: str = "", timings=None):
+        """新增一筆下載歷史記錄（執行緒安全：僅寫 DB，UI 更新透過佇列）；timings 為工作的階段計時。"""
         file_size = 0
         if file_path and os.path.isfile(file_path):
             try:
@@ -548,14 +1196,47 @@ class YouTubeDownloaderGUI:
             except OSError:
                 pass
 
-        self.history.add_record(
+        # 由 HistoryWriter 批次寫入，寫入後以 history_changed 訊息通知主執行緒更新顯示
+        self.history_writer.add(
             url=url, title=title, format_type=fmt, resolution=resolution,
             file_path=file_path, file_size=file_size,
             status=status, error_msg=error_msg,
+            **(timings.as_record() if timings else {}),
         )
 
-        # 透過佇列通知主執行緒更新顯示（避免從背景執行緒直接操作 tkinter）
-        self.queue.put({"type": "refresh_history"})
+    def _on_history_changed(self, messages: list):
+        """
+        同一輪的所有 history_changed 通知合併處理；歷史分頁不在前景或正在顯示搜尋結果時先記下 id，
+        切換回來或清除搜尋時再補上。
+        """
+        visible = self.notebook.index("current") == 2
+        if any(msg.get("archived") for msg in messages):
+            # 有記錄被封存刪除：已載入的列表不再正確
+            if visible:
+                self._refresh_history()
+            else:
+                self._history_stale = True
+            return
+        ids = [record_id for msg in messages for record_id in msg.get("ids", ())]
+        if visible and not self._history_searching():
+            self._prepend_history(ids)
+        elif not self._history_stale:
+            self._history_pending += ids
+            if len(self._history_pending) > self.HISTORY_PAGE_SIZE:
+                self._history_pending = []
+                self._history_stale = True
+
+    def _log_background_error(self, text: str):
+        """背景元件的錯誤回呼：以日誌訊息交給主執行緒（不彈出對話框，無人操作時也不會擋住訊息處理）。"""
+        self.queue.put({"type": "log", "text": text})
+
+    def _on_history_archived(self, archived: int, freed_pages: int):
+        """HistoryRetention 的回呼（背景執行緒）：透過訊息佇列通知主執行緒。"""
+        if archived:
+            self.queue.put({"type": "log", "text": (
+                f"已將 {archived} 筆超過 {self.HISTORY_RETENTION_DAYS} 天的下載記錄封存到 "
+                f"{self.history_retention.directory}。")})
+            self.queue.put({"type": "history_changed", "ids": [], "archived": archived})
 
     # ═══════════════════════════════════════════════════════
     #  右鍵選單
@@ -573,6 +1254,7 @@ class YouTubeDownloaderGUI:
     # ═══════════════════════════════════════════════════════
 
     def _set_ui_state(self, state: str):
+        self._ui_state = state
         for widget in self.interactive_widgets:
             wtype = widget.winfo_class()
             if wtype in ('TCombobox', 'TEntry', 'TButton', 'TRadiobutton'):
@@ -597,44 +1279,24 @@ class YouTubeDownloaderGUI:
 
     def _log(self, message: str):
         """寫入 GUI 日誌區塊，並持久化到 LOG_FILE。"""
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
-        self._write_log_file(message)
+        self._log_lines([message])
 
-    def _write_log_file(self, message: str):
-        """將訊息附加到持久日誌檔（執行緒安全）。"""
-        try:
-            timestamp = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-            line = f"{timestamp} {message}\n"
-            with self._log_lock:
-                self._rotate_if_needed()
-                with open(self.LOG_FILE, "a", encoding="utf-8") as f:
-                    f.write(line)
-        except Exception:
-            pass  # 寫入日誌失敗不應影響主程式
+    def _log_batch(self, messages: list):
+        """訊息幫浦的日誌批次處理：連續的日誌訊息一次插入。"""
+        self._log_lines([msg["text"] for msg in messages])
 
-    def _rotate_if_needed(self):
-        """若日誌檔超過上限，裁減為原有的一半大小。"""
-        try:
-            if not os.path.isfile(self.LOG_FILE):
-                return
-            size = os.path.getsize(self.LOG_FILE)
-            if size <= self.MAX_LOG_SIZE:
-                return
-            # 讀取全部行，保留後半
-            with open(self.LOG_FILE, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            keep = len(lines) // 2
-            with open(self.LOG_FILE, "w", encoding="utf-8") as f:
-                f.write("…（已自動裁減舊日誌）…\n")
-                f.writelines(lines[keep:])
-        except Exception:
-            pass
+    def _log_lines(self, lines: list):
+        """交給日誌檢視批次插入（畫面只保留最近的行），並寫入日誌檔。"""
+        self.log_view.append(lines)
+        for line in lines:
+            self._write_log_file(line)
+
+    def _write_log_file(self, message: str):
+        """將訊息交給背景日誌寫入器（執行緒安全、不阻塞）。"""
+        self.log_writer.write(message)
 
     def _update_status(self, message: str):
         self.status_var.set(message)
-        self.root.update_idletasks()
 
     def _center_root_window(self):
         """將主視窗置中於螢幕。"""
@@ -721,82 +1383,117 @@ class YouTubeDownloaderGUI:
         return result.get()
 
     def _on_closing(self):
-        if self._after_id:
-            self.root.after_cancel(self._after_id)
+        # 先停止訊息幫浦：之後背景執行緒的 put() 不再呼叫 Tk（主執行緒等待它們結束時，
+        # 跨執行緒的 event_generate 會一直等到主迴圈恢復而卡住）
+        self.queue.stop()
+        # 以暫停方式中止執行中的下載（保留 .part 檔，下次啟動時續傳），避免背景執行緒在視窗關閉後繼續寫檔
+        self._stop_api_server()
+        self._stop_watch_folder()
+        self._stop_metrics_server()
+        self.window_controller.stop()
+        self.history_retention.stop()
+        self.scheduler.shutdown(timeout=self.SHUTDOWN_TIMEOUT)
+        # 關閉期間送出的日誌不再顯示，直接寫入日誌檔
+        for msg in self.queue.take_remaining():
+            if msg.get("type") == "log":
+                self._write_log_file(msg["text"])
+        self.thumbnails.close()
+        self.details_loader.close()
+        self.speculative_loader.close()
+        self.history_search_loader.close()
+        if self.batch_analyzer is not None:
+            self.batch_analyzer.cancel()
+        self.history_writer.close()
+        self.history.close()
+        self.log_writer.close()
+        if self.log_writer.dropped:
+            print(f"日誌緩衝區已滿，共有 {self.log_writer.dropped} 行未寫入 {self.LOG_FILE}。")
+        if self.log_writer.failed:
+            print(f"寫入日誌檔失敗，共有 {self.log_writer.failed} 行未寫入 {self.LOG_FILE}。")
         self.root.destroy()
 
     # ═══════════════════════════════════════════════════════
     #  訊息佇列監聽
     # ═══════════════════════════════════════════════════════
 
-    def _check_queue(self):
-        try:
-            while True:
-                msg = self.queue.get_nowait()
-                mtype = msg.get("type")
-                if mtype == "log":
-                    self._log(msg["text"])
-                elif mtype == "status":
-                    self._update_status(msg["text"])
-                elif mtype == "video_title":
-                    self.video_title_var.set(msg["text"])
-                elif mtype == "total_progress":
-                    self.total_progress_var.set(msg["value"])
-                elif mtype == "file_progress":
-                    self.file_progress_var.set(msg["value"])
-                elif mtype == "set_ui_state":
-                    self._set_ui_state(msg["state"])
-                elif mtype == "formats":
-                    self._populate_formats(msg["data"])
-                elif mtype == "subtitles":
-                    self._populate_subtitles(msg["data"])
-                elif mtype == "videos":
-                    self._populate_videos(msg["data"])
-                elif mtype == "switch_tab":
-                    self.notebook.select(msg["index"])
-                elif mtype == "thumbnail_url":
-                    threading.Thread(target=self._display_thumbnail_worker,
-                                     args=(msg["url"],), daemon=True).start()
-                elif mtype == "update_thumbnail":
-                    self._update_thumbnail(msg["image"])
-                elif mtype == "error":
-                    self._show_error("錯誤", msg["text"])
-                elif mtype == "success":
-                    self._show_info("成功", msg["text"])
-                elif mtype == "clear_and_disable_subtitles":
-                    self.subtitle_combo['values'] = []
-                    self.subtitle_combo.set("")
-                    self.subtitle_combo.config(state='disabled')
-                elif mtype == "update_single_video_subtitles":
-                    subtitles = msg["data"]
-                    self.available_subtitles = subtitles
-                    display_values = list(subtitles.keys())
-                    self.subtitle_combo['values'] = display_values
-                    self.subtitle_combo.set(display_values[0] if display_values else "無可用字幕")
-                    self.subtitle_combo.config(state='readonly')
-                elif mtype == "refresh_history":
-                    self._refresh_history()
-        except queue.Empty:
-            pass
-        self._after_id = self.root.after(100, self._check_queue)
+    def _handle_message(self, msg: dict):
+        """由訊息幫浦在主執行緒上逐一分派（日誌訊息另由 _log_batch 批次處理）。"""
+        mtype = msg.get("type")
+        if mtype == "log":
+            self._log(msg["text"])
+        elif mtype == "status":
+            self._update_status(msg["text"])
+        elif mtype == "video_title":
+            self.video_title_var.set(msg["text"])
+        elif mtype == "total_progress":
+            self.total_progress_var.set(msg["value"])
+        elif mtype == "file_progress":
+            self.file_progress_var.set(msg["value"])
+        elif mtype == "set_ui_state":
+            self._set_ui_state(msg["state"])
+        elif mtype == "formats":
+            self._populate_formats(msg["data"])
+        elif mtype == "subtitles":
+            self._populate_subtitles(msg["data"])
+        elif mtype == "videos":
+            self._populate_videos(msg["data"], msg.get("meta"), msg.get("index"))
+        elif mtype == "switch_tab":
+            self.notebook.select(msg["index"])
+        elif mtype == "thumbnail_url":
+            self._request_thumbnail(msg["url"])
+        elif mtype == "update_thumbnail":
+            self._update_thumbnail(msg["url"], msg["image"])
+        elif mtype == "batch_result":
+            self._apply_batch_result(msg["result"], msg["index"], msg["urls"], msg["preview"])
+        elif mtype == "history_search":
+            self._apply_history_search_result(msg["generation"], msg["records"], msg["error"])
+        elif mtype == "video_details":
+            self._apply_video_details(msg["generation"], msg["details"], msg["error"])
+        elif mtype == "video_thumbnail":
+            self._set_video_thumbnail(msg["index"], msg["generation"], msg["image"])
+        elif mtype == "error":
+            self._show_error("錯誤", msg["text"])
+        elif mtype == "success":
+            self._show_info("成功", msg["text"])
+        elif mtype == "clear_and_disable_subtitles":
+            self.subtitle_combo['values'] = []
+            self.subtitle_combo.set("")
+            self.subtitle_combo.config(state='disabled')
+        elif mtype == "update_single_video_subtitles":
+            subtitles = msg["data"]
+            self.available_subtitles = subtitles
+            display_values = list(subtitles.keys())
+            self.subtitle_combo['values'] = display_values
+            self.subtitle_combo.set(display_values[0] if display_values else "無可用字幕")
+            self.subtitle_combo.config(state='readonly')
+        elif mtype == "jobs_changed":
+            self._schedule_queue_refresh()
 
     # ═══════════════════════════════════════════════════════
     #  縮圖顯示
     # ═══════════════════════════════════════════════════════
 
-    def _display_thumbnail_worker(self, url: str):
+    def _request_thumbnail(self, url: str):
+        """透過縮圖服務（連線池 + 記憶體/磁碟快取）載入主縮圖。"""
+        self._thumbnail_url = url
+        future = self.thumbnails.submit(url, (320, 180))
+        future.add_done_callback(lambda f: self._on_thumbnail_loaded(url, f))
+
+    def _on_thumbnail_loaded(self, url: str, future):
+        """於縮圖工作執行緒回呼：只傳遞已解碼的 PIL Image，PhotoImage 在主執行緒建立。"""
+        if future.cancelled():
+            return
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            img = Image.open(BytesIO(response.content))
-            img.thumbnail((320, 180))
-            photo = ImageTk.PhotoImage(img)
-            self.queue.put({"type": "update_thumbnail", "image": photo})
+            image = future.result()
         except Exception as e:
-            self._log(f"無法載入縮圖: {e}")
+            self.queue.put({"type": "log", "text": f"無法載入縮圖: {e}"})
+            return
+        self.queue.put({"type": "update_thumbnail", "url": url, "image": image})
 
-    def _update_thumbnail(self, photo):
-        self.thumbnail_photo = photo
+    def _update_thumbnail(self, url: str, image):
+        if url != self._thumbnail_url:
+            return
+        self.thumbnail_photo = ImageTk.PhotoImage(image)
         self.thumbnail_label.config(image=self.thumbnail_photo)
 
     # ═══════════════════════════════════════════════════════
@@ -819,16 +1516,21 @@ class YouTubeDownloaderGUI:
         self.video_title_var.set("")
         self.thumbnail_label.config(image='')
         self.thumbnail_photo = None
+        self._thumbnail_url = None
         self.formats_tree.delete(*self.formats_tree.get_children())
-        self.videos_tree.delete(*self.videos_tree.get_children())
         self.subtitle_combo['values'] = ["none"]
         self.subtitle_combo.set("none")
         self.available_formats.clear()
         self.available_subtitles.clear()
-        self.channel_videos.clear()
+        self.channel_videos = []
+        self.channel_video_meta = []
+        self.video_index = None
+        self.details_loader.cancel()
+        self.video_filter_var.set("")
+        self._reset_video_list()
         self.total_progress_var.set(0)
         self.file_progress_var.set(0)
-        self.log_text.delete('1.0', tk.END)
+        self.log_view.clear()
 
         self._set_ui_state('disabled')
         self._update_status("正在分析網址...")
@@ -837,7 +1539,11 @@ class YouTubeDownloaderGUI:
 
     def _analyze_url_worker(self, url: str):
         try:
-            result = self.download_manager.analyze_url(url)
+            result = self._take_speculative_result(url)
+            if result is not None:
+                self.queue.put({"type": "log", "text": "使用背景預先分析的結果。"})
+            else:
+                result = self.download_manager.analyze_url(url)
 
             if result["type"] == "playlist":
                 self.queue.put({"type": "status", "text": "正在分析頻道/播放列表..."})
@@ -845,7 +1551,11 @@ class YouTubeDownloaderGUI:
                 self.queue.put({"type": "video_title", "text": result["title"]})
                 if result.get("thumbnail_url"):
                     self.queue.put({"type": "thumbnail_url", "url": result["thumbnail_url"]})
-                self.queue.put({"type": "videos", "data": result["videos"]})
+                # 索引建立可能需時較久，於背景執行緒完成後再交給主執行緒
+                index = VideoIndex([title for title, _ in result["videos"]],
+                                   result.get("video_meta"))
+                self.queue.put({"type": "videos", "data": result["videos"],
+                                "meta": result.get("video_meta", []), "index": index})
                 self.queue.put({"type": "status", "text": f"找到 {result['video_count']} 個影片"})
                 self.queue.put({"type": "clear_and_disable_subtitles"})
 
@@ -868,19 +1578,208 @@ class YouTubeDownloaderGUI:
         finally:
             self.queue.put({"type": "set_ui_state", "state": "normal"})
 
-    def _fetch_video_details_worker(self, url: str):
-        """取得頻道列表中個別影片的詳細資訊。"""
+    # ═══════════════════════════════════════════════════════
+    #  批次網址
+    # ═══════════════════════════════════════════════════════
+
+    def _open_batch_window(self):
+        """開啟批次網址對話框：貼上多行網址、載入文字/CSV 檔，或將檔案拖放到輸入框。"""
+        win = tk.Toplevel(self.root)
+        win.title("批次網址")
+        win.geometry("640x450")
+        win.transient(self.root)
+
+        main = ttk.Frame(win, padding="10")
+        main.grid(row=0, column=0, sticky="nsew")
+        win.columnconfigure(0, weight=1)
+        win.rowconfigure(0, weight=1)
+        main.columnconfigure(0, weight=1)
+        main.rowconfigure(1, weight=1)
+
+        ttk.Label(main, text="每行一個網址（可含播放清單與頻道）；也可貼上 .txt / .csv 檔案路徑:").grid(
+            row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 5))
+        text = tk.Text(main, wrap="none", height=15, undo=True)
+        text.grid(row=1, column=0, sticky="nsew")
+        scrollbar = ttk.Scrollbar(main, orient="vertical", command=text.yview)
+        scrollbar.grid(row=1, column=1, sticky="ns")
+        text.configure(yscrollcommand=scrollbar.set)
+
+        count_var = tk.StringVar(value="")
+        preview_var = tk.BooleanVar(value=False)
+
+        def update_count(event=None):
+            text.edit_modified(False)
+            count_var.set(f"{len(expand_url_input(text.get('1.0', 'end')))} 個網址")
+
+        def insert_files(paths):
+            for path in paths:
+                try:
+                    urls = read_url_file(path)
+                except OSError as e:
+                    self._log(f"無法讀取網址檔案 {path}: {e}")
+                    continue
+                if urls:
+                    text.insert("end", ("\n" if text.get("end-2c") not in ("", "\n") else "")
+                                + "\n".join(urls) + "\n")
+            update_count()
+
+        def browse():
+            paths = filedialog.askopenfilenames(
+                parent=win, title="選取網址清單",
+                filetypes=[("網址清單", "*.txt *.csv"), ("All files", "*.*")])
+            insert_files(paths)
+
+        text.bind("<<Modified>>", update_count)
+        if self._enable_file_drop(text, insert_files):
+            count_var.set("可將 .txt / .csv 檔案拖放到輸入框")
+
+        ttk.Checkbutton(main, text="只預覽（放入「頻道影片」分頁，不直接加入下載佇列）",
+                        variable=preview_var).grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+
+        btn_frame = ttk.Frame(main)
+        btn_frame.grid(row=3, column=0, columnspan=2, sticky="ew", pady=(10, 0))
+        ttk.Label(btn_frame, textvariable=count_var).pack(side=tk.LEFT)
+        ttk.Button(btn_frame, text="取消", command=win.destroy).pack(side=tk.RIGHT, padx=(10, 0))
+        start_btn = ttk.Button(btn_frame, text="開始分析",
+                               command=lambda: self._start_batch_analysis(
+                                   expand_url_input(text.get("1.0", "end")), win, preview_var.get()))
+        start_btn.pack(side=tk.RIGHT, padx=(10, 0))
+        ttk.Button(btn_frame, text="從檔案載入...", command=browse).pack(side=tk.RIGHT)
+        if self.batch_analyzer is not None:
+            start_btn.config(state="disabled")
+            count_var.set("已有批次分析進行中")
+
+        self._center_window(win)
+        text.focus_set()
+
+    def _enable_file_drop(self, widget, callback) -> bool:
+        """若已安裝 tkinterdnd2，讓 widget 接受檔案拖放並以路徑列表呼叫 callback。"""
         try:
-            details = self.download_manager.fetch_video_details(url)
-            if details.get("thumbnail_url"):
-                self.queue.put({"type": "thumbnail_url", "url": details["thumbnail_url"]})
-            self.queue.put({"type": "update_single_video_subtitles",
-                            "data": details["subtitles"]})
-            self.queue.put({"type": "status", "text": "影片詳細資訊載入完成"})
+            from tkinterdnd2 import TkinterDnD, DND_FILES
+            TkinterDnD._require(self.root)
+            widget.drop_target_register(DND_FILES)
+            widget.dnd_bind("<<Drop>>", lambda e: callback(widget.tk.splitlist(e.data)))
+            return True
+        except (ImportError, AttributeError, tk.TclError):
+            return False
+
+    def _start_batch_analysis(self, urls: list, window: tk.Toplevel, preview: bool = False):
+        if not urls:
+            self._show_error("錯誤", "沒有找到任何網址")
+            return
+        if self.batch_analyzer is not None:
+            return
+        window.destroy()
+        self.batch_analyzer = BatchAnalyzer(
+            lambda url: self.download_manager.analyze_url(url, quiet=True),
+            max_workers=self.BATCH_ANALYSIS_WORKERS,
+            on_progress=self._on_batch_progress,
+        )
+        self.batch_btn.config(state="disabled")
+        self.total_progress_var.set(0)
+        self._log(f"--- 開始批次分析 {len(urls)} 個網址（同時進行 {self.BATCH_ANALYSIS_WORKERS} 個）---")
+        self._update_status(f"批次分析 0/{len(urls)}")
+        threading.Thread(target=self._batch_analysis_worker,
+                         args=(self.batch_analyzer, urls, preview), daemon=True).start()
+
+    def _on_batch_progress(self, done: int, total: int, url: str, error):
+        """於批次分析工作執行緒回呼：只透過佇列回報，狀態與進度訊息由訊息幫浦合併。"""
+        if error is not None:
+            self.queue.put({"type": "log", "text": f"批次分析失敗: {url} | {error}"})
+        self.queue.put({"type": "status", "text": f"批次分析 {done}/{total}"})
+        self.queue.put({"type": "total_progress", "value": done / total * 100})
+
+    def _batch_analysis_worker(self, analyzer: BatchAnalyzer, urls: list, preview: bool):
+        try:
+            result = analyzer.run(urls)
+            # 合併後的列表可能很長，預覽用的索引同樣在背景執行緒建立
+            index = VideoIndex([title for title, _ in result["videos"]], result["meta"]) if preview else None
+            self.queue.put({"type": "batch_result", "result": result, "index": index, "urls": urls,
+                            "preview": preview})
         except Exception as e:
-            self._log(f"無法獲取影片資訊: {e}")
-            self.queue.put({"type": "status", "text": "影片資訊載入失敗"})
-            self.queue.put({"type": "update_single_video_subtitles", "data": {'無': 'none'}})
+            self.queue.put({"type": "error", "text": f"批次分析失敗: {e}"})
+            self.queue.put({"type": "batch_result", "result": None, "index": None, "urls": urls,
+                            "preview": preview})
+
+    def _apply_batch_result(self, result, index, urls: list, preview: bool = False):
+        """
+        將合併、去除重複後的影片加入下載佇列（略過已在佇列中的網址），「頻道影片」分頁保持不變；
+        preview=True 時改為放入「頻道影片」分頁並全部勾選，由使用者確認後再下載。
+        """
+        self.batch_analyzer = None
+        self.batch_btn.config(state="normal")
+        if result is None:
+            self._update_status("批次分析失敗")
+            return
+
+        videos = result["videos"]
+        self._log(
+            f"批次分析完成：{len(urls)} 個網址，共 {len(videos)} 部影片"
+            f"（去除 {result['duplicates']} 部重複，{len(result['failed'])} 個網址失敗）"
+        )
+        if not videos:
+            self._update_status("批次分析完成，沒有可下載的影片")
+            return
+        if not preview:
+            self._enqueue_batch(videos)
+            return
+
+        self.video_title_var.set(f"批次：{len(urls)} 個網址")
+        self.thumbnail_label.config(image='')
+        self.thumbnail_photo = None
+        self._thumbnail_url = None
+        self.formats_tree.delete(*self.formats_tree.get_children())
+        self.available_formats.clear()
+        self.details_loader.cancel()
+        self.video_filter_var.set("")
+        self._populate_videos(videos, result["meta"], index)
+        self.video_selection.select_all()
+        self.video_list.refresh()
+        self.notebook.select(1)
+        self._update_status(f"批次分析完成：{len(videos)} 部影片已加入下載列表")
+        if self._ui_state == 'normal':
+            self.download_btn.config(state="normal")
+
+    def _enqueue_batch(self, videos: list):
+        """以目前的下載路徑與下載類型（MP4 / MP3）為批次影片建立工作並加入佇列。"""
+        download_path = self.download_path_var.get()
+        if not os.path.exists(download_path):
+            self._show_error("錯誤", "下載路徑不存在")
+            return
+        queued = self.scheduler.active_urls()
+        options = {"audio": self.download_type_var.get() == "audio", "output_dir": download_path}
+        jobs = [make_job(title, url, options, self.DEFAULT_DOWNLOAD_PATH)
+                for title, url in videos if url not in queued]
+        self._ui_batch = True
+        self.scheduler.add(jobs)
+        skipped = len(videos) - len(jobs)
+        self._log(f"批次網址加入 {len(jobs)} 個下載工作"
+                  + (f"（{skipped} 部已在佇列中，略過）。" if skipped else "。"))
+        self._update_status(f"已加入 {len(jobs)} 個下載工作")
+
+    def _request_video_details(self, url: str):
+        """防抖時間到後送出詳細資訊請求（快取命中時立即回傳）。"""
+        self._details_after_id = None
+        self.details_loader.request(url, self._on_video_details_loaded)
+
+    def _on_video_details_loaded(self, generation: int, url: str, details, error):
+        """DetailsLoader 的回呼（可能在背景執行緒）：結果一律交回主執行緒處理。"""
+        self.queue.put({"type": "video_details", "generation": generation,
+                        "details": details, "error": error})
+
+    def _apply_video_details(self, generation: int, details, error):
+        """套用頻道列表中個別影片的詳細資訊；已被較新選取取代的結果直接丟棄。"""
+        if generation != self.details_loader.generation:
+            return
+        if error is not None:
+            self._log(f"無法獲取影片資訊: {error}")
+            self._update_status("影片資訊載入失敗")
+            self._populate_subtitles({'無': 'none'})
+            return
+        if details.get("thumbnail_url"):
+            self._request_thumbnail(details["thumbnail_url"])
+        self._populate_subtitles(details["subtitles"])
+        self._update_status("影片詳細資訊載入完成")
 
     # ═══════════════════════════════════════════════════════
     #  資料填充
@@ -904,61 +1803,222 @@ class YouTubeDownloaderGUI:
         self.subtitle_combo.set(display_values[0] if display_values else "無可用字幕")
         self.subtitle_combo.config(state='readonly')
 
-    def _populate_videos(self, videos: list):
-        self.videos_tree.delete(*self.videos_tree.get_children())
+    def _populate_videos(self, videos: list, meta: list = None, index: VideoIndex = None):
         self.channel_videos = videos
-        for title, _ in videos:
-            display_title = title[:80] + "..." if len(title) > 80 else title
-            self.videos_tree.insert("", "end", text="☐", values=(display_title,))
+        self.channel_video_meta = meta or []
+        self.video_index = index
+        self._reset_video_list()
+
+    def _reset_video_list(self):
+        """依 channel_videos 重建選取模型，並依目前的篩選條件重建顯示列表。"""
+        self.video_selection.reset(len(self.channel_videos))
+        self._video_generation += 1
+        self._clear_video_thumbnails()
+        self._apply_video_filter()
+
+    def _video_row(self, pos: int) -> dict:
+        """虛擬化列表的資料列提供者（pos 為顯示位置）。"""
+        index = self._video_view[pos]
+        title = self.channel_videos[index][0]
+        display_title = title[:80] + "..." if len(title) > 80 else title
+        mark = "☑" if self.video_selection.is_selected(index) else "☐"
+        meta = self.channel_video_meta[index] if index < len(self.channel_video_meta) else {}
+        return {"text": mark, "image": self._video_thumbs.get(index, ""), "values": (
+            display_title,
+            self._format_duration(meta.get("duration")),
+            self._format_upload_date(meta.get("upload_date")),
+            f"{meta['view_count']:,}" if meta.get("view_count") is not None else "",
+        )}
+
+    @staticmethod
+    def _format_duration(seconds) -> str:
+        if seconds is None:
+            return ""
+        hours, rest = divmod(int(seconds), 3600)
+        minutes, secs = divmod(rest, 60)
+        return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+    @staticmethod
+    def _format_upload_date(date) -> str:
+        if not date or len(date) != 8:
+            return ""
+        return f"{date[:4]}-{date[4:6]}-{date[6:]}"
+
+    # ═══════════════════════════════════════════════════════
+    #  頻道影片縮圖欄（只載入可見列）
+    # ═══════════════════════════════════════════════════════
+
+    def _toggle_video_thumbnails(self):
+        self.SHOW_VIDEO_THUMBNAILS = self.show_video_thumbs_var.get()
+        self._apply_video_thumbnail_style()
+        if not self.SHOW_VIDEO_THUMBNAILS:
+            self._clear_video_thumbnails()
+        self.video_list.refresh()
+        self._save_settings()
+
+    def _apply_video_thumbnail_style(self):
+        """切換縮圖欄時調整列高與勾選欄寬度，並讓虛擬化列表重新計算可見列數。"""
+        show = self.SHOW_VIDEO_THUMBNAILS
+        self.videos_tree.configure(style="Thumbs.Treeview" if show else "Treeview")
+        self.videos_tree.column("#0", width=self.VIDEO_THUMB_SIZE[0] + 50 if show else 40)
+        self.video_list.remeasure()
+
+    def _clear_video_thumbnails(self):
+        for future in self._video_thumb_jobs.values():
+            future.cancel()
+        self._video_thumb_jobs.clear()
+        self._video_thumbs.clear()
+        self._video_thumb_failed.clear()
+
+    def _on_video_viewport(self, start: int, stop: int):
+        """可見範圍變動時延遲載入縮圖，快速捲動經過的列不會發出請求。"""
+        if not self.SHOW_VIDEO_THUMBNAILS:
+            return
+        if self._thumb_viewport_after_id:
+            self.root.after_cancel(self._thumb_viewport_after_id)
+        self._thumb_viewport_after_id = self.root.after(80, self._load_visible_thumbnails)
+
+    def _load_visible_thumbnails(self):
+        """取消已捲出視窗的縮圖請求，並為可見列中尚未載入的縮圖送出請求。"""
+        self._thumb_viewport_after_id = None
+        start, stop = self.video_list.visible_range()
+        wanted = {self._video_view[pos] for pos in range(start, stop)}
+
+        for index in [i for i in self._video_thumb_jobs if i not in wanted]:
+            self._video_thumb_jobs.pop(index).cancel()
+
+        generation = self._video_generation
+        for index in wanted:
+            if index in self._video_thumbs:
+                self._video_thumbs.move_to_end(index)
+                continue
+            if index in self._video_thumb_jobs or index in self._video_thumb_failed:
+                continue
+            meta = self.channel_video_meta[index] if index < len(self.channel_video_meta) else {}
+            url = meta.get("thumbnail_url")
+            if not url:
+                continue
+            future = self.thumbnails.submit(url, self.VIDEO_THUMB_SIZE)
+            self._video_thumb_jobs[index] = future
+            future.add_done_callback(
+                lambda f, i=index: self._on_video_thumbnail_loaded(i, generation, f))
+
+    def _on_video_thumbnail_loaded(self, index: int, generation: int, future):
+        """於縮圖工作執行緒回呼：結果交回主執行緒（被取消的請求直接略過）。"""
+        if future.cancelled():
+            return
+        try:
+            image = future.result()
+        except Exception:
+            image = None
+        self.queue.put({"type": "video_thumbnail", "index": index,
+                        "generation": generation, "image": image})
+
+    def _set_video_thumbnail(self, index: int, generation: int, image):
+        if generation != self._video_generation:
+            return
+        self._video_thumb_jobs.pop(index, None)
+        if image is None:
+            self._video_thumb_failed.add(index)
+            return
+        if not self.SHOW_VIDEO_THUMBNAILS:
+            return
+        self._video_thumbs[index] = ImageTk.PhotoImage(image)
+        while len(self._video_thumbs) > self.VIDEO_THUMB_CACHE:
+            self._video_thumbs.popitem(last=False)
+        pos = bisect_left(self._video_view, index)
+        if pos < len(self._video_view) and self._video_view[pos] == index:
+            self.video_list.update_row(pos)
+
+    # ═══════════════════════════════════════════════════════
+    #  頻道影片篩選
+    # ═══════════════════════════════════════════════════════
+
+    def _schedule_video_filter(self, *args):
+        """輸入篩選條件時延遲套用，連續輸入只執行最後一次查詢。"""
+        if self._filter_after_id:
+            self.root.after_cancel(self._filter_after_id)
+        self._filter_after_id = self.root.after(120, self._apply_video_filter)
+
+    def _apply_video_filter(self):
+        """以索引查詢篩選條件，只重建顯示位置對應表，不動到勾選狀態。"""
+        self._filter_after_id = None
+        query = self.video_filter_var.get().strip()
+        total = len(self.channel_videos)
+        if query and self.video_index is not None:
+            self._video_view = self.video_index.search(query)
+            self.video_filter_count_var.set(f"符合 {len(self._video_view)} / {total}")
+        else:
+            self._video_view = range(total)
+            self.video_filter_count_var.set(f"共 {total} 個" if total else "")
+        self._video_anchor = None
+        self.video_list.set_row_count(len(self._video_view))
 
     # ═══════════════════════════════════════════════════════
     #  頻道影片選擇
     # ═══════════════════════════════════════════════════════
 
     def _select_all_videos(self):
-        for item in self.videos_tree.get_children():
-            self.videos_tree.item(item, text="☑")
+        self.video_selection.select_all()
+        self.video_list.refresh()
 
     def _deselect_all_videos(self):
-        for item in self.videos_tree.get_children():
-            self.videos_tree.item(item, text="☐")
+        self.video_selection.clear()
+        self.video_list.refresh()
+
+    def _invert_video_selection(self):
+        self.video_selection.invert()
+        self.video_list.refresh()
+
+    def _select_filtered_videos(self):
+        """一次勾選目前篩選結果中的所有影片。"""
+        self.video_selection.set_indices(self._video_view, True)
+        self.video_list.refresh()
 
     def _get_selected_videos(self) -> list:
-        selected = []
-        for item in self.videos_tree.get_children():
-            if self.videos_tree.item(item, "text") == "☑":
-                index = self.videos_tree.index(item)
-                selected.append(self.channel_videos[index])
-        return selected
+        return [self.channel_videos[i] for i in self.video_selection.selected_indices()]
 
     def _toggle_video_selection(self, event):
+        """點擊勾選欄切換項目；按住 Shift 則將錨點至此列的範圍設為錨點的狀態。"""
         item = self.videos_tree.identify_row(event.y)
         if not item:
             return
-        if self.videos_tree.identify_region(event.x, event.y) == 'tree':
-            current = self.videos_tree.item(item, "text")
-            self.videos_tree.item(item, text="☑" if current == "☐" else "☐")
+        if self.videos_tree.identify_region(event.x, event.y) != 'tree':
+            return
+        pos = self.video_list.position_of(item)
+        if pos is None:
+            return
+        if event.state & 0x0001 and self._video_anchor is not None:
+            lo, hi = sorted((self._video_anchor, pos))
+            value = self.video_selection.is_selected(self._video_view[self._video_anchor])
+            self.video_selection.set_indices(self._video_view[lo:hi + 1], value)
+        else:
+            self.video_selection.toggle(self._video_view[pos])
+            self._video_anchor = pos
+        self.video_list.refresh()
 
     def _on_video_select(self, event):
-        selected = self.videos_tree.selection()
-        if not selected:
-            return
-        index = self.videos_tree.index(selected[0])
-        if index >= len(self.channel_videos):
+        pos = self.video_list.take_selection_change()
+        if pos is None or pos >= len(self._video_view):
             return
+        index = self._video_view[pos]
         _, video_url = self.channel_videos[index]
         if video_url:
             self.queue.put({"type": "status", "text": "正在讀取影片詳細資訊..."})
             self.subtitle_combo.set("讀取中...")
             self.subtitle_combo.config(state='disabled')
-            threading.Thread(target=self._fetch_video_details_worker,
-                             args=(video_url,), daemon=True).start()
+            # 連續移動選取列時只擷取最後停留的那一列
+            if self._details_after_id:
+                self.root.after_cancel(self._details_after_id)
+            self._details_after_id = self.root.after(
+                self.DETAILS_DEBOUNCE_MS, lambda: self._request_video_details(video_url))
 
     # ═══════════════════════════════════════════════════════
     #  下載邏輯
     # ═══════════════════════════════════════════════════════
 
     def _start_download(self):
+        """將目前的選擇加入下載佇列；下載由排程器在背景執行，介面保持可操作。"""
         is_playlist = bool(self.channel_videos)
         download_path = self.download_path_var.get()
 
@@ -974,100 +2034,201 @@ class YouTubeDownloaderGUI:
             self._show_error("錯誤", "請選擇一個影片格式")
             return
 
-        self._set_ui_state('disabled')
-        self.total_progress_var.set(0)
-        self.file_progress_var.set(0)
-        threading.Thread(target=self._download_worker, daemon=True).start()
+        subtitle_key = self.subtitle_var.get()
+        subtitle_lang = (
+            self.available_subtitles.get(subtitle_key)
+            if subtitle_key not in ["none", "無"] else None
+        )
+        if is_playlist:
+            jobs = self._playlist_jobs(download_path, subtitle_lang)
+        else:
+            jobs = [self._single_job(download_path, subtitle_lang)]
+
+        self._ui_batch = True
+        self.scheduler.add(jobs)
+        self._log(f"已加入下載佇列：{len(jobs)} 個工作（同時進行 {self.PARALLEL_DOWNLOADS} 個）。")
+        self._update_status(f"已加入 {len(jobs)} 個下載工作")
+
+    def _playlist_jobs(self, download_path: str, subtitle_lang) -> list:
+        """為勾選的頻道/播放清單影片建立下載工作（1080p MP4，與原本的批次下載相同）。"""
+        return [
+            DownloadJob(url=video_url, title=title, output_dir=download_path,
+                        subtitle_lang=subtitle_lang)
+            for title, video_url in self._get_selected_videos()
+        ]
 
-    def _download_worker(self):
+    def _single_job(self, download_path: str, subtitle_lang) -> DownloadJob:
+        """依格式分頁的選擇與下載類型建立單一影片的下載工作。"""
+        url = self.url_var.get().strip()
+        title = self.video_title_var.get()
+        if self.download_type_var.get() == "audio":
+            return DownloadJob(url=url, title=title, kind="audio", resolution="",
+                               output_dir=download_path, subtitle_lang=subtitle_lang)
+        selection = self.formats_tree.selection()[0]
+        index = self.formats_tree.index(selection)
+        resolution, _, _, has_audio, height, _, format_id = self.available_formats[index]
+        return DownloadJob(url=url, title=title, format_id=format_id, has_audio=has_audio,
+                           height=height, resolution=resolution,
+                           output_dir=download_path, subtitle_lang=subtitle_lang)
+
+    def _run_job(self, job: DownloadJob, worker_id: int) -> str:
+        """排程器工作執行緒上執行單一工作，並寫入歷史記錄。"""
+        fmt_type = "MP3" if job.kind == "audio" else "MP4"
+        self.queue.put({"type": "log", "text": f"--- 開始下載 [{worker_id + 1}]: {job.title[:50]}... ---"})
         try:
-            download_path = self.download_path_var.get()
-            subtitle_key = self.subtitle_var.get()
-            subtitle_lang = (
-                self.available_subtitles.get(subtitle_key)
-                if subtitle_key not in ["none", "無"] else None
-            )
-            is_playlist = bool(self.channel_videos)
-
-            if is_playlist:
-                self._download_playlist(download_path, subtitle_lang)
-            else:
-                self._download_single(download_path, subtitle_lang)
-
-            self.queue.put({"type": "status", "text": "下載已完成"})
+            file_path = self.download_manager.run_job(job)
+        except JobInterrupted as e:
+            self.queue.put({"type": "log", "text": f"--- ⏸ {e}: {job.title} ---"})
+            raise
         except Exception as e:
-            self.queue.put({"type": "error", "text": f"下載失敗: {e}"})
-            self.queue.put({"type": "status", "text": "下載失敗"})
-        finally:
-            self.queue.put({"type": "set_ui_state", "state": "normal"})
-
-    def _download_playlist(self, download_path: str, subtitle_lang):
-        """使用並行下載處理播放清單。"""
-        selected_videos = self._get_selected_videos()
-        total = len(selected_videos)
-        self._log(f"準備下載 {total} 個選定的影片（同時進行 {self.PARALLEL_DOWNLOADS} 個）...")
-
-        for i, (title, video_url) in enumerate(selected_videos):
-            self._put_initial_progress(i, total, title)
-
-        self.download_manager.parallel_downloads = self.PARALLEL_DOWNLOADS
-        result = self.download_manager.download_playlist_parallel(
-            selected_videos, download_path, subtitle_lang,
-        )
-
-        # 寫入歷史記錄
-        for r in result["results"]:
+            self.queue.put({"type": "log", "text": f"--- ❌ 下載失敗: {job.title} | 錯誤: {e} ---"})
             self._add_history_record(
-                url=r["url"], title=r["title"], fmt="MP4",
-                resolution="1080p", file_path=r["file_path"],
-                status=r["status"], error_msg=r.get("error", ""),
+                url=job.url, title=job.title, fmt=fmt_type, resolution=job.resolution,
+                status="failed", error_msg=str(e), timings=job.timings,
             )
+            raise
+        self.queue.put({"type": "log", "text": f"--- ✔ 下載成功: {job.title} ---"})
+        self._add_history_record(
+            url=job.url, title=job.title, fmt=fmt_type, resolution=job.resolution,
+            file_path=file_path, status="success", timings=job.timings,
+        )
+        return file_path
+
+    def _on_window_change(self, state: dict):
+        """下載時段控制器（背景執行緒）套用時段後呼叫：記錄時段開始/結束並更新佇列摘要。"""
+        if state["enabled"] and state["open"] != self._window_open:
+            self.queue.put({"type": "log", "text": describe_state(state, datetime.now())})
+        self._window_open = state["open"] if state["enabled"] else None
+        self.queue.put({"type": "jobs_changed"})
+
+    def _on_queue_idle(self, done: int, failed: int):
+        """
+        佇列中的工作全部結束時（於工作執行緒）回報本輪結果：一律寫入日誌與狀態列，
+        本輪有使用者從介面加入的工作時才另外彈出完成對話框。
+        """
+        ui_batch, self._ui_batch = self._ui_batch, False
+        self.queue.put({"type": "status", "text": "下載已完成"})
+        self.queue.put({"type": "log", "text": f"下載佇列已完成：成功 {done} 個，失敗 {failed} 個。"})
+        if ui_batch:
+            self.queue.put({"type": "success", "text": f"下載完成！\n成功: {done}, 失敗: {failed}"})
 
-        self.queue.put({"type": "success",
-                        "text": f"下載完成！\n成功: {result['success']}, 失敗: {result['failed']}"})
-
-    def _download_single(self, download_path: str, subtitle_lang):
-        """處理單一影片下載。"""
-        url = self.url_var.get().strip()
-        title = self.video_title_var.get()
-        self.queue.put({"type": "file_progress", "value": 0})
-        self.queue.put({"type": "total_progress", "value": 0})
-
-        file_path = ""
-        resolution = ""
-        fmt_type = "MP4"
-
-        if self.download_type_var.get() == "video":
-            selection = self.formats_tree.selection()[0]
-            index = self.formats_tree.index(selection)
-            format_data = self.available_formats[index]
-            resolution, _, _, has_audio, height, _, format_id = format_data
+    # ═══════════════════════════════════════════════════════
+    #  下載佇列面板
+    # ═══════════════════════════════════════════════════════
 
-            self._log(f"--- 開始下載 {resolution} 的影片... ---")
-            self._update_status("正在下載影片...")
+    def _build_queue_panel(self, parent, row: int):
+        """建立與分析分頁分開、常駐顯示的下載佇列面板（虛擬化列表）。"""
+        frame = ttk.LabelFrame(parent, text="下載佇列", padding="5")
+        frame.grid(row=row, column=0, columnspan=3, sticky="nsew", pady=(0, 5))
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(0, weight=1)
+
+        self.queue_list = VirtualTreeview(
+            frame, self._queue_row,
+            columns=("Title", "State", "Progress", "Priority"),
+            show="headings", height=5, selectmode="browse")
+        tree = self.queue_list.tree
+        tree.heading("Title", text="標題", anchor=tk.W)
+        tree.heading("State", text="狀態", anchor=tk.CENTER)
+        tree.heading("Progress", text="進度", anchor=tk.CENTER)
+        tree.heading("Priority", text="優先", anchor=tk.CENTER)
+        tree.column("Title", width=420)
+        tree.column("State", width=70, stretch=False, anchor=tk.CENTER)
+        tree.column("Progress", width=70, stretch=False, anchor=tk.CENTER)
+        tree.column("Priority", width=60, stretch=False, anchor=tk.CENTER)
+        tree.bind("<<TreeviewSelect>>", lambda e: self.queue_list.take_selection_change())
+        self.queue_list.grid(row=0, column=0, sticky="nsew")
 
-            file_path = self.download_manager.download_video(
-                url, format_id, has_audio, download_path, subtitle_lang, height,
+        btn_frame = ttk.Frame(frame)
+        btn_frame.grid(row=0, column=1, sticky="ns", padx=(5, 0))
+        for text, command in [
+            ("上移", lambda: self._move_selected_job(-1)),
+            ("下移", lambda: self._move_selected_job(1)),
+            ("提高優先", lambda: self._change_selected_priority(1)),
+            ("降低優先", lambda: self._change_selected_priority(-1)),
+            ("暫停/繼續", self._toggle_selected_job),
+            ("取消", self._cancel_selected_job),
+            ("清除已結束", self.scheduler.clear_finished),
+        ]:
+            ttk.Button(btn_frame, text=text, width=10, command=command).pack(fill="x", pady=1)
+
+        self.queue_summary_var = tk.StringVar(value="佇列是空的")
+        ttk.Label(frame, textvariable=self.queue_summary_var).grid(
+            row=1, column=0, columnspan=2, sticky=tk.W)
+
+    def _queue_row(self, pos: int) -> dict:
+        job = self._queue_jobs[pos]
+        progress = f"{job.progress:.0f}%" if job.state in (RUNNING, DONE) else ""
+        return {"values": (
+            job.title or job.url,
+            self.JOB_STATE_TEXT.get(job.state, job.state),
+            progress,
+            self.JOB_PRIORITY_TEXT.get(job.priority, str(job.priority)),
+        )}
+
+    def _schedule_queue_refresh(self):
+        """佇列變動或進度更新時最多每 QUEUE_REFRESH_MS 重繪一次面板。"""
+        if self._queue_refresh_after_id is None:
+            self._queue_refresh_after_id = self.root.after(
+                self.QUEUE_REFRESH_MS, self._refresh_queue_panel)
+
+    def _refresh_queue_panel(self):
+        self._queue_refresh_after_id = None
+        self._queue_jobs = self.scheduler.jobs()
+        if len(self._queue_jobs) != self.queue_list.row_count:
+            self.queue_list.resize(len(self._queue_jobs))
+        else:
+            self.queue_list.refresh()
+
+        counts = {}
+        for job in self._queue_jobs:
+            counts[job.state] = counts.get(job.state, 0) + 1
+        active = counts.get(QUEUED, 0) + counts.get(RUNNING, 0)
+        finished = counts.get(DONE, 0) + counts.get(FAILED, 0)
+        if self._queue_jobs:
+            summary = (
+                f"下載中 {counts.get(RUNNING, 0)} | 等待 {counts.get(QUEUED, 0)} | "
+                f"暫停 {counts.get(PAUSED, 0)} | 完成 {counts.get(DONE, 0)} | "
+                f"失敗 {counts.get(FAILED, 0)}"
             )
-            fmt_type = "MP4"
         else:
-            self._log("--- 開始下載音訊為 MP3... ---")
-            self._update_status("正在下載音訊...")
-            self.download_manager.download_audio(url, download_path, subtitle_lang)
-            fmt_type = "MP3"
-
-        self._log(f"--- ✔ 下載成功完成: {title} ---")
-        self.queue.put({"type": "total_progress", "value": 100})
-        self.queue.put({"type": "success", "text": "下載成功完成"})
-
-        # 寫入歷史記錄
-        self._add_history_record(
-            url=url, title=title, fmt=fmt_type,
-            resolution=resolution, file_path=file_path, status="success",
-        )
-
-    def _put_initial_progress(self, index: int, total: int, title: str):
-        """初始化進度顯示。"""
-        self.queue.put({"type": "file_progress", "value": 0})
-        self.queue.put({"type": "log", "text": f"--- 開始下載 ({index+1}/{total}): {title[:50]}... ---"})
-        self.queue.put({"type": "status", "text": f"正在下載 {index+1}/{total}: {title[:30]}..."})
+            summary = "佇列是空的"
+        window_text = describe_state(self.window_controller.state(), datetime.now())
+        self.queue_summary_var.set(f"{summary} | {window_text}" if window_text else summary)
+        if active + finished:
+            self.total_progress_var.set(finished / (active + finished) * 100)
+
+    def _selected_job(self):
+        pos = self.queue_list.cursor
+        if pos is None or pos >= len(self._queue_jobs):
+            return None
+        return self._queue_jobs[pos]
+
+    def _move_selected_job(self, delta: int):
+        job = self._selected_job()
+        if job is None:
+            return
+        new_pos = self.scheduler.move(job.id, delta)
+        self._refresh_queue_panel()
+        if new_pos >= 0:
+            self.queue_list.select(new_pos)
+
+    def _change_selected_priority(self, delta: int):
+        job = self._selected_job()
+        if job is not None:
+            self.scheduler.set_priority(job.id, max(-1, min(1, job.priority + delta)))
+
+    def _toggle_selected_job(self):
+        job = self._selected_job()
+        if job is None:
+            return
+        if job.state in (PAUSED, FAILED):
+            self._ui_batch = True
+            self.scheduler.resume(job.id)
+        elif not self.scheduler.pause(job.id):
+            self._log("只能暫停等待中或下載中的工作。")
+
+    def _cancel_selected_job(self):
+        job = self._selected_job()
+        if job is not None and not self.scheduler.cancel(job.id):
+            self._log("這個工作已經結束，無法取消。")
@@ -0,0 +1,278 @@
+"""
+下載歷史封存模組 — 依保存期限將過舊的記錄匯出到每月一個的封存檔（history-YYYY-MM.jsonl.gz），
+確定寫入磁碟後才以小批次交易從資料庫刪除，並在沒有下載進行時逐步歸還資料庫的空閒頁面。
+封存檔只附加寫入（每批是一個獨立的 gzip 成員），以 iter_archive / search_archive 逐個成員
+串流解壓，不需解壓整個檔案或載入記憶體；損壞或寫了一半的成員只略過該成員，之後的成員照常讀取。
+附加前會先確認檔案結尾是完整的成員（例如寫入時斷電留下的半個成員會被截斷）。
+純邏輯模組，無 UI 依賴。
+"""
+
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+
+ARCHIVE_DIR = "yd_history_archive"
+_ARCHIVE_RE = re.compile(r"^history-(\d{4}-\d{2})\.jsonl\.gz$")
+_SEARCH_FIELDS = ("title", "url", "file_path", "error_msg")
+_GZIP_MAGIC = b"\x1f\x8b\x08"      # gzip 成員標頭（ID1、ID2、deflate）
+_CHUNK = 64 * 1024
+
+
+def archive_path(directory: str, month: str) -> str:
+    """month 為 YYYY-MM。"""
+    return os.path.join(directory, f"history-{month}.jsonl.gz")
+
+
+def archive_months(directory: str) -> list:
+    """回傳封存資料夾中已有的月份（由舊到新）。"""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(match.group(1) for match in map(_ARCHIVE_RE.match, names) if match)
+
+
+def iter_archive(directory: str = ARCHIVE_DIR, since: str = None, until: str = None):
+    """
+    依月份順序逐筆產生封存的記錄（dict）。since / until 為 YYYY-MM-DD（UTC，含當天），
+    只開啟範圍內月份的檔案。同一筆記錄若因中斷後重試而被寫入兩次，只產生一次。
+    """
+    for month in archive_months(directory):
+        if (since and month < since[:7]) or (until and month > until[:7]):
+            continue
+        seen = set()
+        try:
+            with open(archive_path(directory, month), "rb") as f:
+                for kind, line in _scan_members(f):
+                    if kind != "line":
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue        # 截斷的成員留下的不完整行
+                    if not isinstance(record, dict):
+                        continue
+                    day = (record.get("downloaded_at") or "")[:10]
+                    if (since and day < since) or (until and day > until) or record.get("id") in seen:
+                        continue
+                    seen.add(record.get("id"))
+                    yield record
+        except OSError:
+            continue                    # 無法讀取的封存檔
+
+
+def _find_member(f, start: int):
+    """從 start 起尋找下一個 gzip 成員標頭，回傳其位置（找不到時為 None）。"""
+    f.seek(start)
+    offset, tail = start, b""
+    while True:
+        chunk = f.read(_CHUNK)
+        if not chunk:
+            return None
+        data = tail + chunk
+        index = data.find(_GZIP_MAGIC)
+        if index >= 0:
+            return offset - len(tail) + index
+        tail = data[-(len(_GZIP_MAGIC) - 1):]
+        offset += len(chunk)
+
+
+def _scan_members(f):
+    """
+    逐一解壓檔案中的 gzip 成員，產生 ("line", 一行的位元組) 與每個成員完整結束時的 ("end", 結束位置)。
+    損壞或截斷的成員只略過該成員：從其後的下一個 gzip 標頭繼續讀取。
+    """
+    offset = 0
+    while True:
+        f.seek(offset)
+        decompressor = zlib.decompressobj(wbits=31)
+        consumed, carry = 0, b""
+        try:
+            while not decompressor.eof:
+                chunk = f.read(_CHUNK)
+                if not chunk:
+                    raise EOFError
+                consumed += len(chunk)
+                *lines, carry = (carry + decompressor.decompress(chunk)).split(b"\n")
+                for line in lines:
+                    yield "line", line
+        except (zlib.error, EOFError):
+            if consumed == 0:
+                return                  # 檔案在成員邊界結束
+            offset = _find_member(f, offset + 1)
+            if offset is None:
+                return
+            continue
+        if carry:
+            yield "line", carry
+        offset += consumed - len(decompressor.unused_data)
+        yield "end", offset
+
+
+def search_archive(query: str, directory: str = ARCHIVE_DIR, since: str = None,
+                   until: str = None, limit: int = None):
+    """
+    串流搜尋封存記錄：空白分隔的每個詞（不分大小寫）都必須出現在標題、網址、檔案路徑或錯誤訊息中。
+    依封存順序（舊到新）產生符合的記錄，最多 limit 筆。
+    """
+    terms = [term.casefold() for term in query.split()]
+    found = 0
+    for record in iter_archive(directory, since, until):
+        text = "\n".join(str(record.get(field) or "") for field in _SEARCH_FIELDS).casefold()
+        if all(term in text for term in terms):
+            yield record
+            found += 1
+            if limit is not None and found >= limit:
+                return
+
+
+class HistoryRetention:
+    """
+    下載歷史保存期限。
+
+    retain_days 天前的記錄被封存後刪除（0 表示永久保存，不做任何事）。start() 之後背景執行緒每隔
+    CHECK_INTERVAL 秒檢查一次；is_idle() 回傳 False（例如有下載進行中）時延後 IDLE_RETRY 秒再試，
+    封存途中變為忙碌則在下一批之前停止。on_event(archived, freed_pages) 在每次實際封存或回收後呼叫；
+    背景執行緒封存失敗時以錯誤說明呼叫 on_error(text)（未指定時寫到 stderr）。
+    """
+
+    CHECK_INTERVAL = 3600.0
+    IDLE_RETRY = 60.0
+    BATCH_SIZE = 500                # 每個刪除交易的記錄數
+    VACUUM_PAGES = 1000             # 每次歸還的最多頁數（預設頁面大小約 4 MB）
+
+    def __init__(self, history, retain_days: int = 0, directory: str = ARCHIVE_DIR,
+                 is_idle=None, on_event=None, on_error=None, clock=None):
+        self.history = history
+        self.retain_days = retain_days
+        self.directory = directory or ARCHIVE_DIR
+        self._is_idle = is_idle or (lambda: True)
+        self._on_event = on_event
+        self._on_error = on_error
+        self._clock = clock or (lambda: datetime.now(timezone.utc))
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._lock = threading.Lock()     # 背景執行緒與命令列的 run_once 不同時封存
+        self._verified = {}               # 封存檔 → 已確認結尾是完整成員時的大小
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="history-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """停止背景執行緒（進行中的批次會完成，下一批之前結束）。"""
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def configure(self, retain_days: int):
+        """更換保存天數並立即檢查一次。"""
+        self.retain_days = retain_days
+        self._wakeup.set()
+
+    def cutoff(self) -> str:
+        """早於此時間（UTC，與 downloaded_at 相同格式）的記錄已超過保存期限。"""
+        return (self._clock() - timedelta(days=self.retain_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    def run_once(self, should_continue=None) -> dict:
+        """
+        封存並刪除所有過期記錄，再回收空閒頁面；
+        回傳 {"archived": 筆數, "freed_pages": 頁數, "complete": 是否全部處理完}。
+        should_continue() 回傳 False 時在下一批之前停止（未處理的記錄留待下次）。
+        """
+        should_continue = should_continue or (lambda: True)
+        archived = freed = 0
+        complete = False
+        if self.retain_days <= 0:
+            return {"archived": 0, "freed_pages": 0, "complete": True}
+        with self._lock:
+            cutoff = self.cutoff()
+            while not self._stopped and should_continue():
+                records = self.history.get_expired(cutoff, limit=self.BATCH_SIZE)
+                if not records:
+                    if should_continue():
+                        freed = self.history.compact(self.VACUUM_PAGES)
+                        complete = True
+                    break
+                self._export(records)
+                archived += self.history.delete_records(record["id"] for record in records)
+        if self._on_event and (archived or freed):
+            self._on_event(archived, freed)
+        return {"archived": archived, "freed_pages": freed, "complete": complete}
+
+    # ─── 內部輔助方法 ──────────────────────────────────────
+
+    def _export(self, records: list):
+        """
+        將一批記錄依月份附加到封存檔，fsync 後才返回（之後才刪除資料庫中的記錄）。
+        寫入後、刪除前中斷時下次會再寫一次，讀取端以 id 去除重複。
+        每個封存檔在本行程第一次附加前（或大小與上次寫入後不同時）檢查並截斷結尾不完整的成員。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        by_month = {}
+        for record in records:
+            month = (record.get("downloaded_at") or "")[:7] or "0000-00"
+            by_month.setdefault(month, []).append(record)
+        for month, items in by_month.items():
+            data = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+            path = archive_path(self.directory, month)
+            with open(path, "a+b") as raw:
+                size = raw.seek(0, os.SEEK_END)
+                if size and self._verified.get(path) != size:
+                    size = self._trim_partial_member(raw, size)
+                try:
+                    with gzip.GzipFile(fileobj=raw, mode="ab", compresslevel=6) as gz:
+                        gz.write(data.encode("utf-8"))
+                    raw.flush()
+                    os.fsync(raw.fileno())
+                except OSError:
+                    raw.truncate(size)      # 不留下寫了一半的 gzip 成員，之後附加的批次才讀得到
+                    self._verified.pop(path, None)
+                    raise
+                self._verified[path] = raw.seek(0, os.SEEK_END)
+
+    @staticmethod
+    def _trim_partial_member(raw, size: int) -> int:
+        """檔案結尾若是寫了一半的 gzip 成員（例如寫入時斷電或被終止），截斷到最後一個完整成員之後。"""
+        end = 0
+        for kind, value in _scan_members(raw):
+            if kind == "end":
+                end = value
+        if end < size:
+            raw.truncate(end)
+            raw.flush()
+            os.fsync(raw.fileno())
+        raw.seek(0, os.SEEK_END)
+        return end
+
+    def _run(self):
+        delay = 0.0
+        while True:
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+            if self._stopped:
+                return
+            if self.retain_days <= 0:
+                delay = None                # 停用時只等待 configure() 喚醒
+                continue
+            if not self._is_idle():
+                delay = self.IDLE_RETRY
+                continue
+            delay = self.CHECK_INTERVAL
+            try:
+                if not self.run_once(self._is_idle)["complete"]:
+                    delay = self.IDLE_RETRY     # 中途開始下載：閒置後繼續
+            except (OSError, sqlite3.Error) as e:
+                message = f"封存下載歷史失敗: {e}"
+                if self._on_error:
+                    self._on_error(message)
+                else:
+                    print(message, file=sys.stderr)
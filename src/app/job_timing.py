@@ -0,0 +1,152 @@
+"""
+工作階段計時模組 — 記錄單一下載工作各階段花費的時間，隨歷史記錄一起保存。
+階段：佇列等待、中繼資料擷取、傳輸、後處理（FFmpeg 合併/轉檔）與字幕下載；
+另記錄重新下載次數、平均/尖峰速度與工作執行緒編號。
+yt-dlp 沒有「擷取完成」的回呼，因此每次下載從開始到第一個進度/後處理回呼之間的時間視為擷取。
+純邏輯模組，無 UI 依賴。
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 字幕檔的副檔名：這些檔案的下載時間計入字幕階段而非傳輸階段
+SUBTITLE_EXTS = frozenset({".vtt", ".srt", ".ass", ".ssa", ".ttml", ".srv1", ".srv2", ".srv3", ".json3"})
+
+
+class JobTimings:
+    """
+    單一工作的階段計時。
+
+    每次呼叫 ydl.download 時以 attempt() 包住；progress_hook / postprocessor_hook 分別加入
+    yt-dlp 的 progress_hooks / postprocessor_hooks。獨立的 extract_info 呼叫以 extracting() 計時。
+    as_record() 回傳可直接傳給 HistoryWriter.add 的欄位。
+    """
+
+    def __init__(self, queue_seconds: float = None, worker_id: int = None, clock=None):
+        self.queue_seconds = queue_seconds
+        self.worker_id = worker_id
+        self.channel = ""
+        self.attempts = 0
+        self.extract_seconds = 0.0
+        self.transfer_seconds = 0.0
+        self.postprocess_seconds = 0.0
+        self.subtitle_seconds = 0.0
+        self.transferred_bytes = 0
+        self.peak_speed = 0.0
+        self._clock = clock or time.monotonic
+        self._lock = threading.Lock()     # 分段並行下載時進度回呼可能來自多個執行緒
+        self._extract_since = None        # 目前這次下載尚未收到任何回呼時的開始時間
+        self._files = {}                  # 下載中的檔案 → (開始時間, 開始時已下載的位元組)
+        self._postprocessors = {}         # 執行中的後處理器 → 開始時間
+
+    @property
+    def retries(self) -> int:
+        """重新下載的次數（含字幕失敗後不下載字幕的重試）。"""
+        return max(0, self.attempts - 1)
+
+    @property
+    def avg_speed(self) -> float:
+        """本次實際傳輸的位元組 / 傳輸時間（bytes/s）。"""
+        return self.transferred_bytes / self.transfer_seconds if self.transfer_seconds > 0 else 0.0
+
+    @contextmanager
+    def attempt(self):
+        """包住一次 ydl.download：失敗時把進行中的傳輸與後處理時間也計入。"""
+        with self._lock:
+            self.attempts += 1
+            self._extract_since = self._clock()
+        try:
+            yield
+        finally:
+            now = self._clock()
+            with self._lock:
+                self._end_extract(now)
+                for name, (started, _) in self._files.items():
+                    self._add_file_time(name, now - started)
+                for started in self._postprocessors.values():
+                    self.postprocess_seconds += now - started
+                self._files.clear()
+                self._postprocessors.clear()
+
+    @contextmanager
+    def extracting(self):
+        """計時一次獨立的 extract_info（例如下載後取得檔案路徑）。"""
+        started = self._clock()
+        try:
+            yield
+        finally:
+            elapsed = self._clock() - started
+            with self._lock:
+                self.extract_seconds += elapsed
+
+    def note_info(self, info: dict):
+        """從 yt-dlp 的影片資訊記下頻道名稱（只記第一次取得的值）。"""
+        if not self.channel and info:
+            self.channel = info.get("channel") or info.get("uploader") or ""
+
+    def progress_hook(self, d: dict):
+        """yt-dlp 進度回呼：依檔案累計傳輸 / 字幕時間與速度。"""
+        now = self._clock()
+        name = d.get("filename") or d.get("tmpfilename") or ""
+        self.note_info(d.get("info_dict"))
+        with self._lock:
+            self._end_extract(now)
+            status = d.get("status")
+            if status == "downloading":
+                if name not in self._files:
+                    self._files[name] = (now, d.get("downloaded_bytes") or 0)
+                speed = d.get("speed")
+                if speed and not self._is_subtitle(name):
+                    self.peak_speed = max(self.peak_speed, speed)
+            elif status in ("finished", "error") and name in self._files:
+                started, start_bytes = self._files.pop(name)
+                self._add_file_time(name, now - started)
+                if not self._is_subtitle(name):
+                    done = d.get("downloaded_bytes") or d.get("total_bytes") or 0
+                    self.transferred_bytes += max(0, done - start_bytes)
+
+    def postprocessor_hook(self, d: dict):
+        """yt-dlp 後處理回呼：累計每個後處理器從 started 到 finished 的時間。"""
+        now = self._clock()
+        name = d.get("postprocessor") or ""
+        with self._lock:
+            self._end_extract(now)
+            if d.get("status") == "started":
+                self._postprocessors.setdefault(name, now)
+            elif d.get("status") == "finished" and name in self._postprocessors:
+                self.postprocess_seconds += now - self._postprocessors.pop(name)
+
+    def as_record(self) -> dict:
+        """歷史記錄的計時欄位（秒數取到毫秒，速度為 bytes/s）。"""
+        return {
+            "channel": self.channel,
+            "worker_id": self.worker_id,
+            "retries": self.retries,
+            "queue_seconds": None if self.queue_seconds is None else round(self.queue_seconds, 3),
+            "extract_seconds": round(self.extract_seconds, 3),
+            "transfer_seconds": round(self.transfer_seconds, 3),
+            "postprocess_seconds": round(self.postprocess_seconds, 3),
+            "subtitle_seconds": round(self.subtitle_seconds, 3),
+            "avg_speed": round(self.avg_speed, 1),
+            "peak_speed": round(self.peak_speed, 1),
+        }
+
+    # ─── 內部輔助方法 ──────────────────────────────────────
+
+    def _end_extract(self, now: float):
+        """在持有鎖時呼叫：這次下載的第一個回呼結束擷取階段。"""
+        if self._extract_since is not None:
+            self.extract_seconds += now - self._extract_since
+            self._extract_since = None
+
+    def _add_file_time(self, name: str, elapsed: float):
+        if self._is_subtitle(name):
+            self.subtitle_seconds += elapsed
+        else:
+            self.transfer_seconds += elapsed
+
+    @staticmethod
+    def _is_subtitle(name: str) -> bool:
+        return os.path.splitext(name)[1].lower() in SUBTITLE_EXTS
@@ -0,0 +1,539 @@
+"""
+下載佇列模組 — 持久化的下載工作佇列與排程器。
+排程器擁有固定數量的工作執行緒，有空閒名額時直接從佇列取出優先順序最高的工作，
+不需等待 UI；工作可隨時加入、調整順序與優先順序、暫停或取消。
+執行中的工作以取消權杖（CancelToken）協同中止：下載引擎在每個下載區塊與後處理步驟檢查權杖，
+並可直接終止 FFmpeg 子行程；排程器則在要求中止的當下就釋放該工作的名額。
+純邏輯模組，無 UI 依賴，可獨立單元測試。
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, fields
+
+QUEUE_FILE = "yd_queue.json"
+
+# 播放清單/批次加入的工作未指定格式時使用的預設格式（1080p MP4）
+DEFAULT_VIDEO_FORMAT = 'bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+DEFAULT_VIDEO_HEIGHT = 1080
+
+# ─── 工作狀態 ───
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = frozenset({DONE, FAILED, CANCELLED})
+
+
+@dataclass
+class DownloadJob:
+    """單一下載工作。priority 越大越先執行，相同優先順序依佇列順序。"""
+    url: str
+    title: str = ""
+    kind: str = "video"                 # video（MP4）/ audio（MP3）
+    format_id: str = DEFAULT_VIDEO_FORMAT
+    has_audio: bool = True
+    height: int = DEFAULT_VIDEO_HEIGHT
+    resolution: str = "1080p"           # 寫入歷史記錄的解析度文字
+    output_dir: str = ""
+    subtitle_lang: str = None
+    priority: int = 0
+    id: int = 0
+    state: str = QUEUED
+    progress: float = 0.0
+    error: str = ""
+    file_path: str = ""
+    worker_id: int = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    # 執行期間的取消權杖（不保存）
+    token: "CancelToken" = field(default=None, repr=False, compare=False,
+                                 metadata={"persist": False})
+    # 最近一次執行的階段計時（job_timing.JobTimings，不保存）
+    timings: object = field(default=None, repr=False, compare=False,
+                            metadata={"persist": False})
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def to_dict(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in _persisted_fields()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DownloadJob":
+        known = {f.name for f in _persisted_fields()}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+def _persisted_fields() -> list:
+    return [f for f in fields(DownloadJob) if f.metadata.get("persist", True)]
+
+
+def make_job(title: str, url: str, options: dict, default_output_dir: str) -> DownloadJob:
+    """
+    依選項建立下載工作（命令列、daemon 與控制 API 共用）。
+    options：audio（MP3）、format（yt-dlp 格式字串）、output_dir、subtitle、priority；
+    未指定格式時使用預設的 1080p MP4。
+    """
+    common = {"url": url, "title": title,
+              "output_dir": options.get("output_dir") or default_output_dir,
+              "subtitle_lang": options.get("subtitle"), "priority": options.get("priority", 0)}
+    if options.get("audio"):
+        return DownloadJob(kind="audio", resolution="", **common)
+    if options.get("format"):
+        return DownloadJob(format_id=options["format"], height=0, resolution="", **common)
+    return DownloadJob(**common)
+
+
+class JobInterrupted(Exception):
+    """工作因取消（reason="cancel"）或暫停（reason="pause"）而中止。"""
+
+    def __init__(self, reason: str):
+        super().__init__("已取消" if reason == "cancel" else "已暫停")
+        self.reason = reason
+
+
+class CancelToken:
+    """
+    單一工作執行期間的取消權杖。request() 可在任何執行緒呼叫：
+    設定旗標、喚醒 wait() 中的重試等待，並終止已登記的子行程。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = []
+        self.reason = None
+
+    @property
+    def requested(self) -> bool:
+        return self._event.is_set()
+
+    def request(self, reason: str = "cancel"):
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+            self._event.set()
+            processes = [p for p in self._processes if p.poll() is None]
+        for process in processes:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+
+    def wait(self, timeout: float) -> bool:
+        """最多等待 timeout 秒，期間被要求中止時立即回傳 True。"""
+        return self._event.wait(timeout)
+
+    def check(self):
+        if self._event.is_set():
+            raise JobInterrupted(self.reason)
+
+    def register_process(self, process):
+        """登記子行程（subprocess.Popen）；權杖已觸發時立即終止。"""
+        with self._lock:
+            self._processes = [p for p in self._processes if p.poll() is None]
+            self._processes.append(process)
+            requested = self._event.is_set()
+        if requested:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+
+
+def save_queue(path: str, jobs: list, on_error=None) -> bool:
+    """
+    將尚未完成的工作寫入 JSON 檔（先寫暫存檔再取代，避免中途中斷損壞檔案）。
+    失敗時以錯誤說明呼叫 on_error(text)（未指定時寫到 stderr）並回傳 False。
+    """
+    data = [job.to_dict() for job in jobs if not job.finished]
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        message = f"無法儲存下載佇列: {e}"
+        if on_error:
+            on_error(message)
+        else:
+            print(message, file=sys.stderr)
+        return False
+
+
+def load_queue(path: str) -> list:
+    """讀取上次未完成的工作；上次執行中的工作恢復為等待中（yt-dlp 會從 .part 檔續傳）。"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+    jobs = []
+    for item in data:
+        try:
+            job = DownloadJob.from_dict(item)
+        except TypeError:
+            continue
+        if job.state == RUNNING:
+            job.state = QUEUED
+        job.progress = 0.0
+        job.worker_id = None
+        jobs.append(job)
+    return jobs
+
+
+class JobScheduler:
+    """
+    下載工作排程器。
+
+    run_job(job, worker_id) 在工作執行緒上執行單一工作並回傳檔案路徑，失敗時拋出例外；
+    應定期檢查 job.token，被要求中止時拋出 JobInterrupted。
+    on_change() 在工作加入、順序或狀態改變時呼叫；on_idle(done, failed) 在佇列中
+    沒有等待中與執行中的工作時呼叫一次；on_error(text) 在無法保存佇列檔時呼叫。
+    三者都可能在任何執行緒上被呼叫。
+    """
+
+    PERSIST_DELAY = 1.0     # 佇列變動後延遲多久寫入 persist_path（秒）
+
+    def __init__(self, run_job, max_workers: int = 2, on_change=None, on_idle=None,
+                 persist_path: str = None, on_error=None):
+        self._run_job = run_job
+        self._on_change = on_change
+        self._on_idle = on_idle
+        self._on_error = on_error
+        self._persist_path = persist_path
+        self._cond = threading.Condition()
+        self._persist_lock = threading.Lock()
+        self._persist_timer = None
+        self._jobs: list[DownloadJob] = []      # 佇列順序（含已完成的工作，直到被清除）
+        self._next_id = 1
+        self._max_workers = max(1, max_workers)
+        self._slots = {}                        # 工作執行緒編號 → 目前擁有該名額的執行緒標記
+        self._running = 0
+        self._draining = set()                  # 已釋放名額、但原執行緒尚未返回的工作編號
+        self._batch_done = 0
+        self._batch_failed = 0
+        self._closed = False
+        self._gate_open = True                  # 下載時段外為 False：不開始新工作
+        self._window_workers = None             # 目前時段的同時下載數量（None 表示沿用 max_workers）
+        self._requeue = set()                   # 因時段結束而中止、需重新排隊的工作編號
+
+    # ─── 公開介面 ──────────────────────────────────────────
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def start(self, jobs: list = None):
+        """放入上次保存的工作並啟動工作執行緒。"""
+        if jobs:
+            self.add(jobs)
+        with self._cond:
+            self._spawn_workers()
+
+    def add(self, jobs: list) -> list:
+        """將工作加入佇列尾端，回傳其編號。"""
+        with self._cond:
+            ids = []
+            for job in jobs:
+                if not job.id or any(j.id == job.id for j in self._jobs):
+                    job.id = self._next_id
+                self._next_id = max(self._next_id, job.id + 1)
+                self._jobs.append(job)
+                ids.append(job.id)
+            self._cond.notify_all()
+        self._changed()
+        return ids
+
+    def jobs(self) -> list:
+        """回傳目前佇列的淺層副本（工作物件本身會被工作執行緒更新）。"""
+        with self._cond:
+            return list(self._jobs)
+
+    def get(self, job_id: int):
+        with self._cond:
+            return self._find(job_id)
+
+    def active_urls(self) -> set:
+        """回傳佇列中尚未結束（等待中、執行中、暫停）的工作網址，供加入前去除重複。"""
+        with self._cond:
+            return {job.url for job in self._jobs if not job.finished}
+
+    def counts(self) -> dict:
+        """回傳各狀態的工作數。"""
+        result = {}
+        with self._cond:
+            for job in self._jobs:
+                result[job.state] = result.get(job.state, 0) + 1
+        return result
+
+    def move(self, job_id: int, delta: int) -> int:
+        """將工作在佇列中移動 delta 個位置，回傳新位置（找不到時回傳 -1）。"""
+        with self._cond:
+            job = self._find(job_id)
+            if job is None:
+                return -1
+            old = self._jobs.index(job)
+            new = max(0, min(old + delta, len(self._jobs) - 1))
+            if new != old:
+                self._jobs.insert(new, self._jobs.pop(old))
+        if new != old:
+            self._changed()
+        return new
+
+    def set_priority(self, job_id: int, priority: int):
+        with self._cond:
+            job = self._find(job_id)
+            if job is None or job.priority == priority:
+                return
+            job.priority = priority
+            self._cond.notify_all()
+        self._changed()
+
+    def pause(self, job_id: int) -> bool:
+        """暫停工作（不會被排程，直到 resume）；執行中的工作會中止並保留 .part 檔以便續傳。"""
+        return self._transition(job_id, (QUEUED, RUNNING), PAUSED)
+
+    def resume(self, job_id: int) -> bool:
+        """讓暫停或失敗的工作重新排隊。"""
+        with self._cond:
+            job = self._find(job_id)
+            if job is None or job.state not in (PAUSED, FAILED):
+                return False
+            job.state = QUEUED
+            job.error = ""
+            job.progress = 0.0
+            self._cond.notify_all()
+        self._changed()
+        return True
+
+    def cancel(self, job_id: int) -> bool:
+        """取消工作；執行中的工作會中止，並立即釋放其下載名額。"""
+        return self._transition(job_id, (QUEUED, PAUSED, RUNNING), CANCELLED)
+
+    def clear_finished(self):
+        """自佇列移除已完成、失敗與已取消的工作。"""
+        with self._cond:
+            self._jobs = [job for job in self._jobs if not job.finished]
+        self._changed()
+
+    @property
+    def gate_open(self) -> bool:
+        return self._gate_open
+
+    def set_gate(self, open_: bool, max_workers: int = None):
+        """
+        下載時段控制。open_ 為 False 時不再開始新工作，執行中的工作以暫停方式中止
+        （保留 .part 檔）後重新排隊；max_workers 為時段內的同時下載數量（None 表示沿用設定）。
+        """
+        with self._cond:
+            if open_ == self._gate_open and max_workers == self._window_workers:
+                return
+            self._gate_open = open_
+            self._window_workers = max_workers
+            if not open_:
+                for job in self._jobs:
+                    if job.state == RUNNING and job.token is not None and job.id not in self._draining:
+                        self._requeue.add(job.id)
+                        job.token.request("pause")
+            self._spawn_workers()
+            self._cond.notify_all()
+        self._changed()
+
+    def set_max_workers(self, count: int):
+        """調整同時下載數量：增加時立即啟動新的工作執行緒，減少時多餘的執行緒在完成手上工作後結束。"""
+        with self._cond:
+            self._max_workers = max(1, count)
+            self._spawn_workers()
+            self._cond.notify_all()
+
+    def shutdown(self, timeout: float = 0.0):
+        """
+        停止排程新工作並保存佇列。執行中的工作以暫停方式中止（保留 .part 檔），
+        最多等待 timeout 秒讓它們結束；這些工作會在下次啟動時重新排隊。
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._closed = True
+            for job in self._jobs:
+                if job.state == RUNNING and job.token is not None:
+                    job.token.request("pause")
+            self._cond.notify_all()
+            while self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        self._persist()
+
+    # ─── 工作執行緒 ────────────────────────────────────────
+
+    def _spawn_workers(self):
+        for worker_id in range(self._worker_limit()):
+            if worker_id not in self._slots and not self._closed:
+                owner = object()
+                self._slots[worker_id] = owner
+                threading.Thread(target=self._worker, args=(worker_id, owner),
+                                 name=f"download-worker-{worker_id}", daemon=True).start()
+
+    def _worker(self, worker_id: int, owner):
+        while True:
+            with self._cond:
+                job = None
+                while not self._closed and worker_id < self._worker_limit():
+                    job = self._next_job() if self._gate_open else None
+                    if job is not None:
+                        break
+                    self._cond.wait()
+                if job is None:
+                    if self._slots.get(worker_id) is owner:
+                        del self._slots[worker_id]
+                    return
+                job.state = RUNNING
+                job.worker_id = worker_id
+                job.started_at = time.time()
+                job.progress = 0.0
+                job.token = CancelToken()
+                self._running += 1
+            self._changed()
+
+            try:
+                file_path = self._run_job(job, worker_id) or ""
+                state, error = DONE, ""
+            except JobInterrupted as e:
+                file_path, state, error = "", (CANCELLED if e.reason == "cancel" else PAUSED), ""
+            except Exception as e:
+                file_path, state, error = "", FAILED, str(e)
+
+            summary = None
+            with self._cond:
+                requeue = job.id in self._requeue
+                self._requeue.discard(job.id)
+                released = self._slots.get(worker_id) is not owner
+                if released:
+                    # 名額已在要求中止時釋放：只在工作實際上已完成時更新狀態，之後結束此執行緒
+                    self._draining.discard(job.id)
+                    if state == DONE:
+                        job.state = DONE
+                        job.file_path = file_path
+                        job.progress = 100.0
+                    self._cond.notify_all()
+                else:
+                    self._running -= 1
+                    if state == PAUSED and (self._closed or requeue):
+                        state = QUEUED      # 關閉程式或時段結束時中止的工作，之後繼續
+                    job.state = state
+                    job.error = error
+                    job.file_path = file_path
+                    job.finished_at = time.time()
+                    if state == DONE:
+                        job.progress = 100.0
+                        self._batch_done += 1
+                    elif state == FAILED:
+                        self._batch_failed += 1
+                    summary = self._take_idle_summary()
+                    self._cond.notify_all()
+            self._changed()
+            if released:
+                return
+            self._notify_idle(summary)
+
+    # ─── 內部輔助方法 ──────────────────────────────────────
+
+    def _worker_limit(self) -> int:
+        return self._window_workers or self._max_workers
+
+    def _next_job(self):
+        """在持有鎖時呼叫：回傳優先順序最高、佇列位置最前的等待中工作。"""
+        best = None
+        for job in self._jobs:
+            if (job.state == QUEUED and job.id not in self._draining
+                    and (best is None or job.priority > best.priority)):
+                best = job
+        return best
+
+    def _find(self, job_id: int):
+        for job in self._jobs:
+            if job.id == job_id:
+                return job
+        return None
+
+    def _transition(self, job_id: int, from_states: tuple, to_state: str) -> bool:
+        with self._cond:
+            job = self._find(job_id)
+            if job is None or job.state not in from_states:
+                return False
+            was_active = job.state in (QUEUED, RUNNING)
+            if job.state == RUNNING:
+                self._requeue.discard(job.id)   # 使用者的操作優先於時段結束的重新排隊
+                self._release(job, "cancel" if to_state == CANCELLED else "pause")
+            job.state = to_state
+            if to_state in FINISHED_STATES:
+                job.finished_at = time.time()
+            # 取消或暫停最後一個執行中/等待中的工作時，被釋放的執行緒不會回報閒置，由這裡回報
+            summary = self._take_idle_summary() if was_active else None
+            self._cond.notify_all()
+        self._changed()
+        self._notify_idle(summary)
+        return True
+
+    def _take_idle_summary(self):
+        """
+        在持有鎖時呼叫：沒有執行中與等待中的工作時，回傳本輪的 (完成數, 失敗數) 並重設計數；
+        否則回傳 None。
+        """
+        if self._running or any(job.state == QUEUED for job in self._jobs):
+            return None
+        summary = (self._batch_done, self._batch_failed)
+        self._batch_done = self._batch_failed = 0
+        return summary
+
+    def _notify_idle(self, summary):
+        """在鎖外呼叫 on_idle（summary 為 None 表示佇列尚未閒置）。"""
+        if summary is not None and self._on_idle and not self._closed:
+            self._on_idle(*summary)
+
+    def _release(self, job: DownloadJob, reason: str):
+        """
+        在持有鎖時呼叫：觸發執行中工作的取消權杖，並立即把它的名額交給新的工作執行緒，
+        不必等原本的執行緒從 yt-dlp / FFmpeg 返回。
+        """
+        job.token.request(reason)
+        self._running -= 1
+        self._draining.add(job.id)      # 原執行緒返回前不會再被排程，避免兩個執行緒寫同一個 .part 檔
+        if self._slots.get(job.worker_id) is not None:
+            del self._slots[job.worker_id]
+        self._spawn_workers()
+
+    def _changed(self):
+        self._schedule_persist()
+        if self._on_change:
+            self._on_change()
+
+    def _schedule_persist(self):
+        """短時間內的多次變動合併為一次寫檔。"""
+        if not self._persist_path:
+            return
+        with self._persist_lock:
+            if self._persist_timer is None:
+                self._persist_timer = threading.Timer(self.PERSIST_DELAY, self._persist)
+                self._persist_timer.daemon = True
+                self._persist_timer.start()
+
+    def _persist(self):
+        if not self._persist_path:
+            return
+        with self._persist_lock:
+            if self._persist_timer is not None:
+                self._persist_timer.cancel()
+                self._persist_timer = None
+            save_queue(self._persist_path, self.jobs(), self._on_error)
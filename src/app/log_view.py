@@ -0,0 +1,113 @@
+"""
+日誌檢視元件 — 以有界環形緩衝區保存最近的日誌行，每個畫面週期批次插入一次。
+Text 元件只保留最近 max_lines 行，舊行整段刪除；完整歷史僅保存在日誌檔中。
+"""
+
+import tkinter as tk
+from collections import deque
+from tkinter import ttk, scrolledtext
+
+LEVEL_INFO = "info"
+LEVEL_WARNING = "warning"
+LEVEL_ERROR = "error"
+
+# 層級篩選選項：顯示名稱 → 顯示的最低層級
+_FILTER_CHOICES = {"全部": 0, "警告以上": 1, "僅錯誤": 2}
+_LEVEL_RANK = {LEVEL_INFO: 0, LEVEL_WARNING: 1, LEVEL_ERROR: 2}
+
+
+def classify_level(line: str) -> str:
+    """依日誌內容中的關鍵字判斷層級。"""
+    lowered = line.lower()
+    if "錯誤" in line or "失敗" in line or "❌" in line or "error" in lowered:
+        return LEVEL_ERROR
+    if "警告" in line or "warning" in lowered:
+        return LEVEL_WARNING
+    return LEVEL_INFO
+
+
+class LogView(ttk.Frame):
+    """有界、批次更新、可依層級篩選的日誌檢視。"""
+
+    FLUSH_MS = 50       # 批次插入週期
+    TRIM_SLACK = 500    # 超出上限這麼多行才整段刪除，避免每次插入都刪行
+
+    def __init__(self, parent, max_lines: int = 5000, **text_kw):
+        super().__init__(parent)
+        self.max_lines = max_lines
+        self._buffer = deque(maxlen=max_lines)    # (level, line)
+        self._pending = deque(maxlen=max_lines)   # 等待插入 Text 的 (level, line)
+        self._min_rank = 0
+        self._flush_id = None
+
+        ctrl = ttk.Frame(self)
+        ctrl.grid(row=0, column=0, sticky="e")
+        ttk.Label(ctrl, text="顯示:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar(value="全部")
+        combo = ttk.Combobox(ctrl, textvariable=self.filter_var, state="readonly",
+                             values=list(_FILTER_CHOICES), width=10)
+        combo.pack(side=tk.LEFT, padx=(5, 0))
+        combo.bind("<<ComboboxSelected>>", lambda e: self._on_filter_changed())
+
+        self.text = scrolledtext.ScrolledText(self, **text_kw)
+        self.text.grid(row=1, column=0, sticky="nsew")
+        self.text.tag_configure(LEVEL_WARNING, foreground="#b9770e")
+        self.text.tag_configure(LEVEL_ERROR, foreground="#c0392b")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+    def append(self, lines: list):
+        """加入多行日誌；實際插入延到下一個批次週期。"""
+        for line in lines:
+            entry = (classify_level(line), line)
+            self._buffer.append(entry)
+            if _LEVEL_RANK[entry[0]] >= self._min_rank:
+                self._pending.append(entry)
+        if self._pending and self._flush_id is None:
+            self._flush_id = self.after(self.FLUSH_MS, self._flush)
+
+    def clear(self):
+        """清除畫面與緩衝區（日誌檔不受影響）。"""
+        self._buffer.clear()
+        self._pending.clear()
+        self.text.delete("1.0", tk.END)
+
+    # ─── 內部輔助方法 ──────────────────────────────────────
+
+    def _flush(self):
+        """一次插入所有待處理行，並整段裁掉超出上限的舊行。"""
+        self._flush_id = None
+        if not self._pending:
+            return
+        at_bottom = self.text.yview()[1] >= 0.999
+        self._insert(self._pending)
+        self._pending.clear()
+
+        line_count = int(self.text.index("end-1c").split(".")[0])
+        if line_count > self.max_lines + self.TRIM_SLACK:
+            self.text.delete("1.0", f"{line_count - self.max_lines}.0")
+        if at_bottom:
+            self.text.see(tk.END)
+
+    def _insert(self, entries):
+        """相同層級的連續行合併為一段，以單次 insert 呼叫寫入所有段落。"""
+        args = []
+        chunk, chunk_level = [], None
+        for level, line in entries:
+            if level != chunk_level and chunk:
+                args += ["\n".join(chunk) + "\n", chunk_level]
+                chunk = []
+            chunk_level = level
+            chunk.append(line)
+        if chunk:
+            args += ["\n".join(chunk) + "\n", chunk_level]
+        if args:
+            self.text.insert(tk.END, *args)
+
+    def _on_filter_changed(self):
+        """切換層級篩選：以環形緩衝區的內容重建畫面。"""
+        self._min_rank = _FILTER_CHOICES.get(self.filter_var.get(), 0)
+        self._pending.clear()
+        self.text.delete("1.0", tk.END)
+        self._insert([e for e in self._buffer if _LEVEL_RANK[e[0]] >= self._min_rank])
+        self.text.see(tk.END)
@@ -0,0 +1,140 @@
+"""
+日誌檔寫入模組 — 以背景執行緒批次寫入日誌檔，呼叫端只需將訊息放入有界緩衝區。
+檔案超過上限時以重新命名的方式輪轉為分段檔（yd_log.txt.1、.2 …），不需讀取舊內容。
+純邏輯模組，無 UI 依賴，可獨立單元測試。
+"""
+
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class AsyncLogWriter:
+    """
+    非同步日誌寫入器。
+
+    write() 不做任何檔案 I/O：訊息加上時間戳後放入有界緩衝區，緩衝區已滿時捨棄並計數。
+    寫入檔案失敗的批次同樣捨棄並計入 failed，下一批會重新開啟檔案。
+    背景執行緒每隔 flush_interval 秒，或待寫入資料超過 flush_bytes 時批次寫入。
+    """
+
+    def __init__(self, path: str, max_bytes: int = 5 * 1024 * 1024,
+                 max_segments: int = 3, max_buffered: int = 10000,
+                 flush_interval: float = 1.0, flush_bytes: int = 64 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_segments = max_segments
+        self.max_buffered = max_buffered
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+
+        self.dropped = 0            # 因緩衝區已滿而捨棄的總行數
+        self.failed = 0             # 因寫入檔案失敗而遺失的總行數
+        self.written = 0            # 已寫入檔案的總行數
+        self._unreported_drops = 0
+        self._buffer = deque()
+        self._buffered_bytes = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._file = None
+        self._size = 0
+
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message: str):
+        """加入一行日誌（執行緒安全、不阻塞）。"""
+        line = f"{datetime.now():[%Y-%m-%d %H:%M:%S]} {message}\n"
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._buffer) >= self.max_buffered:
+                self.dropped += 1
+                self._unreported_drops += 1
+                return
+            self._buffer.append(line)
+            self._buffered_bytes += len(line)
+            if self._buffered_bytes >= self.flush_bytes:
+                self._cond.notify()
+
+    def flush(self):
+        """要求背景執行緒立即寫入目前的緩衝內容。"""
+        with self._cond:
+            self._cond.notify()
+
+    def close(self, timeout: float = 2.0):
+        """停止接收新訊息，寫完緩衝區後關閉檔案（程式結束時呼叫）。"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    # ─── 背景執行緒 ────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and self._buffered_bytes < self.flush_bytes:
+                    self._cond.wait(self.flush_interval)
+                lines = list(self._buffer)
+                self._buffer.clear()
+                self._buffered_bytes = 0
+                drops, self._unreported_drops = self._unreported_drops, 0
+                closing = self._closed
+            if drops:
+                lines.append(f"{datetime.now():[%Y-%m-%d %H:%M:%S]} "
+                             f"…（緩衝區已滿，{drops} 行日誌未寫入）…\n")
+            if lines and not self._write_lines(lines):
+                self.failed += len(lines) - (1 if drops else 0)     # 不計入捨棄提示行
+            if closing:
+                self._close_file()
+                return
+
+    def _write_lines(self, lines: list) -> bool:
+        """寫入一批日誌，回傳是否成功；寫入失敗不應影響主程式。"""
+        data = "".join(lines)
+        try:
+            if self._file is None:
+                self._open()
+            self._file.write(data)
+            self._file.flush()
+        except OSError:
+            self._close_file()
+            return False
+        self._size += len(data.encode("utf-8", errors="replace"))
+        self.written += len(lines)
+        if self._size > self.max_bytes:
+            try:
+                self._rotate()
+            except OSError:
+                self._close_file()      # 這批已寫入；下一批重新開啟後再嘗試輪轉
+        return True
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8", errors="replace")
+        self._size = self._file.tell()
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+    def _rotate(self):
+        """以重新命名輪轉分段檔：path → path.1 → path.2 …，超過保留數的最舊分段直接刪除。"""
+        self._close_file()
+        oldest = f"{self.path}.{self.max_segments}"
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.max_segments - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.max_segments > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
@@ -0,0 +1,216 @@
+"""
+訊息幫浦模組 — 取代固定週期輪詢的執行緒間訊息佇列。
+背景執行緒 put() 時才喚醒 Tk 主迴圈，每輪處理受時間預算限制，
+同類型的狀態/進度訊息只保留最新值，連續的日誌訊息合併為一批處理；
+處理了訊息的每一輪排空記為一個追蹤區段。
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+from .tracing import TRACER
+
+WAKEUP_EVENT = "<<MessagePump>>"
+
+
+class MessagePump(queue.Queue):
+    """
+    可直接當作 queue.Queue 傳給 DownloadManager 等背景元件使用的訊息佇列。
+
+    start() 之後，第一筆進入空佇列的訊息會以虛擬事件喚醒 Tk 主迴圈；
+    佇列保持為空時主迴圈完全不會被定時喚醒。
+    Tcl 未以多執行緒模式編譯時（無法跨執行緒送出事件），退回固定週期輪詢。
+    """
+
+    # 只需要最新值的訊息類型：同一批內較早的同類訊息會被捨棄
+    COALESCE_TYPES = frozenset({"status", "total_progress", "file_progress", "video_title",
+                                "jobs_changed"})
+    POLL_INTERVAL_MS = 100
+
+    def __init__(self, budget_ms: float = 20.0, max_batch: int = 500):
+        super().__init__()
+        self.budget = budget_ms / 1000
+        self.max_batch = max_batch
+        self._root = None
+        self._handler = None
+        self._batch_handlers = {}
+        self._wake_lock = threading.Lock()
+        self._wake_pending = False
+        self._threaded = True
+        self._after_id = None
+        self._stopped = False
+        self._taps = ()
+
+        # ─── 排空週期統計 ───
+        self.cycles = 0
+        self.messages = 0
+        self.coalesced = 0
+        self.last_cycle_ms = 0.0
+        self.max_cycle_ms = 0.0
+        self.recent_cycle_ms = deque(maxlen=200)
+
+    def start(self, root, handler, batch_handlers: dict = None):
+        """
+        開始在 Tk 主執行緒上分派訊息。
+        handler(msg) 處理單一訊息；batch_handlers 以類型為鍵，
+        一次接收同類型連續訊息的列表（例如日誌）。
+        """
+        self._root = root
+        self._handler = handler
+        self._batch_handlers = batch_handlers or {}
+        self._threaded = bool(int(root.tk.call("info", "exists", "tcl_platform(threaded)")))
+        root.bind(WAKEUP_EVENT, lambda e: self._drain())
+        with self._wake_lock:
+            self._wake_pending = True
+        self._schedule(0)
+
+    def stop(self):
+        """停止分派（視窗關閉時呼叫）；之後的 put() 只會進入佇列。"""
+        self._stopped = True
+        if self._after_id and self._root is not None:
+            try:
+                self._root.after_cancel(self._after_id)
+            except Exception:
+                pass
+        self._after_id = None
+
+    def take_remaining(self) -> list:
+        """取出佇列中剩餘的所有訊息（stop() 之後由呼叫端自行處理，例如寫入日誌檔）。"""
+        remaining = []
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return remaining
+            remaining.extend(batch)
+
+    def add_tap(self, callback):
+        """在每次 put() 時以同一筆訊息呼叫 callback（於放入訊息的執行緒上，必須快速返回）。"""
+        self._taps = self._taps + (callback,)
+
+    def remove_tap(self, callback):
+        self._taps = tuple(tap for tap in self._taps if tap != callback)
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        for tap in self._taps:
+            tap(item)
+        if self._root is None or self._stopped or not self._threaded:
+            return
+        with self._wake_lock:
+            if self._wake_pending:
+                return
+            self._wake_pending = True
+        self._wake()
+
+    def stats(self) -> dict:
+        """回傳排空週期的統計資料（毫秒）。"""
+        recent = list(self.recent_cycle_ms)
+        return {
+            "cycles": self.cycles,
+            "messages": self.messages,
+            "coalesced": self.coalesced,
+            "last_cycle_ms": self.last_cycle_ms,
+            "max_cycle_ms": self.max_cycle_ms,
+            "avg_cycle_ms": sum(recent) / len(recent) if recent else 0.0,
+            "backlog": self.qsize(),
+        }
+
+    # ─── 內部輔助方法 ──────────────────────────────────────
+
+    def _wake(self):
+        """從任意執行緒喚醒主迴圈；在主迴圈啟動前失敗時由 start() 排定的首輪排空補上。"""
+        try:
+            self._root.event_generate(WAKEUP_EVENT, when="tail")
+        except Exception:
+            pass
+
+    def _schedule(self, delay_ms: int):
+        if not self._stopped:
+            self._after_id = self._root.after(delay_ms, self._drain)
+
+    def _drain(self):
+        """在時間預算內處理佇列中的訊息，超出預算則讓出主迴圈並排定下一輪。"""
+        self._after_id = None
+        if self._stopped:
+            return
+        started = time.perf_counter()
+        deadline = started + self.budget
+        processed = 0
+
+        try:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                processed += len(batch)
+                self._dispatch(self._coalesce(batch))
+                if self._stopped or time.perf_counter() >= deadline:
+                    break
+        finally:
+            # 即使 handler 拋出例外，也要記錄本輪並維持喚醒狀態，避免幫浦停擺
+            self._finish_cycle(started, processed)
+
+    def _finish_cycle(self, started: float, processed: int):
+        ended = time.perf_counter()
+        elapsed_ms = (ended - started) * 1000
+        if processed:
+            TRACER.complete("queue.drain", "gui", started, ended, messages=processed)
+            self.cycles += 1
+            self.messages += processed
+            self.last_cycle_ms = elapsed_ms
+            self.max_cycle_ms = max(self.max_cycle_ms, elapsed_ms)
+            self.recent_cycle_ms.append(elapsed_ms)
+
+        if self._stopped:
+            return
+        if not self._threaded:
+            self._schedule(1 if not self.empty() else self.POLL_INTERVAL_MS)
+            return
+        with self._wake_lock:
+            if self.empty():
+                self._wake_pending = False
+                return
+        # 預算用完但仍有訊息：讓 Tk 先處理重繪與輸入事件再繼續
+        self._schedule(1)
+
+    def _take_batch(self) -> list:
+        batch = []
+        try:
+            while len(batch) < self.max_batch:
+                batch.append(self.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _coalesce(self, batch: list) -> list:
+        """同一批內的可合併訊息只保留最後一筆（保持其原本位置）。"""
+        last = {}
+        for i, msg in enumerate(batch):
+            if msg.get("type") in self.COALESCE_TYPES:
+                last[msg["type"]] = i
+        if len(last) == sum(1 for m in batch if m.get("type") in self.COALESCE_TYPES):
+            return batch
+        kept = [
+            msg for i, msg in enumerate(batch)
+            if msg.get("type") not in self.COALESCE_TYPES or last[msg["type"]] == i
+        ]
+        self.coalesced += len(batch) - len(kept)
+        return kept
+
+    def _dispatch(self, batch: list):
+        """依序分派訊息，連續的同類批次訊息合併交給 batch handler。"""
+        i = 0
+        while i < len(batch):
+            mtype = batch[i].get("type")
+            batch_handler = self._batch_handlers.get(mtype)
+            if batch_handler is None:
+                self._handler(batch[i])
+                i += 1
+                continue
+            j = i + 1
+            while j < len(batch) and batch[j].get("type") == mtype:
+                j += 1
+            batch_handler(batch[i:j])
+            i = j
@@ -0,0 +1,344 @@
+"""
+監控指標模組 — 行程內的計數器、量表與直方圖，以 Prometheus 文字格式輸出。
+下載引擎、重試迴圈、進度回呼與下載歷史直接更新本模組定義的指標（REGISTRY）；
+MetricsServer 在本機連接埠提供 /metrics 給 Prometheus 抓取，圖形介面的診斷面板讀取 collect()。
+更新只需一次加鎖的加法，不做任何 I/O；輸出格式在抓取時才產生。
+無 UI 依賴（只使用標準函式庫的 http.server）。
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .jobs import QUEUED, RUNNING
+
+METRICS_HOST = "127.0.0.1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# 預設的直方圖上界（秒）：涵蓋一次 API 請求到數分鐘的 FFmpeg 轉檔
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labels: dict) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in labels.items()]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """指標的共同部分：名稱、說明、標籤名稱與各標籤組合的值。"""
+
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()     # 沒有標籤的指標從 0 開始輸出
+
+    def labels(self, *values):
+        """回傳指定標籤值的子指標（依 labelnames 的順序）。"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要 {len(self.labelnames)} 個標籤值")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self) -> list:
+        """回傳 [(名稱後綴, 標籤 dict, 值)]，依標籤值排序。"""
+        with self._lock:
+            children = sorted(self._children.items())
+        result = []
+        for key, child in children:
+            for suffix, extra, value in child.samples():
+                labels = dict(zip(self.labelnames, key))
+                labels.update(extra)
+                result.append((suffix, labels, value))
+        return result
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_label_text(labels)} {_format_value(value)}")
+        return lines
+
+    def _default(self):
+        """沒有標籤的指標直接操作唯一的子指標。"""
+        return self.labels()
+
+
+class _CounterValue:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("計數器只能增加")
+        with self._lock:
+            self.value += amount
+
+    def samples(self) -> list:
+        return [("", {}, self.value)]
+
+
+class Counter(_Metric):
+    """只增不減的計數器（名稱以 _total 結尾）。"""
+
+    TYPE = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class _GaugeValue:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+        self._function = None
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """抓取時才呼叫 function() 取得目前值（例如佇列長度）。"""
+        self._function = function
+
+    def samples(self) -> list:
+        if self._function is not None:
+            try:
+                return [("", {}, float(self._function()))]
+            except Exception:
+                return []
+        return [("", {}, self.value)]
+
+
+class Gauge(_Metric):
+    """可增可減、或在抓取時由函數提供的量表。"""
+
+    TYPE = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: tuple):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)     # 最後一格為 +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """觀測 with 區塊花費的秒數（例外時也記錄）。"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self) -> list:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        result, cumulative = [], 0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            result.append(("_bucket", {"le": _format_value(bound)}, cumulative))
+        result.append(("_sum", {}, total))
+        result.append(("_count", {}, cumulative))
+        return result
+
+
+class Histogram(_Metric):
+    """依上界分桶計數的直方圖（另輸出 _sum 與 _count）。"""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class MetricsRegistry:
+    """指標的集合；同名指標只能註冊一次。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指標 {metric.name} 已註冊")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collect(self) -> list:
+        """回傳 [(指標, [(名稱後綴, 標籤 dict, 值)])]，依註冊順序。"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [(metric, metric.samples()) for metric in metrics]
+
+    def render(self) -> str:
+        """Prometheus 文字格式（0.0.4）。"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# ─── 下載器的指標 ───────────────────────────────────────
+
+REGISTRY = MetricsRegistry()
+
+BYTES_TRANSFERRED = REGISTRY.counter(
+    "yd_bytes_transferred_total", "下載傳輸的位元組數（不含字幕）")
+DOWNLOADS = REGISTRY.counter(
+    "yd_downloads_total", "執行完畢的下載工作數", ("kind", "result"))
+ACTIVE_WORKERS = REGISTRY.gauge(
+    "yd_active_workers", "正在執行下載工作的工作執行緒數")
+QUEUE_DEPTH = REGISTRY.gauge(
+    "yd_queue_depth", "佇列中等待執行的工作數")
+RETRIES = REGISTRY.counter(
+    "yd_retries_total", "下載重試次數（依錯誤類別）", ("error_class",))
+HTTP_429 = REGISTRY.counter(
+    "yd_http_429_total", "遇到 HTTP 429（請求過多）的次數")
+EXTRACT_SECONDS = REGISTRY.histogram(
+    "yd_extract_seconds", "中繼資料擷取延遲（秒）", ("op",))
+FFMPEG_SECONDS = REGISTRY.histogram(
+    "yd_ffmpeg_seconds", "FFmpeg 後處理時間（秒）", ("postprocessor",))
+HISTORY_WRITE_SECONDS = REGISTRY.histogram(
+    "yd_history_write_seconds", "下載歷史批次寫入的交易時間（秒）",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+HISTORY_RECORDS = REGISTRY.counter(
+    "yd_history_records_total", "寫入下載歷史的記錄數")
+HISTORY_WRITE_ERRORS = REGISTRY.counter(
+    "yd_history_write_errors_total", "寫入失敗而遺失的下載歷史記錄數")
+
+
+def watch_scheduler(scheduler):
+    """讓工作執行緒與佇列長度量表在抓取時讀取 scheduler.counts()。"""
+    ACTIVE_WORKERS.set_function(lambda: scheduler.counts().get(RUNNING, 0))
+    QUEUE_DEPTH.set_function(lambda: scheduler.counts().get(QUEUED, 0))
+
+
+# ─── 抓取端點 ──────────────────────────────────────────
+
+class MetricsServer:
+    """
+    只綁定 127.0.0.1 的 Prometheus 抓取端點（GET /metrics）。
+    不需權杖：只輸出計數與耗時，不含網址、標題等內容。
+    """
+
+    def __init__(self, port: int, registry: MetricsRegistry = None, host: str = METRICS_HOST):
+        self.registry = registry or REGISTRY
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.registry = self.registry
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "YouTubeDownloaderMetrics/1.0"
+
+    def log_message(self, format, *args):
+        pass    # 不寫到 stderr（命令列模式的結構化輸出不被干擾）
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,71 @@
+"""
+選取模型模組 — 以位元組陣列在 Python 端記錄大量列表項目的勾選狀態。
+純邏輯模組，無 UI 依賴，可獨立單元測試。
+"""
+
+from itertools import compress
+
+_INVERT_TABLE = bytes([1, 0]) + bytes(254)
+
+
+class SelectionModel:
+    """
+    以索引為鍵的勾選狀態集合（bitset）。
+    全選、取消全選、反向選取與範圍選取皆為切片操作，不需逐列呼叫 Tk。
+    """
+
+    def __init__(self, size: int = 0):
+        self._bits = bytearray(size)
+
+    def reset(self, size: int):
+        """重設為指定數量的項目，全部未勾選。"""
+        self._bits = bytearray(size)
+
+    def __len__(self) -> int:
+        return len(self._bits)
+
+    @property
+    def count(self) -> int:
+        """目前已勾選的項目數量。"""
+        return self._bits.count(1)
+
+    def is_selected(self, index: int) -> bool:
+        return bool(self._bits[index])
+
+    def set(self, index: int, value: bool = True):
+        self._bits[index] = 1 if value else 0
+
+    def toggle(self, index: int) -> bool:
+        """切換單一項目並回傳新的狀態。"""
+        self._bits[index] ^= 1
+        return bool(self._bits[index])
+
+    def set_range(self, start: int, stop: int, value: bool = True):
+        """將 [start, stop) 範圍內的項目設為同一狀態。"""
+        start = max(0, start)
+        stop = min(len(self._bits), stop)
+        if stop > start:
+            self._bits[start:stop] = (b'\x01' if value else b'\x00') * (stop - start)
+
+    def set_indices(self, indices, value: bool = True):
+        """將指定索引集合設為同一狀態（連續 range 走切片快速路徑）。"""
+        if isinstance(indices, range) and indices.step == 1:
+            self.set_range(indices.start, indices.stop, value)
+            return
+        bit = 1 if value else 0
+        bits = self._bits
+        for i in indices:
+            bits[i] = bit
+
+    def select_all(self):
+        self._bits = bytearray(b'\x01' * len(self._bits))
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+
+    def invert(self):
+        self._bits = bytearray(self._bits.translate(_INVERT_TABLE))
+
+    def selected_indices(self) -> list:
+        """依索引順序回傳所有已勾選項目的索引。"""
+        return list(compress(range(len(self._bits)), self._bits))
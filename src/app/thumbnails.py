@@ -0,0 +1,192 @@
+"""
+縮圖服務模組 — 以共用的 keep-alive HTTP 連線下載縮圖，並提供兩層快取：
+    記憶體 LRU：已解碼、縮放至目標尺寸的 PIL Image（可直接交給 ImageTk.PhotoImage）
+    磁碟快取：以網址雜湊為檔名的原始圖檔，總大小有上限，附 ETag / Last-Modified 以條件式請求重新驗證
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+
+THUMBNAIL_CACHE_DIR = "yd_thumbs"
+
+
+class ThumbnailService:
+    """縮圖下載、解碼與快取。get() 可在任何背景執行緒呼叫。"""
+
+    def __init__(self, cache_dir: str = THUMBNAIL_CACHE_DIR,
+                 max_disk_bytes: int = 100 * 1024 * 1024,
+                 max_memory_items: int = 256, fresh_seconds: int = 24 * 3600,
+                 workers: int = 4):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_items = max_memory_items
+        self.fresh_seconds = fresh_seconds
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        self._memory = OrderedDict()            # (url, size) → PIL Image
+        self._memory_lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_sizes = {}                   # key → 圖檔位元組數
+        self._disk_total = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumb")
+        self._load_disk_index()
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.not_modified = 0
+        self.downloads = 0
+
+    def get(self, url: str, size: tuple = (320, 180)):
+        """取得縮放至 size 以內的 PIL Image（依序查詢記憶體、磁碟、網路）。"""
+        mem_key = (url, size)
+        with self._memory_lock:
+            image = self._memory.get(mem_key)
+            if image is not None:
+                self._memory.move_to_end(mem_key)
+                self.hits_memory += 1
+                return image
+
+        image = self._decode(self._fetch_bytes(url), size)
+        with self._memory_lock:
+            self._memory[mem_key] = image
+            self._memory.move_to_end(mem_key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+        return image
+
+    def submit(self, url: str, size: tuple = (320, 180)):
+        """在服務的工作執行緒池中執行 get()，回傳 Future。"""
+        return self._executor.submit(self.get, url, size)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
+
+    # ─── 內部輔助方法 ──────────────────────────────────────
+
+    @staticmethod
+    def _decode(data: bytes, size: tuple):
+        """以 JPEG draft 模式直接在解碼時縮小，再精確縮放至目標尺寸。"""
+        img = Image.open(BytesIO(data))
+        img.draft("RGB", size)
+        img.thumbnail(size)
+        img.load()
+        return img
+
+    def _paths(self, url: str) -> tuple:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return key, base + ".img", base + ".json"
+
+    def _fetch_bytes(self, url: str) -> bytes:
+        """回傳圖檔原始位元組；磁碟快取過期時以條件式請求重新驗證。"""
+        key, img_path, meta_path = self._paths(url)
+        data, meta = self._read_disk(img_path, meta_path)
+        if data is not None and time.time() - meta.get("fetched_at", 0) < self.fresh_seconds:
+            self.hits_disk += 1
+            return data
+
+        headers = {}
+        if data is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self._session.get(url, headers=headers, timeout=10)
+        if response.status_code == 304 and data is not None:
+            self.not_modified += 1
+            meta["fetched_at"] = time.time()
+            self._write_meta(meta_path, meta)
+            return data
+
+        response.raise_for_status()
+        self.downloads += 1
+        data = response.content
+        self._write_disk(key, img_path, meta_path, data, {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        })
+        return data
+
+    def _load_disk_index(self):
+        """啟動時掃描快取目錄，建立大小索引（只讀取檔案屬性）。"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".img"):
+                    size = os.path.getsize(os.path.join(self.cache_dir, name))
+                    self._disk_sizes[name[:-4]] = size
+                    self._disk_total += size
+        except OSError:
+            pass
+
+    @staticmethod
+    def _read_disk(img_path: str, meta_path: str) -> tuple:
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(img_path, "rb") as f:
+                data = f.read()
+            os.utime(img_path)  # 以修改時間作為 LRU 淘汰依據
+            return data, meta
+        except (OSError, ValueError):
+            return None, {}
+
+    @staticmethod
+    def _write_meta(meta_path: str, meta: dict):
+        try:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        except OSError:
+            pass
+
+    def _write_disk(self, key: str, img_path: str, meta_path: str, data: bytes, meta: dict):
+        try:
+            with open(img_path, "wb") as f:
+                f.write(data)
+            self._write_meta(meta_path, meta)
+        except OSError:
+            return
+        with self._disk_lock:
+            self._disk_total += len(data) - self._disk_sizes.get(key, 0)
+            self._disk_sizes[key] = len(data)
+            if self._disk_total > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        """刪除最久未使用的快取檔，直到總大小低於上限的 90%。"""
+        entries = []
+        for key in self._disk_sizes:
+            path = os.path.join(self.cache_dir, key + ".img")
+            try:
+                entries.append((os.path.getmtime(path), key))
+            except OSError:
+                entries.append((0, key))
+        entries.sort()
+        target = self.max_disk_bytes * 0.9
+        for _, key in entries:
+            if self._disk_total <= target:
+                break
+            for ext in (".img", ".json"):
+                try:
+                    os.remove(os.path.join(self.cache_dir, key + ext))
+                except OSError:
+                    pass
+            self._disk_total -= self._disk_sizes.pop(key)
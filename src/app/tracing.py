@@ -0,0 +1,118 @@
+"""
+追蹤模組 — 以時間區段（span）記錄網址分析、每次 extract_info、ydl.download、後處理器、
+歷史寫入與圖形介面訊息排空，匯出為 Chrome trace-event JSON，可直接以 Perfetto（ui.perfetto.dev）
+或 chrome://tracing 開啟，依執行緒檢視各工作如何重疊。
+事件存放在固定容量的環形緩衝區（最舊的事件被覆蓋），長期開啟時記憶體用量也有上限；
+容量為 0 時停用，span() 只多一次屬性檢查。
+純邏輯模組，無 UI 依賴。
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+TRACE_FILE = "yd_trace.json"
+DEFAULT_CAPACITY = 20000        # 每個事件約數百位元組，預設上限約數 MB
+
+
+class Tracer:
+    """
+    執行緒安全的 span 記錄器。
+
+    span(name, cat, **args) 包住一段程式；無法以 with 包住的區段（例如由 yt-dlp 回呼的開始/結束）
+    以 complete(name, cat, start, end) 補記，start / end 為 time.perf_counter() 的值。
+    """
+
+    MAX_THREADS = 1000
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=max(1, capacity))
+        self._threads = {}              # 執行緒 id → 名稱（匯出為 thread_name 中繼事件）
+        self._origin = time.perf_counter()
+        self.enabled = capacity > 0
+        self.overwritten = 0            # 因緩衝區已滿而被覆蓋的事件數
+
+    @property
+    def capacity(self) -> int:
+        return self._events.maxlen if self.enabled else 0
+
+    def configure(self, capacity: int):
+        """變更緩衝區容量（保留最新的事件）；0 表示停用並清空緩衝區。"""
+        with self._lock:
+            self._events = deque(self._events if capacity > 0 else (), maxlen=max(1, capacity))
+            self.enabled = capacity > 0
+
+    @contextmanager
+    def span(self, name: str, cat: str = "", **args):
+        """記錄 with 區塊的時間區段；區塊拋出例外時在 args 中記下例外類型。"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            self.complete(name, cat, start, time.perf_counter(), **args)
+
+    def complete(self, name: str, cat: str, start: float, end: float, **args):
+        """在目前執行緒上補記一個已結束的區段。"""
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        event = {
+            "name": name, "cat": cat, "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 3),
+            "dur": round(max(0.0, end - start) * 1e6, 3),
+            "pid": os.getpid(), "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.overwritten += 1
+            self._events.append(event)
+            self._threads[thread.ident] = thread.name
+            if len(self._threads) > self.MAX_THREADS:
+                # 控制 API 等每個請求一條執行緒：只保留緩衝區中仍有事件的執行緒名稱
+                used = {e["tid"] for e in self._events}
+                self._threads = {tid: n for tid, n in self._threads.items() if tid in used}
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self.overwritten = 0
+
+    def trace(self) -> dict:
+        """目前緩衝區內容的 Chrome trace-event 物件（{"traceEvents": [...]}）。"""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            overwritten = self.overwritten
+        pid = os.getpid()
+        used = {event["tid"] for event in events}
+        meta = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                 "args": {"name": "YouTube 下載器"}}]
+        meta += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in threads.items() if tid in used]
+        return {"traceEvents": meta + events, "displayTimeUnit": "ms",
+                "otherData": {"overwritten_events": overwritten}}
+
+    def export(self, path: str = TRACE_FILE) -> int:
+        """將緩衝區寫成 JSON 檔（先寫暫存檔再取代），回傳匯出的區段數。"""
+        data = self.trace()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+        return sum(1 for event in data["traceEvents"] if event["ph"] == "X")
+
+
+# 行程共用的追蹤器（下載引擎、歷史記錄與訊息幫浦直接記錄到這裡）
+TRACER = Tracer()
@@ -4,11 +4,15 @@
 
 
 class YtdlpLogger:
-    """攔截 yt-dlp 的日誌訊息並傳送到 GUI 的訊息佇列。"""
+    """攔截 yt-dlp 的日誌訊息並傳送到 GUI 的訊息佇列（queue 為 None 時全部捨棄）。"""
 
     def __init__(self, queue):
         self.queue = queue
 
+    def _put(self, text: str):
+        if self.queue:
+            self.queue.put({"type": "log", "text": text})
+
     def debug(self, msg):
         if msg.startswith('[debug] '):
             pass
@@ -16,13 +20,13 @@ class YtdlpLogger:
             self.info(msg)
 
     def info(self, msg):
-        self.queue.put({"type": "log", "text": f"[yt-dlp] {msg}"})
+        self._put(f"[yt-dlp] {msg}")
 
     def warning(self, msg):
-        self.queue.put({"type": "log", "text": f"[yt-dlp 警告] {msg}"})
+        self._put(f"[yt-dlp 警告] {msg}")
 
     def error(self, msg):
-        self.queue.put({"type": "log", "text": f"[yt-dlp 錯誤] {msg}"})
+        self._put(f"[yt-dlp 錯誤] {msg}")
 
 
 def simplify_codec(codec: str) -> str:
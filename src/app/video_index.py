@@ -0,0 +1,202 @@
+"""
+影片列表索引模組 — 為頻道/播放清單的影片建立記憶體內反向索引，支援即時篩選。
+純邏輯模組，無 UI 依賴，可獨立單元測試。
+
+查詢語法（以空白分隔，所有條件皆須成立）：
+    關鍵字        英數字詞以字首比對，中日韓文字以逐字比對
+    dur>10m       影片長度（支援 90、5m、1h、1:30、1:02:03）
+    date>=2023    上傳日期（支援 2023、2023-05、2023-05-01、20230501）
+    views>1.5k    觀看次數（支援 k / m / b 單位）
+    運算子可用 > >= < <= = 或 :（date:2023-05 表示該月份）
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+# 英數字詞，或單一中日韓文字（含假名、諺文）
+_TOKEN_RE = re.compile(r"[0-9a-z]+|[぀-ヿ㐀-鿿가-힯豈-﫿]")
+_CJK_RUN_RE = re.compile(r"[぀-ヿ㐀-鿿가-힯豈-﫿]{2,}")
+_FILTER_RE = re.compile(r"^(dur|date|views)(>=|<=|>|<|=|:)(.+)$")
+
+_VIEW_UNITS = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def entry_meta(entry: dict) -> dict:
+    """
+    從 extract_flat 的單一項目中取出可索引的中繼資料（缺少的欄位為 None），
+    並附上列表縮圖欄使用的小尺寸縮圖網址。
+    """
+    upload_date = entry.get("upload_date")
+    if not upload_date:
+        timestamp = entry.get("timestamp") or entry.get("release_timestamp")
+        if timestamp:
+            upload_date = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y%m%d")
+    duration = entry.get("duration")
+    return {
+        "duration": int(duration) if duration is not None else None,
+        "upload_date": upload_date or None,
+        "view_count": entry.get("view_count"),
+        "thumbnail_url": _small_thumbnail(entry),
+    }
+
+
+def _small_thumbnail(entry: dict):
+    """挑選寬度至少 120 px 的最小縮圖；沒有縮圖清單時依影片 ID 組出 YouTube 預設縮圖。"""
+    thumbnails = [t for t in entry.get("thumbnails") or [] if t.get("url")]
+    sized = sorted((t for t in thumbnails if (t.get("width") or 0) >= 120),
+                   key=lambda t: t["width"])
+    if sized:
+        return sized[0]["url"]
+    if thumbnails:
+        return thumbnails[0]["url"]
+    if entry.get("ie_key") == "Youtube" and entry.get("id"):
+        return f"https://i.ytimg.com/vi/{entry['id']}/mqdefault.jpg"
+    return None
+
+
+def _parse_duration(text: str) -> int:
+    if ":" in text:
+        seconds = 0
+        for part in text.split(":"):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    unit = _DURATION_UNITS.get(text[-1])
+    if unit:
+        return int(float(text[:-1]) * unit)
+    return int(text)
+
+
+def _parse_views(text: str) -> int:
+    unit = _VIEW_UNITS.get(text[-1])
+    if unit:
+        return int(float(text[:-1]) * unit)
+    return int(text)
+
+
+def _parse_date_range(text: str) -> tuple:
+    """將日期字串轉換為涵蓋的 YYYYMMDD 整數範圍 (lo, hi)。"""
+    digits = text.replace("-", "").replace("/", "")
+    if not digits.isdigit() or len(digits) not in (4, 6, 8):
+        raise ValueError(text)
+    pad = 8 - len(digits)
+    return int(digits + "0" * pad), int(digits + "9" * pad)
+
+
+class VideoIndex:
+    """
+    影片列表的記憶體內索引。
+
+    標題以反向索引（詞彙 → 已排序的項目索引陣列）儲存，並保留已排序詞彙表以做字首查詢；
+    長度、上傳日期與觀看次數各以 (值, 索引) 排序陣列儲存，範圍條件以二分搜尋取得。
+    查詢結果為依原始順序排列的項目索引列表。
+    """
+
+    def __init__(self, titles: list, meta: list = None):
+        self.size = len(titles)
+        self._lower_titles = [t.lower() for t in titles]
+
+        postings: dict[str, array] = {}
+        for idx, title in enumerate(self._lower_titles):
+            for token in set(_TOKEN_RE.findall(title)):
+                posting = postings.get(token)
+                if posting is None:
+                    postings[token] = posting = array("I")
+                posting.append(idx)
+        self._postings = postings
+        self._vocab = sorted(postings)
+
+        self._numeric: dict[str, tuple] = {}
+        meta = meta or []
+        for field, key in (("dur", "duration"), ("date", "upload_date"), ("views", "view_count")):
+            pairs = sorted(
+                (int(m[key]), idx) for idx, m in enumerate(meta)
+                if m and m.get(key) is not None
+            )
+            self._numeric[field] = ([v for v, _ in pairs], [i for _, i in pairs])
+
+    def has_field(self, field: str) -> bool:
+        """回傳中繼資料欄位（dur / date / views）是否有任何值可供篩選。"""
+        return bool(self._numeric.get(field, ([],))[0])
+
+    def search(self, query: str):
+        """
+        依查詢字串篩選，回傳符合項目的索引列表；空查詢回傳 range(size)。
+        無法解析的篩選條件會被當作一般關鍵字處理。
+        """
+        terms = query.lower().split()
+        if not terms:
+            return range(self.size)
+
+        candidates = None
+        cjk_runs = []
+        for term in terms:
+            match = _FILTER_RE.match(term)
+            matched = None
+            if match:
+                try:
+                    matched = self._range_match(*match.groups())
+                except ValueError:
+                    matched = None
+            if matched is None:
+                cjk_runs.extend(_CJK_RUN_RE.findall(term))
+                for token in _TOKEN_RE.findall(term):
+                    candidates = self._intersect(candidates, self._token_match(token))
+                    if not candidates:
+                        return []
+                continue
+            candidates = self._intersect(candidates, matched)
+            if not candidates:
+                return []
+
+        if candidates is None:
+            return range(self.size)
+        if cjk_runs:
+            titles = self._lower_titles
+            candidates = {i for i in candidates if all(run in titles[i] for run in cjk_runs)}
+        return sorted(candidates)
+
+    # ─── 內部輔助方法 ──────────────────────────────────────
+
+    @staticmethod
+    def _intersect(candidates, matched: set) -> set:
+        if candidates is None:
+            return matched
+        if len(candidates) > len(matched):
+            candidates, matched = matched, candidates
+        return candidates & matched
+
+    def _token_match(self, token: str) -> set:
+        """英數字詞以字首比對（合併所有以此開頭的詞彙），單一文字以完全比對。"""
+        if not token.isascii():
+            return set(self._postings.get(token, ()))
+        vocab = self._vocab
+        start = bisect_left(vocab, token)
+        stop = bisect_left(vocab, token + "￿", start)
+        if stop - start == 1:
+            return set(self._postings[vocab[start]])
+        result = set()
+        for word in vocab[start:stop]:
+            result.update(self._postings[word])
+        return result
+
+    def _range_match(self, field: str, op: str, text: str) -> set:
+        values, indices = self._numeric[field]
+        if field == "date":
+            lo, hi = _parse_date_range(text)
+        else:
+            lo = hi = _parse_duration(text) if field == "dur" else _parse_views(text)
+
+        if op == ">":
+            start, stop = bisect_right(values, hi), len(values)
+        elif op == ">=":
+            start, stop = bisect_left(values, lo), len(values)
+        elif op == "<":
+            start, stop = 0, bisect_left(values, lo)
+        elif op == "<=":
+            start, stop = 0, bisect_right(values, hi)
+        else:  # "=" 或 ":"
+            start, stop = bisect_left(values, lo), bisect_right(values, hi)
+        return set(indices[start:stop])
@@ -0,0 +1,248 @@
+"""
+虛擬化列表元件 — 僅為可見視窗建立 Treeview 列，資料列由回呼函數按需提供。
+適用於數萬筆項目的頻道影片列表，捲動時只更新可見列的內容。
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from tkinter import font as tkfont
+
+
+class VirtualTreeview(ttk.Frame):
+    """
+    包裝 ttk.Treeview 與捲軸的虛擬化列表。
+
+    row_provider(pos) 回傳該位置的 Treeview item 選項（text / values / image / tags），
+    元件只保留「可見列數」個 Tk item 並在捲動時重複使用。
+    位置（pos）指的是列表中的顯示順序，與資料索引的對應由呼叫端負責。
+    """
+
+    def __init__(self, parent, row_provider, **tree_kw):
+        super().__init__(parent)
+        self._row_provider = row_provider
+        self._row_count = 0
+        self._top = 0
+        self._rows: list[str] = []      # 目前建立的 Tk item id（由上而下）
+        self._capacity = 1              # 可見視窗可容納的列數
+        self._cursor = None             # 目前焦點列的位置
+        self._reported = None           # 最後一次回報給呼叫端的焦點位置
+        self._viewport_listeners = []
+
+        self.tree = ttk.Treeview(self, **tree_kw)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.tree.bind("<Up>", lambda e: self._move_cursor(-1))
+        self.tree.bind("<Down>", lambda e: self._move_cursor(1))
+        self.tree.bind("<Prior>", lambda e: self._move_cursor(-self._capacity))
+        self.tree.bind("<Next>", lambda e: self._move_cursor(self._capacity))
+        self.tree.bind("<Home>", lambda e: self._move_cursor(-self._row_count))
+        self.tree.bind("<End>", lambda e: self._move_cursor(self._row_count))
+
+    # ─── 公開介面 ──────────────────────────────────────────
+
+    @property
+    def row_count(self) -> int:
+        return self._row_count
+
+    def set_row_count(self, count: int):
+        """設定列表總列數並回到頂端（資料已整批替換）。"""
+        self._row_count = max(0, count)
+        self._top = 0
+        self._cursor = None
+        self._reported = None
+        self.refresh()
+
+    def resize(self, count: int):
+        """改變總列數但保留捲動位置與焦點（資料在原位置上增減）。"""
+        self._row_count = max(0, count)
+        if self._cursor is not None and self._cursor >= self._row_count:
+            self._cursor = None
+            self._reported = None
+        self.refresh()
+
+    def prepend(self, count: int):
+        """
+        在列表頂端加入 count 列：位於頂端時新列直接出現，已往下捲動時維持目前看到的資料列不動；
+        焦點跟著原本的資料列移動。
+        """
+        if count <= 0:
+            return
+        self._row_count += count
+        if self._top > 0:
+            self._top += count
+        if self._cursor is not None:
+            self._cursor += count
+            self._reported = self._cursor
+        self.refresh()
+
+    def refresh(self):
+        """重新向 row_provider 取得可見列的內容（不改變捲動位置）。"""
+        self._top = self._clamp_top(self._top)
+        self._sync_rows()
+        for offset, iid in enumerate(self._rows):
+            self.tree.item(iid, **self._row_provider(self._top + offset))
+        self._sync_selection()
+        self._update_scrollbar()
+        for listener in self._viewport_listeners:
+            listener(*self.visible_range())
+
+    def update_row(self, pos: int):
+        """只重新取得單一位置的內容（不在可見視窗中則略過，不觸發可見範圍回呼）。"""
+        iid = self.iid_at(pos)
+        if iid is not None:
+            self.tree.item(iid, **self._row_provider(pos))
+
+    def remeasure(self):
+        """列高改變（例如切換樣式）後重新計算可見列數。"""
+        self.after_idle(lambda: self._apply_height(self.tree.winfo_height()))
+
+    def visible_range(self) -> tuple:
+        """回傳目前可見的位置範圍 (start, stop)。"""
+        return self._top, self._top + len(self._rows)
+
+    def add_viewport_listener(self, callback):
+        """註冊可見範圍變動時的回呼 callback(start, stop)。"""
+        self._viewport_listeners.append(callback)
+
+    def position_of(self, iid: str):
+        """將 Tk item id 轉換為列表位置；不在可見視窗中則回傳 None。"""
+        try:
+            return self._top + self._rows.index(iid)
+        except ValueError:
+            return None
+
+    def iid_at(self, pos: int):
+        """回傳目前顯示指定位置的 Tk item id；不可見時回傳 None。"""
+        offset = pos - self._top
+        if 0 <= offset < len(self._rows):
+            return self._rows[offset]
+        return None
+
+    def see(self, pos: int):
+        """捲動使指定位置可見。"""
+        if pos < self._top:
+            self._top = pos
+        elif pos >= self._top + self._capacity:
+            self._top = pos - self._capacity + 1
+        else:
+            return
+        self.refresh()
+
+    @property
+    def cursor(self):
+        """目前焦點列的位置（沒有焦點時為 None）。"""
+        return self._cursor
+
+    def select(self, pos: int):
+        """將焦點移到指定位置並捲動使其可見。"""
+        if not 0 <= pos < self._row_count:
+            return
+        self._cursor = pos
+        self.see(pos)
+        self._sync_selection()
+
+    def take_selection_change(self):
+        """
+        依 Tk 的選取列更新焦點位置。
+        焦點確實改變時回傳新位置，否則（含捲動造成的選取同步事件）回傳 None。
+        """
+        selected = self.tree.selection()
+        if not selected:
+            return None
+        pos = self.position_of(selected[0])
+        if pos is None:
+            return None
+        self._cursor = pos
+        if pos == self._reported:
+            return None
+        self._reported = pos
+        return pos
+
+    # ─── 內部輔助方法 ──────────────────────────────────────
+
+    def _clamp_top(self, top: int) -> int:
+        return max(0, min(top, self._row_count - self._capacity))
+
+    def _sync_rows(self):
+        """使 Tk item 數量等於可見列數，只在視窗大小或總列數變動時增減。"""
+        needed = min(self._capacity, self._row_count - self._top)
+        while len(self._rows) > needed:
+            self.tree.delete(self._rows.pop())
+        while len(self._rows) < needed:
+            self._rows.append(self.tree.insert("", "end"))
+
+    def _sync_selection(self):
+        """讓 Tk 的選取列跟隨焦點位置（焦點捲出視窗時清除選取）。"""
+        iid = self.iid_at(self._cursor) if self._cursor is not None else None
+        wanted = (iid,) if iid else ()
+        if self.tree.selection() != wanted:
+            self.tree.selection_set(wanted)
+
+    def _update_scrollbar(self):
+        if self._row_count <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        first = self._top / self._row_count
+        last = min(1.0, (self._top + len(self._rows)) / self._row_count)
+        self.scrollbar.set(first, last)
+
+    def _measure_capacity(self, height: int) -> int:
+        """依 Treeview 實際高度估算可容納的列數。"""
+        try:
+            row_height = int(ttk.Style().lookup(self.tree.cget("style") or "Treeview", "rowheight"))
+        except (TypeError, ValueError):
+            row_height = 0
+        bbox = self.tree.bbox(self._rows[0]) if self._rows else ()
+        if bbox:
+            header = bbox[1]
+            row_height = row_height or bbox[3]
+        else:
+            row_height = row_height or tkfont.nametofont("TkDefaultFont").metrics("linespace") + 4
+            header = row_height + 4 if "headings" in str(self.tree.cget("show")) else 0
+        return max(1, (height - header) // max(1, row_height))
+
+    def _on_configure(self, event):
+        self._apply_height(event.height)
+
+    def _apply_height(self, height: int):
+        capacity = self._measure_capacity(height)
+        if capacity != self._capacity:
+            self._capacity = capacity
+            self.refresh()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * self._row_count)
+            self.refresh()
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self._capacity if args[2] == "pages" else 1)
+            self._scroll_by(step)
+
+    def _on_mousewheel(self, event):
+        self._scroll_by(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _scroll_by(self, delta: int):
+        top = self._clamp_top(self._top + delta)
+        if top != self._top:
+            self._top = top
+            self.refresh()
+        return "break"
+
+    def _move_cursor(self, delta: int):
+        if self._row_count <= 0:
+            return "break"
+        current = self._cursor if self._cursor is not None else self._top - (1 if delta > 0 else 0)
+        self._cursor = max(0, min(current + delta, self._row_count - 1))
+        self.see(self._cursor)
+        self._sync_selection()
+        self.tree.focus(self.iid_at(self._cursor))
+        return "break"
@@ -0,0 +1,217 @@
+"""
+監看資料夾模組 — 自動取走放入指定資料夾的網址清單檔（.txt / .jsonl）並加入下載佇列。
+Linux 上以 inotify 等待檔案寫入完成（IN_CLOSE_WRITE / IN_MOVED_TO），其他平台以固定間隔
+掃描並等待檔案大小與修改時間穩定；兩者都以阻塞等待實作，不會忙碌輪詢。
+處理完成的檔案移到 done/，無法解析或沒有任何網址的檔案移到 failed/ 並附上錯誤說明。
+純邏輯模組，無 UI 依賴。
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from .batch import read_job_file
+
+WATCH_EXTENSIONS = (".txt", ".jsonl")
+DONE_DIR = "done"
+FAILED_DIR = "failed"
+
+
+def is_job_file(name: str) -> bool:
+    """只處理 .txt / .jsonl；以 . 或 ~ 開頭的暫存檔會被忽略（寫入端可先寫暫存檔再改名）。"""
+    return name.lower().endswith(WATCH_EXTENSIONS) and not name.startswith((".", "~"))
+
+
+class _InotifyWatcher:
+    """以 inotify 等待目錄中寫入完成或移入的檔案（僅 Linux）。"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    _EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失敗")
+        wd = libc.inotify_add_watch(self._fd, os.fsencode(directory),
+                                    self.IN_CLOSE_WRITE | self.IN_MOVED_TO)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"無法監看 {directory}")
+        self._wake_r, self._wake_w = os.pipe()
+
+    def wait(self) -> list:
+        """阻塞直到有檔案完成寫入（回傳檔名列表）或 close() 被呼叫（回傳 None）。"""
+        while True:
+            ready, _, _ = select.select([self._fd, self._wake_r], [], [])
+            if self._wake_r in ready:
+                return None
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            names = []
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = self._EVENT_HEADER.unpack_from(data, offset)
+                offset += self._EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name:
+                    names.append(os.fsdecode(name))
+            if names:
+                return names
+
+    def close(self):
+        os.write(self._wake_w, b"x")
+
+    def release(self):
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+class _PollingWatcher:
+    """以固定間隔掃描目錄，只回報大小與修改時間在兩次掃描之間沒有變動的檔案。"""
+
+    def __init__(self, directory: str, interval: float):
+        self._directory = directory
+        self._interval = interval
+        self._closed = threading.Event()
+        self._seen = {}             # 檔名 → (大小, 修改時間)
+
+    def wait(self) -> list:
+        while not self._closed.wait(self._interval):
+            names = self._stable_files()
+            if names:
+                return names
+        return None
+
+    def close(self):
+        self._closed.set()
+
+    def release(self):
+        pass
+
+    def _stable_files(self) -> list:
+        stable = []
+        current = {}
+        try:
+            entries = list(os.scandir(self._directory))
+        except OSError:
+            return []
+        for entry in entries:
+            if not entry.is_file() or not is_job_file(entry.name):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            current[entry.name] = (stat.st_size, stat.st_mtime)
+            if self._seen.get(entry.name) == current[entry.name]:
+                stable.append(entry.name)
+        self._seen = current
+        return stable
+
+
+class WatchFolder:
+    """
+    監看資料夾服務。
+
+    submit(urls, options) 分析網址並加入下載佇列，回傳實際加入的工作列表
+    （與控制 API、daemon inbox 使用的是同一個函數）；
+    on_event(event, name, detail) 在檔案處理完成（"done"）、失敗（"failed"）時於監看執行緒上呼叫。
+    檔案中的 #@ 選項覆蓋 defaults。
+    """
+
+    def __init__(self, directory: str, submit, on_event=None, defaults: dict = None,
+                 poll_interval: float = 2.0):
+        self.directory = os.path.abspath(directory)
+        self._submit = submit
+        self._on_event = on_event
+        self._defaults = dict(defaults or {})
+        self._poll_interval = poll_interval
+        self._watcher = None
+        self._thread = None
+        self._stuck = set()         # 無法移走的檔案（避免掃描時重複處理）
+        self.mode = None            # "inotify" / "polling"
+
+    def start(self):
+        """建立 done/、failed/ 子資料夾並開始監看；啟動時先處理資料夾中既有的檔案。"""
+        for sub in (DONE_DIR, FAILED_DIR):
+            os.makedirs(os.path.join(self.directory, sub), exist_ok=True)
+        if sys.platform.startswith("linux"):
+            try:
+                self._watcher = _InotifyWatcher(self.directory)
+                self.mode = "inotify"
+            except (OSError, AttributeError):
+                self._watcher = None
+        if self._watcher is None:
+            self._watcher = _PollingWatcher(self.directory, self._poll_interval)
+            self.mode = "polling"
+        self._thread = threading.Thread(target=self._run, name="watch-folder", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        if self._watcher is not None:
+            self._watcher.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ─── 監看執行緒 ────────────────────────────────────────
+
+    def _run(self):
+        try:
+            # inotify 已開始監看後才掃描既有檔案，兩者之間寫入完成的檔案不會遺漏
+            pending = sorted(e.name for e in os.scandir(self.directory)
+                             if e.is_file() and is_job_file(e.name))
+            while pending is not None:
+                for name in pending:
+                    if is_job_file(name):
+                        self._process(name)
+                pending = self._watcher.wait()
+        finally:
+            self._watcher.release()
+
+    def _process(self, name: str):
+        path = os.path.join(self.directory, name)
+        if name in self._stuck or not os.path.isfile(path):
+            return      # 已被處理或移走
+        try:
+            groups = read_job_file(path)
+            if not groups:
+                raise ValueError("檔案中沒有任何網址")
+            added, urls = 0, 0
+            for options, group_urls in groups:
+                urls += len(group_urls)
+                added += len(self._submit(group_urls, {**self._defaults, **options}))
+        except Exception as e:
+            self._finish(name, FAILED_DIR, str(e))
+            return
+        self._finish(name, DONE_DIR, f"{urls} 個網址，加入 {added} 個下載工作")
+
+    def _finish(self, name: str, subdir: str, detail: str):
+        """將檔案移到 done/ 或 failed/（同名時加上時間戳記），失敗時另寫 .error.txt。"""
+        target_dir = os.path.join(self.directory, subdir)
+        target = os.path.join(target_dir, name)
+        if os.path.exists(target):
+            stem, ext = os.path.splitext(name)
+            target = os.path.join(target_dir, f"{stem}.{time.strftime('%Y%m%d-%H%M%S')}{ext}")
+        try:
+            os.replace(os.path.join(self.directory, name), target)
+            if subdir == FAILED_DIR:
+                with open(target + ".error.txt", "w", encoding="utf-8") as f:
+                    f.write(detail + "\n")
+        except OSError as e:
+            self._stuck.add(name)
+            detail = f"{detail}（無法移動檔案：{e}）"
+        if self._on_event:
+            self._on_event("done" if subdir == DONE_DIR else "failed", name, detail)
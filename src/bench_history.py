@@ -0,0 +1,56 @@
+"""
+下載歷史記錄微基準測試 — 比較「每次呼叫建立新連線」與「每個執行緒長期保持連線」的效能。
+用法（在 src/ 目錄下）：python bench_history.py [筆數]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from app.history import DownloadHistory
+
+
+class PerCallConnectionHistory(DownloadHistory):
+    """舊版行為：每次操作都建立新連線並重新設定 journal_mode。"""
+
+    def _get_conn(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        self._register_functions(conn)
+        return conn
+
+
+def bench(history_cls, records: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        history = history_cls(os.path.join(tmp, "bench.db"))
+        started = time.perf_counter()
+        for i in range(records):
+            history.add_record(url=f"https://youtu.be/{i:011d}", title=f"影片 {i}",
+                               format_type="MP4", resolution="1080p", file_size=i)
+        insert_s = time.perf_counter() - started
+
+        queries = max(1, records // 10)
+        started = time.perf_counter()
+        for _ in range(queries):
+            history.get_stats()
+            history.get_all(limit=20)
+        query_s = time.perf_counter() - started
+        history.close()
+    return {"insert_per_s": records / insert_s, "query_per_s": queries / query_s}
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{records} 筆記錄（每筆一個交易）")
+    for label, cls in (("每次呼叫建立連線", PerCallConnectionHistory),
+                       ("執行緒長期連線", DownloadHistory)):
+        result = bench(cls, records)
+        print(f"  {label:<10} 寫入 {result['insert_per_s']:>9.0f} 筆/秒   "
+              f"查詢（統計 + 最近 20 筆）{result['query_per_s']:>8.0f} 次/秒")
+
+
+if __name__ == "__main__":
+    main()